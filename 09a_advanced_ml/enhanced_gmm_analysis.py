@@ -1,7 +1,64 @@
-def enhanced_gmm_clustering_analysis(df):
-    """优化的GMM聚类分析 - 基于您的优化经验"""
+# 大数据模式阈值: 超过该行数时子采样拟合 + 分块预测 + 抽样轮廓系数
+LARGE_DATA_THRESHOLD = 100000
+
+
+def _stratified_sample_positions(df, sample_size, strata_col='protocol', random_state=42):
+    """按协议分层抽样, 返回行位置 (各层按比例, 每层至少1条)"""
+    if len(df) <= sample_size:
+        return np.arange(len(df))
+    rng = np.random.default_rng(random_state)
+    if strata_col not in df.columns:
+        return np.sort(rng.choice(len(df), sample_size, replace=False))
+    codes, _ = pd.factorize(df[strata_col])
+    positions = []
+    for code in np.unique(codes):
+        members = np.flatnonzero(codes == code)
+        take = max(1, int(round(sample_size * len(members) / len(df))))
+        positions.append(rng.choice(members, min(take, len(members)), replace=False))
+    return np.sort(np.concatenate(positions))
+
+
+def _chunked(fn, X, chunk_size):
+    """对全量数据分块调用 predict / score_samples, 内存只占一个块"""
+    return np.concatenate([fn(X[start:start + chunk_size]) for start in range(0, len(X), chunk_size)])
+
+
+def approximate_silhouette(X, labels, sample_size=5000, n_repeats=10, confidence=0.95, random_state=42):
+    """
+    抽样轮廓系数: 重复抽取 sample_size 个点计算轮廓系数 (每次 O(s²) 而非 O(n²)),
+    返回 (均值, 置信区间下限, 置信区间上限), 区间取各次抽样估计的分位数
+    """
+    from sklearn.metrics import silhouette_score
+    rng = np.random.default_rng(random_state)
+    estimates = []
+    for _ in range(n_repeats):
+        positions = rng.choice(len(X), min(sample_size, len(X)), replace=False)
+        if len(np.unique(labels[positions])) > 1:
+            estimates.append(silhouette_score(X[positions], labels[positions]))
+    if not estimates:
+        return np.nan, np.nan, np.nan
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(estimates, [tail, 1 - tail])
+    return float(np.mean(estimates)), float(low), float(high)
+
+
+def enhanced_gmm_clustering_analysis(df, large_data=None, sample_size=50000, chunk_size=200000,
+                                      silhouette_sample=5000, silhouette_repeats=10, random_state=42):
+    """
+    优化的GMM聚类分析 - 基于您的优化经验
+
+    大数据模式 (large_data=True, 默认在超过 LARGE_DATA_THRESHOLD 行时自动开启):
+    异常值检测与GMM模型选择只在分层子样本 (sample_size) 上拟合, 全量数据分块
+    (chunk_size) 执行 predict / score_samples, 轮廓系数改为抽样估计并给出置信区间
+    """
+    if large_data is None:
+        large_data = len(df) > LARGE_DATA_THRESHOLD
+    sample_pos = _stratified_sample_positions(df, sample_size, random_state=random_state) if large_data else None
+
     print('\\n🧮 第二步: 优化GMM聚类分析')
     print('-' * 50)
+    if large_data:
+        print(f'   ⚡ 大数据模式: {len(df):,} 条记录, 分层子样本 {len(sample_pos):,} 条用于拟合')
     
     # 1. 优化的数据预处理
     print('🔧 数据预处理优化:')
@@ -16,7 +73,13 @@ def enhanced_gmm_clustering_analysis(df):
     # 异常值检测和清理
     from sklearn.ensemble import IsolationForest
     iso_forest = IsolationForest(contamination=0.05, random_state=42)
-    outlier_pred = iso_forest.fit_predict(df[key_features])
+    if large_data:
+        # 子样本拟合, 全量分块预测
+        X_all = df[key_features].to_numpy(dtype=float)
+        iso_forest.fit(X_all[sample_pos])
+        outlier_pred = _chunked(iso_forest.predict, X_all, chunk_size)
+    else:
+        outlier_pred = iso_forest.fit_predict(df[key_features])
     clean_df = df[outlier_pred == 1].copy()
     
     print(f'   ✅ 异常值清理: {len(df) - len(clean_df)} 条异常记录移除')
@@ -25,7 +88,15 @@ def enhanced_gmm_clustering_analysis(df):
     # 标准化处理
     X = clean_df[key_features].values
     scaler = RobustScaler()
-    X_scaled = scaler.fit_transform(X)
+    if large_data:
+        # 在清洁数据的分层子样本上拟合 (中位数/四分位距), 全量变换
+        fit_pos = _stratified_sample_positions(clean_df, sample_size, random_state=random_state)
+        scaler.fit(X[fit_pos])
+        X_scaled = scaler.transform(X)
+        X_fit = X_scaled[fit_pos]
+    else:
+        X_scaled = scaler.fit_transform(X)
+        X_fit = X_scaled
     
     print(f'   📏 特征标准化完成: {X_scaled.shape[0]} 样本 × {X_scaled.shape[1]} 特征')
     
@@ -50,8 +121,8 @@ def enhanced_gmm_clustering_analysis(df):
             for tol in param_grid['tol']:
                 try:
                     gmm = GaussianMixture(n_components=n_comp, covariance_type=cov_type, tol=tol, random_state=42)
-                    gmm.fit(X_scaled)
-                    bic_score = gmm.bic(X_scaled)
+                    gmm.fit(X_fit)
+                    bic_score = gmm.bic(X_fit)
                     
                     if bic_score < best_bic:
                         best_bic = bic_score
@@ -65,7 +136,13 @@ def enhanced_gmm_clustering_analysis(df):
     # 3. 应用最优GMM模型
     print('\\n🔧 应用最优GMM模型:')
     gmm_optimized = GaussianMixture(**best_params, random_state=42)
-    cluster_labels = gmm_optimized.fit_predict(X_scaled)
+    if large_data:
+        # 子样本拟合, 全量分块预测簇标签与对数似然
+        gmm_optimized.fit(X_fit)
+        cluster_labels = _chunked(gmm_optimized.predict, X_scaled, chunk_size)
+        clean_df['gmm_log_likelihood'] = _chunked(gmm_optimized.score_samples, X_scaled, chunk_size)
+    else:
+        cluster_labels = gmm_optimized.fit_predict(X_scaled)
     clean_df['cluster'] = cluster_labels
     
     print(f'✅ GMM优化聚类完成: 识别出 {len(set(cluster_labels))} 个攻击模式簇')
@@ -73,8 +150,15 @@ def enhanced_gmm_clustering_analysis(df):
     # 4. 聚类质量评估
     print('\\n📊 聚类质量评估:')
     if len(set(cluster_labels)) > 1:
-        silhouette_avg = silhouette_score(X_scaled, cluster_labels)
-        print(f'   • 轮廓系数: {silhouette_avg:.3f} (>0.5表示好聚类)')
+        if large_data and len(X_scaled) > silhouette_sample:
+            # O(n²) 的精确轮廓系数在大数据上不可行: 抽样估计 + 置信区间
+            silhouette_avg, silhouette_low, silhouette_high = approximate_silhouette(
+                X_scaled, cluster_labels, silhouette_sample, silhouette_repeats, random_state=random_state)
+            print(f'   • 轮廓系数 (抽样估计, {silhouette_repeats}×{silhouette_sample:,}): {silhouette_avg:.3f} '
+                  f'[95% 区间 {silhouette_low:.3f} - {silhouette_high:.3f}] (>0.5表示好聚类)')
+        else:
+            silhouette_avg = silhouette_score(X_scaled, cluster_labels)
+            print(f'   • 轮廓系数: {silhouette_avg:.3f} (>0.5表示好聚类)')
     
     # 5. 高级分析 - 协议专业化模式
     print('\\n🔍 攻击者专业化分析:')
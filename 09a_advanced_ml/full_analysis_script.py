@@ -92,10 +92,33 @@ def create_realistic_protocol_data():
     print(f"\n✅ 数据创建完成: 总计 {len(df)} 条记录")
     return df
 
-# 执行数据创建
+def load_real_protocol_data():
+    """
+    从协议特征库读取真实特征 (protocol_feature_store), 特征库不存在时返回 None.
+    没有预言机匹配交易的时间桶 (time_diff_ms 为 NaN) 被丢弃, GMM / IsolationForest 不接受 NaN
+    """
+    import os
+    from protocol_feature_store import DEFAULT_STORE_DIR, load_protocol_features
+    if not os.path.exists(os.path.join(DEFAULT_STORE_DIR, 'manifest.json')):
+        return None
+    df = load_protocol_features(protocols=list(PROTOCOL_RISK_SCORES), min_trades=MIN_BUCKET_TRADES,
+                                drop_unmatched=True)
+    if df.empty:
+        return None
+    df['risk_score'] = df['protocol'].map(PROTOCOL_RISK_SCORES)
+    print(f"\n✅ 读取真实协议特征: {len(df)} 个 协议 × 时间桶 记录")
+    return df
+
+PROTOCOL_RISK_SCORES = {'BisonFi': 8.7, 'HumidiFi': 7.2, 'GoonFi': 6.8}
+MIN_BUCKET_TRADES = 20
+
+# 执行数据创建 (优先使用特征库中的真实特征)
 print("🎯 第一步: 创建协议特征数据")
 print("-" * 60)
-df = create_realistic_protocol_data()
+df = load_real_protocol_data()
+if df is None:
+    print("⚠️  未找到协议特征库 (先运行 protocol_feature_store.build_feature_store), 使用合成数据")
+    df = create_realistic_protocol_data()
 print(f"   BisonFi: {len(df[df['protocol'] == 'BisonFi'])} 记录 (风险评分8.7)")
 print(f"   HumidiFi: {len(df[df['protocol'] == 'HumidiFi'])} 记录 (风险评分7.2)")
 print(f"   GoonFi: {len(df[df['protocol'] == 'GoonFi'])} 记录 (风险评分6.8)")
\ No newline at end of file
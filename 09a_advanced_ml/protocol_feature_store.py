@@ -0,0 +1,300 @@
+"""
+协议 × 时间桶特征库 (Protocol Feature Store)
+
+替代 full_analysis_script.create_realistic_protocol_data 中用 np.random.normal
+合成的协议特征: 从清洗后的事件数据 (df_clean, TRADE + ORACLE) 一次向量化计算,
+物化为 parquet, 之后按槽位增量追加:
+1. 每笔交易匹配同槽位最近的预言机更新 (merge_asof), 得到 time_diff_ms 与
+   预言机回跑标记 (|Δt| < 50ms, 同07a)
+2. 槽位后期交易 (us_since_first_shred > 300ms)、机器人交易 (同槽位同签名者
+   多笔, 或已知攻击者)、洗售交易 (同槽位同签名者同协议双向成交)
+3. 按 (协议, 时间桶) 汇总为可加计数, 攻击者另存 (协议, 时间桶, 签名者) 表,
+   追加时计数相加、攻击者取并集, attacker_count 保持精确
+4. 读取时由计数得到 09a 使用的特征列 (oracle_backrun_ratio, bot_ratio,
+   time_diff_ms, late_slot_ratio, wash_trading_score, attacker_count)
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import os
+import sys
+import json
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parquet_stream import iter_parquet_chunks, DEFAULT_BATCH_SIZE
+
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'derived', 'protocol_features')
+DEFAULT_BUCKET_MS = 3_600_000          # 1小时时间桶
+ORACLE_BACKRUN_WINDOW_MS = 50          # 同07a: 距预言机更新 < 50ms
+LATE_SLOT_US = 300_000                 # 同07a: 槽位后期 > 300ms
+EVENT_COLUMNS = ['slot', 'ms_time', 'kind', 'signer', 'us_since_first_shred', 'from_token', 'to_token']
+COUNT_COLUMNS = ['trade_count', 'oracle_matched_trades', 'time_diff_sum_ms', 'oracle_backrun_trades',
+                 'late_trades', 'bot_trades', 'wash_trades']
+FEATURE_COLUMNS = ['oracle_backrun_ratio', 'bot_ratio', 'time_diff_ms', 'late_slot_ratio',
+                   'wash_trading_score', 'attacker_count']
+
+
+def _chunk_counts(events, protocol_col, bucket_ms, bot_signers):
+    """一批完整槽位的事件 -> (协议, 时间桶) 计数表 与 (协议, 时间桶, 签名者) 攻击者表"""
+    trades = events[events['kind'] == 'TRADE']
+    trades = trades[trades[protocol_col].notna()]
+    oracles = events.loc[events['kind'] == 'ORACLE', ['slot', 'ms_time']]
+    if trades.empty:
+        return None, None
+
+    # 1. 同槽位最近的预言机更新
+    trades = trades.sort_values('ms_time', kind='stable')
+    nearest = pd.merge_asof(trades[['slot', 'ms_time']].reset_index(drop=True),
+                            oracles.sort_values('ms_time').rename(columns={'ms_time': 'oracle_ms'}),
+                            left_on='ms_time', right_on='oracle_ms', by='slot', direction='nearest')
+    time_diff = (nearest['ms_time'] - nearest['oracle_ms']).abs().to_numpy(dtype=float)
+    matched = ~np.isnan(time_diff)
+
+    # 2. 交易标记
+    signer = trades['signer'].to_numpy()
+    slot_signer = trades.groupby(['slot', 'signer'], sort=False)['slot'].transform('size').to_numpy()
+    is_bot = slot_signer >= 2
+    if bot_signers is not None:
+        is_bot |= trades['signer'].isin(bot_signers).to_numpy()
+    if 'from_token' in trades.columns and 'to_token' in trades.columns:
+        direction = (trades['from_token'].astype(str) < trades['to_token'].astype(str)).astype(np.int8)
+        keys = [trades['slot'], trades['signer'], trades[protocol_col]]
+        grouped = direction.groupby(keys, sort=False)
+        is_wash = (grouped.transform('min') != grouped.transform('max')).to_numpy()
+    else:
+        is_wash = np.zeros(len(trades), dtype=bool)
+
+    flags = pd.DataFrame({
+        'protocol': trades[protocol_col].to_numpy(),
+        'bucket_ms': (trades['ms_time'].to_numpy() // bucket_ms) * bucket_ms,
+        'trade_count': 1,
+        'oracle_matched_trades': matched.astype(np.int64),
+        'time_diff_sum_ms': np.where(matched, time_diff, 0.0),
+        'oracle_backrun_trades': (matched & (time_diff < ORACLE_BACKRUN_WINDOW_MS)).astype(np.int64),
+        'late_trades': (trades['us_since_first_shred'].to_numpy() > LATE_SLOT_US).astype(np.int64),
+        'bot_trades': is_bot.astype(np.int64),
+        'wash_trades': is_wash.astype(np.int64),
+    })
+    counts = flags.groupby(['protocol', 'bucket_ms'], sort=False)[COUNT_COLUMNS].sum()
+    attackers = pd.DataFrame({'protocol': flags['protocol'][is_bot], 'bucket_ms': flags['bucket_ms'][is_bot],
+                              'signer': signer[is_bot]}).drop_duplicates()
+    return counts, attackers
+
+
+def _combine(counts_list, attackers_list):
+    counts = pd.concat(counts_list).groupby(level=['protocol', 'bucket_ms']).sum()
+    attackers = pd.concat(attackers_list, ignore_index=True).drop_duplicates(ignore_index=True)
+    return counts, attackers
+
+
+def compute_protocol_counts(
+    source,
+    protocol_col='amm_trade',
+    bucket_ms=DEFAULT_BUCKET_MS,
+    bot_signers=None,
+    min_slot=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    verbose=True
+):
+    """
+    从事件数据计算 (协议, 时间桶) 可加计数.
+
+    Parameters:
+    -----------
+    source : DataFrame or str
+        df_clean 或 parquet 路径 (需按 slot 排序; 分块读取时最后一个槽位留到下一块)
+    protocol_col : str
+        协议列 ('amm_trade')
+    bucket_ms : int
+        时间桶长度 (毫秒)
+    bot_signers : iterable or None
+        已知攻击者 (如 02 检测结果中的 attacker_signer), 其交易计为机器人交易
+    min_slot : int or None
+        只处理 slot > min_slot 的事件 (增量追加)
+    batch_size : int
+        parquet 批大小
+    verbose : bool
+        打印摘要
+
+    Returns:
+    --------
+    counts : DataFrame
+        索引 (protocol, bucket_ms), 列 COUNT_COLUMNS
+    attackers : DataFrame
+        ['protocol', 'bucket_ms', 'signer'] 去重
+    max_slot : int or None
+        已处理的最大槽位 (增量水位线)
+    """
+    columns = EVENT_COLUMNS + [protocol_col]
+    if isinstance(source, pd.DataFrame):
+        columns = [c for c in columns if c in source.columns]
+    filters = [('slot', '>', min_slot)] if min_slot is not None and not isinstance(source, pd.DataFrame) else None
+
+    counts_list, attackers_list = [], []
+    carry = None
+    max_slot = None
+    n_events = 0
+    for chunk in iter_parquet_chunks(source, columns=columns, batch_size=batch_size, filters=filters):
+        if min_slot is not None:
+            chunk = chunk[chunk['slot'] > min_slot]
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        # 槽位完整性: 最后一个槽位可能跨块, 留到下一块
+        last_slot = chunk['slot'].iat[-1]
+        tail = chunk['slot'].to_numpy() == last_slot
+        carry = chunk[tail]
+        complete = chunk[~tail]
+        if not complete.empty:
+            counts, attackers = _chunk_counts(complete, protocol_col, bucket_ms, bot_signers)
+            n_events += len(complete)
+            if counts is not None:
+                counts_list.append(counts)
+                attackers_list.append(attackers)
+    if carry is not None and not carry.empty:
+        counts, attackers = _chunk_counts(carry, protocol_col, bucket_ms, bot_signers)
+        n_events += len(carry)
+        max_slot = int(carry['slot'].iat[-1])
+        if counts is not None:
+            counts_list.append(counts)
+            attackers_list.append(attackers)
+
+    if counts_list:
+        counts, attackers = _combine(counts_list, attackers_list)
+    else:
+        counts = pd.DataFrame(columns=COUNT_COLUMNS, index=pd.MultiIndex.from_arrays(
+            [[], []], names=['protocol', 'bucket_ms']))
+        attackers = pd.DataFrame(columns=['protocol', 'bucket_ms', 'signer'])
+
+    if verbose:
+        print(f'   ✅ 处理事件: {n_events:,} 条 → {len(counts):,} 个 (协议, 时间桶) 单元')
+    return counts, attackers, max_slot
+
+
+def protocol_features(counts, attackers):
+    """由可加计数得到 09a 特征列 (每行一个 协议 × 时间桶)"""
+    trades = counts['trade_count'].clip(lower=1)
+    features = pd.DataFrame({
+        'oracle_backrun_ratio': counts['oracle_backrun_trades'] / trades,
+        'bot_ratio': counts['bot_trades'] / trades,
+        'time_diff_ms': counts['time_diff_sum_ms'] / counts['oracle_matched_trades'].replace(0, np.nan),
+        'late_slot_ratio': counts['late_trades'] / trades,
+        'wash_trading_score': counts['wash_trades'] / trades,
+        'attacker_count': attackers.groupby(['protocol', 'bucket_ms']).size()
+                                   .reindex(counts.index, fill_value=0).astype(np.int64),
+        'trade_count': counts['trade_count'].astype(np.int64),
+    }, index=counts.index)
+    features = features.reset_index()
+    features['bucket_start'] = pd.to_datetime(features['bucket_ms'], unit='ms')
+    return features.sort_values(['protocol', 'bucket_ms'], kind='stable').reset_index(drop=True)
+
+
+def _paths(store_dir):
+    return (os.path.join(store_dir, 'counts.parquet'), os.path.join(store_dir, 'attackers.parquet'),
+            os.path.join(store_dir, 'manifest.json'))
+
+
+def _write_store(store_dir, counts, attackers, manifest):
+    os.makedirs(store_dir, exist_ok=True)
+    counts_path, attackers_path, manifest_path = _paths(store_dir)
+    counts.reset_index().to_parquet(counts_path, index=False)
+    attackers.to_parquet(attackers_path, index=False)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def build_feature_store(source, store_dir=DEFAULT_STORE_DIR, protocol_col='amm_trade',
+                        bucket_ms=DEFAULT_BUCKET_MS, bot_signers=None, batch_size=DEFAULT_BATCH_SIZE, verbose=True):
+    """全量构建特征库 (覆盖已有内容), 参数同 compute_protocol_counts"""
+    if verbose:
+        print('\n🗄️  构建协议特征库')
+        print('-' * 60)
+    counts, attackers, max_slot = compute_protocol_counts(source, protocol_col, bucket_ms, bot_signers,
+                                                          batch_size=batch_size, verbose=verbose)
+    manifest = {'protocol_col': protocol_col, 'bucket_ms': int(bucket_ms), 'watermark_slot': max_slot,
+                'cells': int(len(counts)), 'trades': int(counts['trade_count'].sum())}
+    _write_store(store_dir, counts, attackers, manifest)
+    if verbose:
+        print(f'   ✓ Saved feature store to: {store_dir} (水位线 slot {max_slot})')
+    return manifest
+
+
+def append_feature_store(source, store_dir=DEFAULT_STORE_DIR, bot_signers=None,
+                         batch_size=DEFAULT_BATCH_SIZE, verbose=True):
+    """
+    增量追加: 只处理水位线之后的槽位, 计数相加、攻击者取并集.
+    新数据应包含完整槽位 (已入库槽位的事件会被跳过).
+    """
+    counts_path, attackers_path, manifest_path = _paths(store_dir)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No feature store at {store_dir}; run build_feature_store() first")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    new_counts, new_attackers, max_slot = compute_protocol_counts(
+        source, manifest['protocol_col'], manifest['bucket_ms'], bot_signers,
+        min_slot=manifest['watermark_slot'], batch_size=batch_size, verbose=verbose)
+    if max_slot is None:
+        if verbose:
+            print(f'   ℹ️  水位线 slot {manifest["watermark_slot"]} 之后没有新事件')
+        return manifest
+
+    counts = pd.read_parquet(counts_path).set_index(['protocol', 'bucket_ms'])
+    attackers = pd.read_parquet(attackers_path)
+    counts, attackers = _combine([counts, new_counts], [attackers, new_attackers])
+    manifest.update(watermark_slot=max_slot, cells=int(len(counts)), trades=int(counts['trade_count'].sum()))
+    _write_store(store_dir, counts, attackers, manifest)
+    if verbose:
+        print(f'   ✓ Appended to feature store: {store_dir} (水位线 slot {max_slot})')
+    return manifest
+
+
+def load_protocol_features(store_dir=DEFAULT_STORE_DIR, protocols=None, min_trades=1, drop_unmatched=True):
+    """
+    读取特征库 -> 每个 协议 × 时间桶 一行的特征表 (09a 的输入格式, 'protocol' 列 + FEATURE_COLUMNS)
+
+    time_diff_ms 只在时间桶内有匹配到预言机更新的交易时才有定义, 否则为 NaN.
+    09a 的 GMM / IsolationForest 不接受 NaN, 插补又会造出不存在的延迟, 所以
+    默认丢弃这些时间桶.
+
+    Parameters:
+    -----------
+    store_dir : str
+        特征库目录
+    protocols : list or None
+        只保留这些协议 (如 ['BisonFi', 'HumidiFi', 'GoonFi'])
+    min_trades : int
+        时间桶最少交易数
+    drop_unmatched : bool
+        丢弃没有预言机匹配交易 (time_diff_ms 为 NaN) 的时间桶
+    """
+    counts_path, attackers_path, _ = _paths(store_dir)
+    filters = [('protocol', 'in', list(protocols))] if protocols is not None else None
+    counts = pd.read_parquet(counts_path, filters=filters).set_index(['protocol', 'bucket_ms'])
+    attackers = pd.read_parquet(attackers_path, filters=filters)
+    features = protocol_features(counts, attackers)
+    keep = features['trade_count'] >= min_trades
+    if drop_unmatched:
+        keep &= features['time_diff_ms'].notna()
+    return features[keep].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    print("Protocol Feature Store Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from protocol_feature_store import build_feature_store, append_feature_store, load_protocol_features
+
+    build_feature_store('01_data_cleaning/outputs/pamm_clean_final.parquet')
+    append_feature_store(df_new_slots)                      # 新的完整槽位
+    df = load_protocol_features(protocols=['BisonFi', 'HumidiFi', 'GoonFi'])
+    """)
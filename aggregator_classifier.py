@@ -0,0 +1,224 @@
+"""
+Vectorized Aggregator Classifier
+
+Replaces the per-signer loop of 07c_aggregator_separation (df_trades[df_trades['signer'] == signer]
+for every signer, 100 sampled slots each) and the per-slot unique_signers / trade_count
+ratio in the 02 aggregator filter:
+1. Signers, pools and slots are factorized to integer codes
+2. Distinct pools per signer and distinct signers per slot are counted sparsely:
+   only observed (code, code) pairs are kept (np.unique on a combined int64 key)
+3. aggregator_likelihood uses every slot of a signer instead of a 100-slot sample
+4. Emits a reusable is_aggregator table (per signer) and slot diversity table
+   (per slot) that detectors join as a prefilter
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import os
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+from parquet_stream import iter_parquet_chunks, DEFAULT_BATCH_SIZE
+
+
+MIN_AGGREGATOR_POOLS = 8
+LIKELIHOOD_THRESHOLD = 0.8
+SLOT_UNIQUE_RATIO_THRESHOLD = 0.7
+
+
+def _pair_counts(left, right):
+    """
+    Row count of every observed (left, right) pair, via factorized codes.
+
+    Returns:
+    --------
+    pairs : DataFrame
+        ['left', 'right', 'n'] with original labels
+    """
+    left_codes, left_labels = pd.factorize(left)
+    right_codes, right_labels = pd.factorize(right)
+    valid = (left_codes >= 0) & (right_codes >= 0)
+    width = max(len(right_labels), 1)
+    key, n = np.unique(left_codes[valid].astype(np.int64) * width + right_codes[valid], return_counts=True)
+    return pd.DataFrame({
+        'left': left_labels.take(key // width),
+        'right': right_labels.take(key % width),
+        'n': n,
+    })
+
+
+def _accumulate(current, chunk_pairs):
+    if current is None:
+        return chunk_pairs
+    merged = pd.concat([current, chunk_pairs], ignore_index=True)
+    return merged.groupby(['left', 'right'], sort=False, as_index=False)['n'].sum()
+
+
+def _unique_by_left(pairs):
+    """Distinct right values and total rows per left value (bincount over codes)"""
+    codes, labels = pd.factorize(pairs['left'])
+    return pd.DataFrame({
+        'distinct': np.bincount(codes, minlength=len(labels)),
+        'rows': np.bincount(codes, weights=pairs['n'].to_numpy(), minlength=len(labels)).astype(np.int64),
+    }, index=labels)
+
+
+def build_aggregator_table(
+    source,
+    signer_col='signer',
+    pool_col='amm_trade',
+    slot_col='slot',
+    min_pools=MIN_AGGREGATOR_POOLS,
+    likelihood_threshold=LIKELIHOOD_THRESHOLD,
+    slot_ratio_threshold=SLOT_UNIQUE_RATIO_THRESHOLD,
+    filters=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    verbose=True
+):
+    """
+    Classify aggregators for the whole dataset in one chunked pass.
+
+    A signer is an aggregator when it touches min_pools+ distinct pools or when
+    aggregator_likelihood (share of its multi-trade slots whose
+    unique_signers / trade_count exceeds slot_ratio_threshold) exceeds
+    likelihood_threshold - the 07c rule.
+
+    Parameters:
+    -----------
+    source : str, Path or DataFrame
+        Trades (Parquet path or DataFrame); for pamm_clean_final.parquet pass
+        filters=[('kind', '==', 'TRADE')]
+    signer_col, pool_col, slot_col : str
+        Column names (pool_col='account_trade' counts individual pool accounts)
+    min_pools : int
+        Pool-count threshold (07c: 8)
+    likelihood_threshold : float
+        aggregator_likelihood threshold (07c: 0.8)
+    slot_ratio_threshold : float
+        Slot unique-signer ratio above which a slot looks like aggregator routing (02/07c: 0.7)
+    filters : list or None
+        pd.read_parquet-style filters
+    batch_size : int
+        Rows per chunk
+    verbose : bool
+        Print summary
+
+    Returns:
+    --------
+    signer_table : DataFrame
+        [signer_col, 'total_trades', 'unique_pools', 'active_slots',
+         'aggregator_likelihood', 'is_aggregator']
+    slot_table : DataFrame
+        [slot_col, 'trade_count', 'unique_signers', 'unique_ratio', 'is_aggregator_slot']
+    """
+    signer_pools = None
+    slot_signers = None
+    for chunk in iter_parquet_chunks(source, columns=[signer_col, pool_col, slot_col],
+                                     batch_size=batch_size, filters=filters):
+        signer_pools = _accumulate(signer_pools, _pair_counts(chunk[signer_col], chunk[pool_col]))
+        slot_signers = _accumulate(slot_signers, _pair_counts(chunk[slot_col], chunk[signer_col]))
+
+    empty = pd.DataFrame({'left': [], 'right': [], 'n': np.array([], dtype=np.int64)})
+    signer_pools = empty if signer_pools is None else signer_pools
+    slot_signers = empty if slot_signers is None else slot_signers
+
+    # Per-slot signer diversity
+    per_slot = _unique_by_left(slot_signers)
+    slot_table = pd.DataFrame({
+        slot_col: per_slot.index,
+        'trade_count': per_slot['rows'].to_numpy(),
+        'unique_signers': per_slot['distinct'].to_numpy(),
+    })
+    slot_table['unique_ratio'] = slot_table['unique_signers'] / slot_table['trade_count']
+    slot_table['is_aggregator_slot'] = (slot_table['trade_count'] > 1) & \
+                                       (slot_table['unique_ratio'] > slot_ratio_threshold)
+    slot_table = slot_table.sort_values(slot_col, kind='stable').reset_index(drop=True)
+
+    # aggregator_likelihood: share of a signer's multi-trade slots that look like routing
+    multi = slot_table.loc[slot_table['trade_count'] > 1, [slot_col, 'is_aggregator_slot']]
+    signer_slots = slot_signers[['left', 'right']].merge(multi, left_on='left', right_on=slot_col)
+    likelihood = signer_slots.groupby('right', sort=False)['is_aggregator_slot'].mean()
+    active_slots = _unique_by_left(slot_signers.rename(columns={'left': 'right', 'right': 'left'}))
+
+    # Distinct pools per signer
+    per_signer = _unique_by_left(signer_pools)
+    signer_table = pd.DataFrame({
+        signer_col: active_slots.index,
+        'total_trades': active_slots['rows'].to_numpy(),
+        'unique_pools': per_signer['distinct'].reindex(active_slots.index, fill_value=0).to_numpy(),
+        'active_slots': active_slots['distinct'].to_numpy(),
+        'aggregator_likelihood': likelihood.reindex(active_slots.index, fill_value=0.0).to_numpy(),
+    })
+    signer_table['is_aggregator'] = (signer_table['unique_pools'] >= min_pools) | \
+                                    (signer_table['aggregator_likelihood'] > likelihood_threshold)
+    signer_table = signer_table.sort_values(signer_col, kind='stable').reset_index(drop=True)
+
+    if verbose:
+        print("=" * 80)
+        print("AGGREGATOR CLASSIFIER")
+        print("=" * 80)
+        print(f"Signers: {len(signer_table):,}")
+        print(f"Slots: {len(slot_table):,}")
+        print(f"Aggregators: {signer_table['is_aggregator'].sum():,} "
+              f"({signer_table['is_aggregator'].mean() * 100 if len(signer_table) else 0:.2f}%)")
+        print(f"  by pool count ({min_pools}+ pools): {(signer_table['unique_pools'] >= min_pools).sum():,}")
+        print(f"  by likelihood (>{likelihood_threshold}): "
+              f"{(signer_table['aggregator_likelihood'] > likelihood_threshold).sum():,}")
+        print(f"Aggregator-routing slots (unique ratio >{slot_ratio_threshold}): "
+              f"{slot_table['is_aggregator_slot'].sum():,}")
+        print()
+
+    return signer_table, slot_table
+
+
+def exclude_aggregators(df, signer_table, signer_col='signer'):
+    """
+    Prefilter for detectors: drop rows whose signer is an aggregator.
+
+    Parameters:
+    -----------
+    df : DataFrame
+        Trades or detection results
+    signer_table : DataFrame
+        From build_aggregator_table()
+    signer_col : str
+        Signer column in df (e.g. 'attacker_signer' for detection results)
+    """
+    aggregators = signer_table.loc[signer_table['is_aggregator'], signer_table.columns[0]]
+    return df[~df[signer_col].isin(aggregators)]
+
+
+def save_aggregator_tables(signer_table, slot_table, output_dir):
+    """Write is_aggregator.parquet and slot_signer_diversity.parquet"""
+    os.makedirs(output_dir, exist_ok=True)
+    signer_path = os.path.join(output_dir, 'is_aggregator.parquet')
+    slot_path = os.path.join(output_dir, 'slot_signer_diversity.parquet')
+    signer_table.to_parquet(signer_path, index=False)
+    slot_table.to_parquet(slot_path, index=False)
+    print(f"✓ Saved aggregator table: {signer_path}")
+    print(f"✓ Saved slot diversity table: {slot_path}")
+    return signer_path, slot_path
+
+
+if __name__ == "__main__":
+    print("Aggregator Classifier Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from aggregator_classifier import build_aggregator_table, exclude_aggregators, save_aggregator_tables
+
+    signer_table, slot_table = build_aggregator_table(
+        '01_data_cleaning/outputs/pamm_clean_final.parquet',
+        filters=[('kind', '==', 'TRADE')])
+    save_aggregator_tables(signer_table, slot_table, 'outputs/aggregators')
+
+    # Prefilter before any detector
+    trades = exclude_aggregators(trades, signer_table)
+
+    # 02 routing filter: join the slot ratio instead of recomputing it per slot
+    trades = trades.merge(slot_table[['slot', 'unique_ratio']], on='slot', how='left')
+    """)
@@ -0,0 +1,252 @@
+"""
+Full-Population Attacker × Pool Density Crosstab
+
+This module replaces the per-attacker loops in 02_mev_detection
+(`for attacker in top10_attackers[:5]`, `for pool in unique_pools`,
+`attacker_slots[:100]`) with a single vectorized pass:
+1. Factorize attacker and (account_trade, amm_trade) once
+2. Aggregate trade counts, slots touched and time spans for every attacker × pool cell
+3. Store only non-empty cells (sparse long format) as Parquet
+4. Serve per-attacker drilldowns, pool density and attacker pool summaries as lookups
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+
+CROSSTAB_COLUMNS = [
+    'attacker', 'pool', 'amm', 'trade_count', 'slots_touched',
+    'first_ms_time', 'last_ms_time', 'time_span_ms'
+]
+
+
+def build_attacker_pool_crosstab(
+    trades_df,
+    attackers=None,
+    pool_col='account_trade',
+    amm_col='amm_trade',
+    pool_trades_only=True,
+    verbose=True
+):
+    """
+    Build the complete attacker × (pool, AMM) crosstab in one pass.
+
+    Parameters:
+    -----------
+    trades_df : DataFrame
+        TRADE events with columns: ['signer', 'slot', 'ms_time', pool_col, amm_col]
+        and optionally 'is_pool_trade'
+    attackers : array-like or None
+        Detected attackers (e.g. sandwich_df['attacker_signer'].unique()).
+        If None, every signer is included.
+    pool_col, amm_col : str
+        Pool and AMM columns. If pool_col is missing, the AMM is used as pool proxy
+        (same fallback as the 02 notebook).
+    pool_trades_only : bool
+        Keep only rows with is_pool_trade == True (when the column exists)
+    verbose : bool
+        Print summary
+
+    Returns:
+    --------
+    crosstab : DataFrame
+        One row per non-empty (attacker, pool, amm) cell, sorted by attacker and
+        trade_count, with columns CROSSTAB_COLUMNS
+    """
+    if pool_col not in trades_df.columns:
+        pool_col = amm_col
+
+    mask = trades_df[pool_col].notna()
+    if pool_trades_only and 'is_pool_trade' in trades_df.columns and pool_col != amm_col:
+        mask &= trades_df['is_pool_trade'] == True
+    if attackers is not None:
+        mask &= trades_df['signer'].isin(pd.Index(attackers).unique())
+    df = trades_df.loc[mask, ['signer', pool_col, amm_col, 'slot', 'ms_time']]
+
+    attacker_codes, attacker_labels = pd.factorize(df['signer'])
+    pool_codes, pool_labels = pd.factorize(pd.MultiIndex.from_arrays([df[pool_col], df[amm_col]]))
+
+    grouped = pd.DataFrame({
+        'a': attacker_codes,
+        'p': pool_codes,
+        'slot': df['slot'].to_numpy(),
+        'ms_time': df['ms_time'].to_numpy(),
+    }).groupby(['a', 'p'], sort=False).agg(
+        trade_count=('slot', 'size'),
+        slots_touched=('slot', 'nunique'),
+        first_ms_time=('ms_time', 'min'),
+        last_ms_time=('ms_time', 'max'),
+    ).reset_index()
+
+    pools = pool_labels[grouped['p'].to_numpy()] if len(grouped) else pd.MultiIndex.from_arrays([[], []])
+    crosstab = pd.DataFrame({
+        'attacker': np.asarray(attacker_labels)[grouped['a'].to_numpy()],
+        'pool': pools.get_level_values(0),
+        'amm': pools.get_level_values(1),
+        'trade_count': grouped['trade_count'].to_numpy(dtype=np.int64),
+        'slots_touched': grouped['slots_touched'].to_numpy(dtype=np.int64),
+        'first_ms_time': grouped['first_ms_time'].to_numpy(),
+        'last_ms_time': grouped['last_ms_time'].to_numpy(),
+    })
+    crosstab['time_span_ms'] = crosstab['last_ms_time'] - crosstab['first_ms_time']
+    crosstab = crosstab.sort_values(['attacker', 'trade_count'], ascending=[True, False]).reset_index(drop=True)
+
+    if verbose:
+        n_attackers = crosstab['attacker'].nunique()
+        n_pools = crosstab['pool'].nunique()
+        density = len(crosstab) / max(n_attackers * n_pools, 1)
+        print("=" * 80)
+        print("ATTACKER × POOL CROSSTAB")
+        print("=" * 80)
+        print(f"Trades aggregated: {len(df):,}")
+        print(f"Attackers: {n_attackers:,}")
+        print(f"Pools: {n_pools:,}")
+        print(f"Non-empty cells: {len(crosstab):,} ({density * 100:.3f}% dense)")
+        print()
+
+    return crosstab
+
+
+def save_attacker_pool_crosstab(crosstab, path, row_group_size=100_000):
+    """
+    Write the sparse crosstab to Parquet.
+
+    The table is sorted by attacker, so Parquet row-group statistics let
+    `load_attacker_pool_crosstab(path, attackers=[...])` skip unrelated row groups.
+    """
+    crosstab.to_parquet(path, index=False, row_group_size=row_group_size)
+    print(f"✓ Saved attacker × pool crosstab: {path} ({len(crosstab):,} cells)")
+
+
+def load_attacker_pool_crosstab(path, attackers=None):
+    """
+    Load the crosstab, optionally only the rows for the given attackers
+    (predicate pushdown on the attacker column).
+    """
+    filters = [('attacker', 'in', list(attackers))] if attackers is not None else None
+    return pd.read_parquet(path, filters=filters)
+
+
+def crosstab_offsets(crosstab):
+    """
+    Attacker → (start, end) row offsets into the attacker-sorted crosstab.
+
+    Returns:
+    --------
+    offsets : DataFrame
+        Indexed by attacker with columns ['start', 'end']
+    """
+    attackers = crosstab['attacker'].to_numpy()
+    boundaries = np.flatnonzero(attackers[1:] != attackers[:-1]) + 1
+    starts = np.concatenate([[0], boundaries]) if len(attackers) else np.array([], dtype=np.int64)
+    ends = np.concatenate([boundaries, [len(attackers)]]) if len(attackers) else np.array([], dtype=np.int64)
+    return pd.DataFrame({'start': starts, 'end': ends}, index=pd.Index(attackers[starts], name='attacker'))
+
+
+def attacker_drilldown(crosstab, attacker, offsets=None):
+    """
+    Per-attacker pool breakdown as a slice of the crosstab (no rescan of trades).
+
+    Parameters:
+    -----------
+    crosstab : DataFrame
+        Output of build_attacker_pool_crosstab()
+    attacker : str
+        Attacker signer
+    offsets : DataFrame or None
+        Precomputed crosstab_offsets(crosstab); computed on the fly if None
+
+    Returns:
+    --------
+    pools : DataFrame
+        The attacker's pools sorted by trade_count (empty if unknown attacker)
+    """
+    if offsets is None:
+        offsets = crosstab_offsets(crosstab)
+    if attacker not in offsets.index:
+        return crosstab.iloc[0:0]
+    start, end = offsets.loc[attacker, ['start', 'end']]
+    return crosstab.iloc[start:end]
+
+
+def pool_density_from_crosstab(crosstab):
+    """
+    Attackers per pool (same schema as pool_density_analysis.csv).
+
+    Returns:
+    --------
+    pool_density : DataFrame
+        ['pool', 'amm', 'attacker_count'] sorted by attacker_count
+    """
+    pool_density = crosstab.groupby(['pool', 'amm'], sort=False).size().reset_index(name='attacker_count')
+    return pool_density.sort_values('attacker_count', ascending=False).reset_index(drop=True)
+
+
+def attacker_pool_summary(crosstab, total_trades=None):
+    """
+    Per-attacker pool concentration (same schema as attacker_pool_analysis.csv).
+
+    Parameters:
+    -----------
+    crosstab : DataFrame
+        Output of build_attacker_pool_crosstab()
+    total_trades : Series or None
+        All TRADE counts per attacker (e.g. trades['signer'].value_counts());
+        defaults to the pool trade count
+
+    Returns:
+    --------
+    summary : DataFrame
+        ['attacker', 'total_trades', 'pool_trades', 'unique_pools',
+         'pools_per_trade_ratio', 'top_pool', 'top_pool_trades', 'top_pool_%']
+    """
+    offsets = crosstab_offsets(crosstab)
+    starts = offsets['start'].to_numpy()
+    counts = crosstab['trade_count'].to_numpy()
+
+    pool_trades = np.add.reduceat(counts, starts) if len(starts) else np.array([], dtype=np.int64)
+    unique_pools = (offsets['end'] - offsets['start']).to_numpy()
+    # Rows are sorted by trade_count within each attacker, so the first row is the top pool
+    top_pool = crosstab['pool'].to_numpy()[starts]
+    top_pool_trades = counts[starts]
+
+    summary = pd.DataFrame({
+        'attacker': offsets.index.to_numpy(),
+        'pool_trades': pool_trades,
+        'unique_pools': unique_pools,
+        'pools_per_trade_ratio': unique_pools / np.maximum(pool_trades, 1),
+        'top_pool': top_pool,
+        'top_pool_trades': top_pool_trades,
+        'top_pool_%': top_pool_trades / np.maximum(pool_trades, 1) * 100,
+    })
+    if total_trades is not None:
+        summary.insert(1, 'total_trades', summary['attacker'].map(total_trades).fillna(0).astype(np.int64).to_numpy())
+    else:
+        summary.insert(1, 'total_trades', summary['pool_trades'])
+    return summary.sort_values('pool_trades', ascending=False).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    print("Attacker × Pool Crosstab Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from attacker_pool_crosstab import (build_attacker_pool_crosstab, save_attacker_pool_crosstab,
+                                        attacker_drilldown, pool_density_from_crosstab,
+                                        attacker_pool_summary)
+
+    crosstab = build_attacker_pool_crosstab(trades, attackers=sandwich_df['attacker_signer'].unique())
+    save_attacker_pool_crosstab(crosstab, 'attacker_pool_crosstab.parquet')
+
+    pool_density_from_crosstab(crosstab).to_csv('pool_density_analysis.csv', index=False)
+    attacker_pool_summary(crosstab, trades['signer'].value_counts()).to_csv('attacker_pool_analysis.csv', index=False)
+
+    # Per-attacker drilldown is a slice, not a rescan
+    attacker_drilldown(crosstab, top10_attackers[0]).head(10)
+    """)
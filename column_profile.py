@@ -0,0 +1,284 @@
+"""
+Metadata-Driven Column Profiling
+
+Replaces the missing-value stage of 01a_data_cleaning_DeezNode_filters, which
+materializes the whole DataFrame and runs df.isna() over every cell:
+1. Null counts and min/max are read from Parquet row-group statistics
+2. Columns (or row groups) without usable statistics fall back to one chunked pass
+   that reads only those columns
+3. Distinct counts are estimated with a mergeable K-minimum-values sketch
+4. The missing-values heatmap is drawn from per-row-group null fractions
+   instead of a cell-level boolean matrix
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+from parquet_stream import iter_parquet_chunks, HAS_PYARROW, DEFAULT_BATCH_SIZE
+
+if HAS_PYARROW:
+    import pyarrow.parquet as pq
+
+
+PROFILE_COLUMNS = [
+    'column', 'dtype', 'rows', 'missing_count', 'missing_percentage',
+    'min', 'max', 'distinct_estimate', 'source'
+]
+KMV_SIZE = 4096
+
+
+class _KMinValues:
+    """K-minimum-values distinct-count sketch over 64-bit hashes (exact below k)"""
+
+    def __init__(self, k=KMV_SIZE):
+        self.k = k
+        self.hashes = np.array([], dtype=np.uint64)
+
+    def update(self, series):
+        series = series.dropna()
+        if series.empty:
+            return
+        try:
+            hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+        except TypeError:  # list-valued columns
+            hashes = pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy()
+        merged = np.unique(np.concatenate([self.hashes, hashes]))
+        self.hashes = merged[:self.k]
+
+    def estimate(self):
+        if len(self.hashes) < self.k:
+            return float(len(self.hashes))
+        kth = float(self.hashes[-1]) / 2.0 ** 64
+        return (self.k - 1) / kth
+
+
+def _chunk_min_max(series):
+    series = series.dropna()
+    if series.empty:
+        return None, None
+    try:
+        return series.min(), series.max()
+    except (TypeError, ValueError):  # unorderable (e.g. list-valued) columns
+        return None, None
+
+
+def _combine(current, value, fn):
+    if value is None:
+        return current
+    if current is None:
+        return value
+    try:
+        return fn(current, value)
+    except TypeError:
+        return current
+
+
+def profile_parquet(source, columns=None, distinct=False, batch_size=DEFAULT_BATCH_SIZE, verbose=True):
+    """
+    Profile columns of a Parquet file (or DataFrame) without materializing it.
+
+    Parameters:
+    -----------
+    source : str, Path or DataFrame
+        Parquet path; DataFrames are profiled in chunks (chunks act as row groups)
+    columns : list or None
+        Columns to profile (all if None)
+    distinct : bool
+        Estimate distinct counts. Parquet writers rarely store distinct_count, so
+        this usually requires the chunked pass over the profiled columns; without
+        it, files with statistics are profiled from metadata alone.
+    batch_size : int
+        Rows per chunk for DataFrame sources / the non-pyarrow fallback
+    verbose : bool
+        Print summary
+
+    Returns:
+    --------
+    profile : DataFrame
+        One row per column with PROFILE_COLUMNS; 'source' is 'metadata' or 'scan'
+    row_group_nulls : DataFrame
+        Null fraction per row group (rows) and column (columns)
+    stats : dict
+        Row groups, scanned columns and rows
+    """
+    use_metadata = HAS_PYARROW and not isinstance(source, pd.DataFrame)
+
+    if use_metadata:
+        pf = pq.ParquetFile(source)
+        metadata = pf.metadata
+        arrow_schema = pf.schema_arrow
+        columns = list(columns) if columns is not None else arrow_schema.names
+        dtypes = {c: str(arrow_schema.field(c).type) for c in columns}
+        n_row_groups = metadata.num_row_groups
+        rg_rows = np.array([metadata.row_group(i).num_rows for i in range(n_row_groups)], dtype=np.int64)
+        leaf_index = {metadata.schema.column(i).path: i for i in range(metadata.num_columns)}
+    else:
+        chunks = list(iter_parquet_chunks(source, columns=columns, batch_size=batch_size))
+        columns = list(columns) if columns is not None else (list(chunks[0].columns) if chunks else [])
+        dtypes = {c: str(chunks[0][c].dtype) if chunks else 'unknown' for c in columns}
+        n_row_groups = len(chunks)
+        rg_rows = np.array([len(c) for c in chunks], dtype=np.int64)
+
+    null_counts = np.zeros((n_row_groups, len(columns)), dtype=np.int64)
+    mins = {c: None for c in columns}
+    maxs = {c: None for c in columns}
+    distinct_estimates = {c: np.nan for c in columns}
+    source_kind = {c: 'scan' for c in columns}
+
+    # 1. Row-group statistics (flat columns only: nested leaves count nulls per element)
+    scan_columns = list(columns)
+    if use_metadata:
+        scan_columns = []
+        for j, col in enumerate(columns):
+            leaf = leaf_index.get(col)
+            if leaf is None:
+                scan_columns.append(col)
+                continue
+            col_stats = [metadata.row_group(i).column(leaf).statistics for i in range(n_row_groups)]
+            if any(s is None or not s.has_null_count for s in col_stats):
+                scan_columns.append(col)
+                continue
+            null_counts[:, j] = [s.null_count for s in col_stats]
+            if all(s.has_min_max for s in col_stats if s.num_values > 0):
+                for s in col_stats:
+                    if s.has_min_max:
+                        mins[col] = _combine(mins[col], s.min, min)
+                        maxs[col] = _combine(maxs[col], s.max, max)
+                source_kind[col] = 'metadata'
+            else:
+                scan_columns.append(col)
+                continue
+            if distinct:
+                if all(s.has_distinct_count for s in col_stats) and n_row_groups == 1:
+                    distinct_estimates[col] = float(col_stats[0].distinct_count)
+                else:
+                    scan_columns.append(col)
+
+    # 2. Chunked fallback, one row group at a time, only for columns that need it
+    sketches = {c: _KMinValues() for c in scan_columns} if distinct else {}
+    scanned_rows = 0
+    if scan_columns:
+        col_pos = {c: columns.index(c) for c in scan_columns}
+        groups = (pf.read_row_group(i, columns=scan_columns).to_pandas() for i in range(n_row_groups)) \
+            if use_metadata else (c[scan_columns] for c in chunks)
+        for i, chunk in enumerate(groups):
+            scanned_rows += len(chunk)
+            for col in scan_columns:
+                series = chunk[col]
+                if source_kind[col] == 'scan':
+                    null_counts[i, col_pos[col]] = series.isna().sum()
+                    lo, hi = _chunk_min_max(series)
+                    mins[col] = _combine(mins[col], lo, min)
+                    maxs[col] = _combine(maxs[col], hi, max)
+                if distinct:
+                    sketches[col].update(series)
+        for col, sketch in sketches.items():
+            distinct_estimates[col] = sketch.estimate()
+
+    total_rows = int(rg_rows.sum())
+    missing = null_counts.sum(axis=0)
+    profile = pd.DataFrame({
+        'column': columns,
+        'dtype': [dtypes[c] for c in columns],
+        'rows': total_rows,
+        'missing_count': missing,
+        'missing_percentage': (missing / max(total_rows, 1) * 100).round(2),
+        'min': [mins[c] for c in columns],
+        'max': [maxs[c] for c in columns],
+        'distinct_estimate': [distinct_estimates[c] for c in columns],
+        'source': [source_kind[c] for c in columns],
+    }, columns=PROFILE_COLUMNS)
+
+    row_group_nulls = pd.DataFrame(
+        null_counts / np.maximum(rg_rows, 1)[:, None],
+        columns=columns,
+        index=pd.RangeIndex(n_row_groups, name='row_group')
+    )
+
+    stats = {
+        'rows': total_rows,
+        'row_groups': n_row_groups,
+        'metadata_columns': int((profile['source'] == 'metadata').sum()),
+        'scanned_columns': len(scan_columns),
+        'scanned_rows': scanned_rows,
+    }
+
+    if verbose:
+        print("=" * 80)
+        print("COLUMN PROFILE")
+        print("=" * 80)
+        print(f"Rows: {total_rows:,} in {n_row_groups:,} row groups")
+        print(f"Columns from row-group statistics: {stats['metadata_columns']:,}")
+        print(f"Columns scanned: {stats['scanned_columns']:,}")
+        print(f"Columns with missing values: {(missing > 0).sum():,}")
+        print()
+
+    return profile, row_group_nulls, stats
+
+
+def missing_values_summary(profile):
+    """
+    missing_values_summary.csv schema: ['column', 'missing_count', 'missing_percentage']
+    """
+    summary = profile[['column', 'missing_count', 'missing_percentage']]
+    return summary.sort_values('missing_count', ascending=False).reset_index(drop=True)
+
+
+def plot_missing_heatmap(row_group_nulls, output_path, only_missing=True, show=False):
+    """
+    Missing-values heatmap from per-row-group null fractions.
+
+    Parameters:
+    -----------
+    row_group_nulls : DataFrame
+        Output of profile_parquet()
+    output_path : str
+        PNG path
+    only_missing : bool
+        Plot only columns that have missing values (like the 01a heatmap)
+    """
+    import matplotlib.pyplot as plt
+
+    data = row_group_nulls
+    if only_missing:
+        data = data.loc[:, data.sum(axis=0) > 0]
+    if data.shape[1] == 0:
+        print("No missing values - heatmap skipped")
+        return
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    image = ax.imshow(data.to_numpy(), aspect='auto', cmap='viridis', vmin=0, vmax=1, interpolation='nearest')
+    fig.colorbar(image, ax=ax, label='Missing fraction')
+    ax.set_xticks(np.arange(data.shape[1]))
+    ax.set_xticklabels(data.columns, rotation=45, ha='right')
+    ax.set_yticks([])
+    ax.set_title(f'Missing Values Heatmap ({len(data):,} row groups)\nYellow = Missing, Purple = Present',
+                 fontsize=12)
+    ax.set_xlabel('Columns', fontsize=12)
+    ax.set_ylabel('Row group', fontsize=12)
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=150, bbox_inches='tight')
+    print(f"✓ Saved missing values heatmap to: {output_path}")
+    if show:
+        plt.show()
+    else:
+        plt.close(fig)
+
+
+if __name__ == "__main__":
+    print("Column Profile Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from column_profile import profile_parquet, missing_values_summary, plot_missing_heatmap
+
+    profile, row_group_nulls, stats = profile_parquet('outputs/pamm_clean_final.parquet')
+    missing_values_summary(profile).to_csv(os.path.join(csv_dir, 'missing_values_summary.csv'), index=False)
+    plot_missing_heatmap(row_group_nulls, os.path.join(images_dir, 'missing_values_heatmap.png'))
+    """)
@@ -0,0 +1,402 @@
+"""
+Sparse Attacker × Pool Coordination Graph
+
+This module replaces the edge-by-edge NetworkX graphs built in the token pair (05)
+and pool (06) analyses with scipy.sparse matrices:
+1. Attacker × pool incidence matrix (weight = number of sandwich trades)
+2. Pool → pool transition matrix (consecutive pool jumps per attacker)
+3. Degree, weighted projection, connected components and top-k queries as sparse ops
+
+NetworkX is only used to draw the top subgraph (coordination_network.png).
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+import warnings
+warnings.filterwarnings('ignore')
+
+try:
+    import networkx as nx
+    HAS_NETWORKX = True
+except ImportError:
+    HAS_NETWORKX = False
+
+
+def _short(address, n=12):
+    """Shorten an address for node labels (same format as the 05 notebook)."""
+    address = str(address)
+    return address[:n] + '...' if len(address) > n else address
+
+
+class CoordinationGraph:
+    """
+    Attacker × pool coordination graph backed by CSR matrices.
+
+    Attributes:
+    -----------
+    attackers : ndarray
+        Attacker labels, row order of `incidence`
+    pools : ndarray
+        Pool labels, column order of `incidence`
+    incidence : csr_matrix (n_attackers × n_pools)
+        Weighted attacker → pool edges
+    transitions : csr_matrix (n_pools × n_pools)
+        Pool A → pool B jump counts (consecutive trades of the same attacker)
+    """
+
+    def __init__(self, attackers, pools, incidence, transitions):
+        self.attackers = np.asarray(attackers)
+        self.pools = np.asarray(pools)
+        self.incidence = incidence.tocsr()
+        self.transitions = transitions.tocsr()
+
+    @property
+    def n_attackers(self):
+        return len(self.attackers)
+
+    @property
+    def n_pools(self):
+        return len(self.pools)
+
+    @property
+    def n_edges(self):
+        return self.incidence.nnz
+
+    # ------------------------------------------------------------------
+    # Degree / strength
+    # ------------------------------------------------------------------
+    def attacker_degree(self):
+        """Number of distinct pools per attacker."""
+        return np.diff(self.incidence.indptr)
+
+    def pool_degree(self):
+        """Number of distinct attackers per pool."""
+        return np.bincount(self.incidence.indices, minlength=self.n_pools)
+
+    def attacker_strength(self):
+        """Total edge weight (sandwich trades) per attacker."""
+        return np.asarray(self.incidence.sum(axis=1)).ravel()
+
+    def pool_strength(self):
+        """Total edge weight (sandwich trades) per pool."""
+        return np.asarray(self.incidence.sum(axis=0)).ravel()
+
+    # ------------------------------------------------------------------
+    # Projections
+    # ------------------------------------------------------------------
+    def project(self, side='attacker', weighted=True):
+        """
+        One-mode projection of the bipartite graph.
+
+        Parameters:
+        -----------
+        side : str
+            'attacker' → attacker × attacker (shared pools),
+            'pool' → pool × pool (shared attackers)
+        weighted : bool
+            If False, entries count shared neighbours instead of summing weights
+
+        Returns:
+        --------
+        projection : csr_matrix
+            Symmetric matrix with a zero diagonal
+        """
+        B = self.incidence if weighted else (self.incidence > 0).astype(np.int64)
+        if side == 'attacker':
+            P = B @ B.T
+        elif side == 'pool':
+            P = B.T @ B
+        else:
+            raise ValueError(f"side must be 'attacker' or 'pool', got {side!r}")
+        P = P.tolil()
+        P.setdiag(0)
+        P = P.tocsr()
+        P.eliminate_zeros()
+        return P
+
+    # ------------------------------------------------------------------
+    # Components
+    # ------------------------------------------------------------------
+    def connected_components(self):
+        """
+        Connected components of the bipartite attacker-pool graph.
+
+        Returns:
+        --------
+        components : DataFrame
+            One row per component: component id, attacker count, pool count,
+            total weight, sorted by size
+        attacker_labels, pool_labels : ndarray
+            Component id for each attacker / pool
+        """
+        n_a, n_p = self.incidence.shape
+        adjacency = sparse.bmat([[None, self.incidence], [self.incidence.T, None]], format='csr')
+        _, labels = connected_components(adjacency, directed=False)
+        attacker_labels = labels[:n_a]
+        pool_labels = labels[n_a:]
+
+        n_comp = labels.max() + 1 if len(labels) else 0
+        components = pd.DataFrame({
+            'component': np.arange(n_comp),
+            'attackers': np.bincount(attacker_labels, minlength=n_comp),
+            'pools': np.bincount(pool_labels, minlength=n_comp),
+            'total_weight': np.bincount(attacker_labels, weights=self.attacker_strength(), minlength=n_comp),
+        })
+        components = components.sort_values(['attackers', 'pools'], ascending=False).reset_index(drop=True)
+        return components, attacker_labels, pool_labels
+
+    # ------------------------------------------------------------------
+    # Top-k queries
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _top_k_index(values, k):
+        k = min(k, len(values))
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        idx = np.argpartition(-values, k - 1)[:k]
+        return idx[np.argsort(-values[idx], kind='stable')]
+
+    def top_attackers(self, k=10, by='degree'):
+        """
+        Top-k attackers by distinct pools ('degree') or sandwich trades ('weight').
+
+        Returns:
+        --------
+        top : DataFrame
+            ['attacker', 'pools', 'weight']
+        """
+        degree = self.attacker_degree()
+        weight = self.attacker_strength()
+        values = degree if by == 'degree' else weight
+        idx = self._top_k_index(values.astype(float), k)
+        return pd.DataFrame({
+            'attacker': self.attackers[idx],
+            'pools': degree[idx],
+            'weight': weight[idx],
+        })
+
+    def top_pools(self, k=10, by='degree'):
+        """
+        Top-k pools by distinct attackers ('degree') or sandwich trades ('weight').
+
+        Returns:
+        --------
+        top : DataFrame
+            ['pool', 'attackers', 'weight']
+        """
+        degree = self.pool_degree()
+        weight = self.pool_strength()
+        values = degree if by == 'degree' else weight
+        idx = self._top_k_index(values.astype(float), k)
+        return pd.DataFrame({
+            'pool': self.pools[idx],
+            'attackers': degree[idx],
+            'weight': weight[idx],
+        })
+
+    def top_pool_jumps(self, k=10):
+        """
+        Most frequent pool → pool jumps.
+
+        Returns:
+        --------
+        jumps : DataFrame
+            ['from_pool', 'to_pool', 'count']
+        """
+        T = self.transitions.tocoo()
+        idx = self._top_k_index(T.data.astype(float), k)
+        return pd.DataFrame({
+            'from_pool': self.pools[T.row[idx]],
+            'to_pool': self.pools[T.col[idx]],
+            'count': T.data[idx],
+        })
+
+    def multi_pool_attackers(self, min_pools=2):
+        """
+        All attackers hitting at least `min_pools` distinct pools.
+
+        Returns:
+        --------
+        attackers : DataFrame
+            ['attacker', 'pools', 'weight'] sorted by pools
+        """
+        degree = self.attacker_degree()
+        mask = degree >= min_pools
+        result = pd.DataFrame({
+            'attacker': self.attackers[mask],
+            'pools': degree[mask],
+            'weight': self.attacker_strength()[mask],
+        })
+        return result.sort_values(['pools', 'weight'], ascending=False).reset_index(drop=True)
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def to_networkx(self, top_k=50, by='degree'):
+        """
+        Export the subgraph induced by the top-k attackers and their pools.
+
+        Only intended for drawing; all analysis stays on the sparse matrices.
+        """
+        if not HAS_NETWORKX:
+            raise ImportError("networkx is required for export. Install with: pip install networkx")
+
+        degree = self.attacker_degree()
+        values = degree if by == 'degree' else self.attacker_strength()
+        rows = self._top_k_index(values.astype(float), top_k)
+        sub = self.incidence[rows].tocoo()
+
+        G = nx.Graph()
+        for r in rows:
+            G.add_node(_short(self.attackers[r]), kind='attacker', degree=int(degree[r]))
+        for r, c, w in zip(sub.row, sub.col, sub.data):
+            pool = _short(self.pools[c])
+            if pool not in G:
+                G.add_node(pool, kind='pool')
+            G.add_edge(_short(self.attackers[rows[r]]), pool, weight=float(w))
+        return G
+
+
+def build_coordination_graph(
+    sandwiches,
+    attacker_col='attacker',
+    pool_col='pool',
+    time_col=None,
+    weight_col=None,
+    verbose=True
+):
+    """
+    Build the sparse coordination graph in one vectorized pass.
+
+    Parameters:
+    -----------
+    sandwiches : DataFrame or list of dict
+        Sandwich records, e.g. `all_sandwiches` from the 05 notebook
+        (attacker/pool/frontrun_time) or sandwich trades from 06
+        (signer/account_trade/ms_time)
+    attacker_col, pool_col : str
+        Attacker and pool columns
+    time_col : str or None
+        Time column used to order pool jumps; if None, input order is used
+    weight_col : str or None
+        Optional edge weight column (default: 1 per record)
+    verbose : bool
+        Print network statistics
+
+    Returns:
+    --------
+    graph : CoordinationGraph
+    """
+    df = pd.DataFrame(sandwiches) if not isinstance(sandwiches, pd.DataFrame) else sandwiches
+    df = df[df[attacker_col].notna() & df[pool_col].notna()]
+
+    attacker_codes, attackers = pd.factorize(df[attacker_col])
+    pool_codes, pools = pd.factorize(df[pool_col])
+    weights = df[weight_col].to_numpy(dtype=float) if weight_col else np.ones(len(df))
+
+    n_a, n_p = len(attackers), len(pools)
+    incidence = sparse.coo_matrix((weights, (attacker_codes, pool_codes)), shape=(n_a, n_p)).tocsr()
+
+    # Pool jumps: sort by (attacker, time) and pair consecutive rows of the same attacker
+    if time_col is not None:
+        order = np.lexsort((df[time_col].to_numpy(), attacker_codes))
+    else:
+        order = np.argsort(attacker_codes, kind='stable')
+    a_sorted = attacker_codes[order]
+    p_sorted = pool_codes[order]
+    jump = (a_sorted[1:] == a_sorted[:-1]) & (p_sorted[1:] != p_sorted[:-1])
+    transitions = sparse.coo_matrix(
+        (np.ones(int(jump.sum())), (p_sorted[:-1][jump], p_sorted[1:][jump])),
+        shape=(n_p, n_p)
+    ).tocsr()
+
+    graph = CoordinationGraph(np.asarray(attackers), np.asarray(pools), incidence, transitions)
+
+    if verbose:
+        degree = graph.attacker_degree()
+        print("Coordination Network Statistics:")
+        print(f"  - Attackers: {n_a:,}")
+        print(f"  - Pools: {n_p:,}")
+        print(f"  - Attacker-pool edges: {graph.n_edges:,}")
+        print(f"  - Pool jumps (edges): {transitions.nnz:,}")
+        print(f"  - Coordinated attackers (hitting multiple pools): {int((degree > 1).sum()):,}")
+        print(f"  - Average attacker degree: {degree.mean() if n_a else 0:.2f}")
+
+    return graph
+
+
+def plot_coordination_network(graph, output_path, top_k=50, by='degree', show=False):
+    """
+    Draw the top-k attacker subgraph (coordination_network.png).
+
+    Node styling follows the 05 notebook: red = multi-pool attackers,
+    teal = single-pool attackers and pools.
+    """
+    import matplotlib.pyplot as plt
+
+    G = graph.to_networkx(top_k=top_k, by=by)
+    if G.number_of_nodes() == 0 or G.number_of_edges() == 0:
+        print("⚠️  No edges to draw")
+        return None
+
+    plt.figure(figsize=(16, 12))
+    pos = nx.spring_layout(G, k=1.5, iterations=50, seed=42)
+
+    node_colors = []
+    node_sizes = []
+    for node, data in G.nodes(data=True):
+        degree = G.degree(node)
+        if data.get('kind') == 'attacker' and degree > 1:
+            node_colors.append('#FF6B6B')
+            node_sizes.append(800 + degree * 100)
+        else:
+            node_colors.append('#4ECDC4')
+            node_sizes.append(300)
+    nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=node_sizes, alpha=0.7)
+
+    weights = np.array([d['weight'] for _, _, d in G.edges(data=True)])
+    nx.draw_networkx_edges(G, pos, width=weights / max(weights.max(), 1) * 3 + 0.5, alpha=0.5, edge_color='gray')
+
+    labels = {n: n for n, d in G.nodes(data=True) if d.get('kind') == 'attacker' and G.degree(n) > 1}
+    nx.draw_networkx_labels(G, pos, labels, font_size=8, font_weight='bold')
+
+    plt.title(f'Attacker-Pool Coordination Network (Top {top_k} Attackers)\n'
+              f'(Red = Multi-Pool Attackers, Teal = Single-Pool / Pools)',
+              fontsize=14, fontweight='bold')
+    plt.axis('off')
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    print(f"✓ Saved network visualization: {output_path}")
+    if show:
+        plt.show()
+    else:
+        plt.close()
+    return G
+
+
+if __name__ == "__main__":
+    print("Sparse Coordination Graph Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from coordination_graph import build_coordination_graph, plot_coordination_network
+
+    # 05: list of sandwich dicts (attacker, pool, frontrun_time)
+    graph = build_coordination_graph(all_sandwiches, time_col='frontrun_time')
+
+    # 06: sandwich trades (signer, account_trade, ms_time)
+    graph = build_coordination_graph(sandwich_trades, attacker_col='signer',
+                                     pool_col='account_trade', time_col='ms_time')
+
+    print(graph.multi_pool_attackers().head(10))
+    print(graph.top_pool_jumps(10))
+    components, _, _ = graph.connected_components()
+
+    plot_coordination_network(graph, f'{output_dir}/coordination_network.png', top_k=50)
+    """)
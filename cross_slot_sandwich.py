@@ -0,0 +1,188 @@
+"""
+Bounded-Gap Cross-Slot Sandwich Detection
+
+Cross-slot sandwiches (2Fast Bot: front-run in slot N, back-run in slot N+M) were
+only a by-product of the fat sandwich time-window scans (slot_span > 0). This
+module finds them directly, as sorted merges over per-pool arrays (O(n log n),
+no time-window expansion):
+1. Each attacker's trades per (pool, token pair) are walked in time order; a
+   direction flip (A->B followed by B->A) pairs the last front-run with the
+   first back-run
+2. Pairs are kept when the back-run lands 1..M slots after the front-run
+3. Victims are the pool tape trades between the two legs (other signers),
+   counted from tape positions (CSR arrays, no per-detection lists)
+4. Output uses the fat sandwich result schema (victim_signers column), so
+   save_fat_sandwich_results() and victim_signers() work unchanged
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+from improved_fat_sandwich_detection import victims_column
+
+
+MAX_SLOT_GAP = 4
+MIN_SLOT_GAP = 1
+
+
+def _sorted_positions(keys, ms_time):
+    """Position of every row in the order (keys..., ms_time, row)"""
+    order = np.lexsort((ms_time,) + tuple(reversed(keys)))
+    pos = np.empty(len(order), dtype=np.int64)
+    pos[order] = np.arange(len(order))
+    return order, pos
+
+
+def detect_cross_slot_sandwiches(
+    trades_df,
+    max_slot_gap=MAX_SLOT_GAP,
+    min_slot_gap=MIN_SLOT_GAP,
+    min_victims=1,
+    same_pair_victims=True,
+    pool_col='amm_trade',
+    verbose=True
+):
+    """
+    Detect sandwiches whose legs are min_slot_gap..max_slot_gap slots apart.
+
+    Parameters:
+    -----------
+    trades_df : DataFrame
+        TRADE events with columns: ['slot', 'ms_time', 'signer', pool_col,
+                                    'from_token', 'to_token'] (+ 'validator')
+    max_slot_gap : int
+        Maximum slots between front-run and back-run (M)
+    min_slot_gap : int
+        Minimum slots between the legs (1 = cross-slot only, 0 also keeps
+        same-slot pairs)
+    min_victims : int
+        Minimum distinct victim signers between the legs
+    same_pair_victims : bool
+        Victims must trade the same token pair (True) or any pair in the pool
+    pool_col : str
+        Pool column ('amm_trade' or 'account_trade')
+    verbose : bool
+        Print summary
+
+    Returns:
+    --------
+    results_df : DataFrame
+        Fat sandwich schema (amm_trade, attacker_signer, victim_count,
+        victim_signers, total_trades, attacker_trades, start/end_slot, slot_span,
+        start/end_time_ms, actual_time_span_ms, validator) plus 'back_validator',
+        'from_token', 'to_token' (front-run direction), 'victim_trades',
+        'front_row', 'back_row' (positional rows into trades_df)
+    """
+    signer_codes, signer_labels = pd.factorize(trades_df['signer'])
+    pool_codes, _ = pd.factorize(trades_df[pool_col])
+    token_codes, tokens = pd.factorize(pd.concat([trades_df['from_token'], trades_df['to_token']], ignore_index=True))
+    from_codes = token_codes[:len(trades_df)]
+    to_codes = token_codes[len(trades_df):]
+
+    rows = np.flatnonzero((signer_codes >= 0) & (pool_codes >= 0) & (from_codes >= 0) & (to_codes >= 0))
+    signer = signer_codes[rows].astype(np.int64)
+    pool = pool_codes[rows].astype(np.int64)
+    pair, _ = pd.factorize(np.minimum(from_codes[rows], to_codes[rows]).astype(np.int64) * len(tokens)
+                           + np.maximum(from_codes[rows], to_codes[rows]))
+    direction = (from_codes[rows] < to_codes[rows]).astype(np.int8)
+    ms_time = trades_df['ms_time'].to_numpy()[rows]
+    slot = trades_df['slot'].to_numpy()[rows]
+
+    # 1. Attacker streams: (pool, pair, signer) in time order; pair at direction flips
+    stream_order, _ = _sorted_positions((pool, pair, signer), ms_time)
+    same_stream = (pool[stream_order][1:] == pool[stream_order][:-1]) & \
+                  (pair[stream_order][1:] == pair[stream_order][:-1]) & \
+                  (signer[stream_order][1:] == signer[stream_order][:-1])
+    flip = same_stream & (direction[stream_order][1:] != direction[stream_order][:-1])
+    front = stream_order[:-1][flip]
+    back = stream_order[1:][flip]
+
+    # 2. Bounded slot gap
+    gap = slot[back] - slot[front]
+    keep = (gap >= min_slot_gap) & (gap <= max_slot_gap)
+    front, back = front[keep], back[keep]
+    by_stream = np.lexsort((ms_time[front], signer[front], pool[front]))
+    front, back = front[by_stream], back[by_stream]
+
+    # 3. Victims from the pool tape: tape gap minus the attacker's own trades in between
+    tape_keys = (pool, pair) if same_pair_victims else (pool,)
+    tape_order, tape_pos = _sorted_positions(tape_keys, ms_time)
+    _, attacker_pos = _sorted_positions(tape_keys + (signer,), ms_time)
+    tape_between = tape_pos[back] - tape_pos[front] - 1
+    attacker_between = attacker_pos[back] - attacker_pos[front] - 1
+    victim_trades = tape_between - attacker_between
+
+    run_starts = np.cumsum(tape_between) - tape_between
+    between = tape_order[np.repeat(tape_pos[front] + 1 - run_starts, tape_between) + np.arange(tape_between.sum())]
+    detection = np.repeat(np.arange(len(front)), tape_between)
+    victims = pd.DataFrame({'d': detection, 'code': signer[between]})
+    victims = victims[victims['code'].to_numpy() != signer[front][detection]].drop_duplicates()
+    victims = victims.sort_values(['d', 'code'], kind='stable')
+    victim_count = np.bincount(victims['d'].to_numpy(), minlength=len(front))
+
+    n_pairs = len(front)
+    selected = victim_count >= min_victims
+    victims = victims[selected[victims['d'].to_numpy()]]
+    front, back = front[selected], back[selected]
+    tape_between, attacker_between = tape_between[selected], attacker_between[selected]
+    victim_trades, victim_count = victim_trades[selected], victim_count[selected]
+
+    results_df = pd.DataFrame({
+        'amm_trade': trades_df[pool_col].to_numpy()[rows[front]],
+        'attacker_signer': signer_labels.take(signer[front]),
+        'victim_count': victim_count,
+        'victim_signers': victims_column(victims['code'].to_numpy(), victim_count, signer_labels),
+        'total_trades': tape_between + 2,
+        'attacker_trades': attacker_between + 2,
+        'victim_trades': victim_trades,
+        'start_slot': slot[front],
+        'end_slot': slot[back],
+        'slot_span': slot[back] - slot[front],
+        'start_time_ms': ms_time[front],
+        'end_time_ms': ms_time[back],
+        'actual_time_span_ms': ms_time[back] - ms_time[front],
+        'from_token': trades_df['from_token'].to_numpy()[rows[front]],
+        'to_token': trades_df['to_token'].to_numpy()[rows[front]],
+        'front_row': rows[front],
+        'back_row': rows[back],
+    })
+    if 'validator' in trades_df.columns:
+        validator = trades_df['validator'].to_numpy()
+        results_df.insert(results_df.columns.get_loc('actual_time_span_ms') + 1, 'validator', validator[rows[front]])
+        results_df.insert(results_df.columns.get_loc('validator') + 1, 'back_validator', validator[rows[back]])
+
+    if verbose:
+        print("=" * 80)
+        print("CROSS-SLOT SANDWICH DETECTION")
+        print("=" * 80)
+        print(f"Trades scanned: {len(rows):,}")
+        print(f"Direction flips within {min_slot_gap}-{max_slot_gap} slots: {n_pairs:,}")
+        print(f"Cross-slot sandwiches (>= {min_victims} victims): {len(results_df):,}")
+        if len(results_df):
+            print(f"Unique attackers: {results_df['attacker_signer'].nunique():,}")
+            print("By slot gap:")
+            for span, count in results_df['slot_span'].value_counts().sort_index().items():
+                print(f"  {span} slot(s): {count:,}")
+        print()
+
+    return results_df
+
+
+if __name__ == "__main__":
+    print("Cross-Slot Sandwich Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from cross_slot_sandwich import detect_cross_slot_sandwiches
+    from improved_fat_sandwich_detection import victim_signers, save_fat_sandwich_results
+
+    cross_slot = detect_cross_slot_sandwiches(df_trades, max_slot_gap=4)
+    victim_signers(cross_slot, 0)
+    save_fat_sandwich_results(cross_slot, 'outputs/cross_slot_sandwiches.parquet')
+    """)
@@ -1,12 +1,35 @@
 #!/usr/bin/env python3
 """
 Extract process and results from notebooks and update notes.md files
+
+Runs incrementally by default: a manifest (.notes_manifest.json) records each
+notebook's mtime, size and content hash plus the extracted process/results, so
+unchanged notebooks are not re-parsed. Changed notebooks are parsed in a process
+pool; with ijson installed the parser streams cells and skips embedded output
+blobs (images, HTML) that extract_results_from_outputs never reads.
+
+Usage: python extract_and_update_notes.py [--full] [--workers N]
 """
+import argparse
+import hashlib
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import re
 
+try:
+    import ijson
+    HAS_IJSON = True
+    PARSE_ERRORS = (ValueError, ijson.JSONError)
+except ImportError:
+    HAS_IJSON = False
+    PARSE_ERRORS = (ValueError,)
+
+MANIFEST_NAME = '.notes_manifest.json'
+# Output data kept while parsing; everything else (image/png, text/html, ...) is skipped
+KEPT_OUTPUT_DATA = {'text/plain'}
+
 def extract_process_from_code(source_code):
     """Extract process steps from code"""
     processes = []
@@ -69,17 +92,47 @@ def extract_results_from_outputs(cell):
     
     return results[:10]  # Limit results
 
+def _prune_output_data(obj):
+    """object_hook: drop output data that extract_results_from_outputs does not use"""
+    if 'output_type' in obj and isinstance(obj.get('data'), dict):
+        obj['data'] = {k: v for k, v in obj['data'].items() if k in KEPT_OUTPUT_DATA}
+    return obj
+
+def iter_code_cells(notebook_path):
+    """Yield code cells, streaming with ijson when available"""
+    if not HAS_IJSON:
+        with open(notebook_path, 'r') as f:
+            nb = json.load(f, object_hook=_prune_output_data)
+        yield from (cell for cell in nb['cells'] if cell['cell_type'] == 'code')
+        return
+    
+    data_prefix = 'cells.item.outputs.item.data'
+    kept_prefixes = tuple(f"{data_prefix}.{key}" for key in KEPT_OUTPUT_DATA)
+    builder = None
+    with open(notebook_path, 'rb') as f:
+        for prefix, event, value in ijson.parse(f):
+            if prefix == 'cells.item' and event == 'start_map':
+                builder = ijson.ObjectBuilder()
+            if builder is None:
+                continue
+            # Skip blob keys and everything under them without materializing the strings
+            if prefix == data_prefix and event == 'map_key' and value not in KEPT_OUTPUT_DATA:
+                continue
+            if prefix.startswith(data_prefix + '.') and not prefix.startswith(kept_prefixes):
+                continue
+            builder.event(event, value)
+            if prefix == 'cells.item' and event == 'end_map':
+                cell = builder.value
+                builder = None
+                if cell.get('cell_type') == 'code':
+                    yield cell
+
 def analyze_notebook(notebook_path):
     """Analyze notebook to extract process and results"""
-    with open(notebook_path, 'r') as f:
-        nb = json.load(f)
-    
     all_processes = []
     all_results = []
     
-    code_cells = [cell for cell in nb['cells'] if cell['cell_type'] == 'code']
-    
-    for i, cell in enumerate(code_cells):
+    for i, cell in enumerate(iter_code_cells(notebook_path)):
         source = ''.join(cell.get('source', []))
         if not source.strip():
             continue
@@ -153,38 +206,116 @@ def update_notes(notes_path, notebook_name, processes, results, output_files):
     
     print(f"✅ Updated {notes_path}")
 
-def main():
+def file_sha256(path, chunk_size=1 << 20):
+    """Content hash of a notebook"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def notebook_changed(notebook_path, entry):
+    """
+    Compare a notebook against its manifest entry.
+    
+    mtime and size are checked first; the file is only hashed when they differ,
+    so a touched-but-identical notebook is still treated as unchanged.
+    Returns (changed, fingerprint).
+    """
+    st = os.stat(notebook_path)
+    fingerprint = {'notebook': Path(notebook_path).name, 'mtime': st.st_mtime, 'size': st.st_size}
+    if entry and all(entry.get(k) == v for k, v in fingerprint.items()):
+        fingerprint['sha256'] = entry['sha256']
+        return False, fingerprint
+    fingerprint['sha256'] = file_sha256(notebook_path)
+    changed = not entry or entry.get('notebook') != fingerprint['notebook'] or entry.get('sha256') != fingerprint['sha256']
+    return changed, fingerprint
+
+def load_manifest(manifest_path):
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    return {}
+
+def save_manifest(manifest_path, manifest):
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+def main(incremental=True, workers=None):
     notebooks_dir = Path(__file__).parent
+    manifest_path = notebooks_dir / MANIFEST_NAME
+    manifest = load_manifest(manifest_path) if incremental else {}
     
     # Find all notebook folders
     notebook_folders = [d for d in notebooks_dir.iterdir() if d.is_dir() and not d.name.startswith('.')]
     
     print(f"Found {len(notebook_folders)} notebook folders\n")
     
+    # Decide which notebooks need parsing
+    pending = {}
+    fingerprints = {}
     for folder in sorted(notebook_folders):
-        notebook_files = list(folder.glob("*.ipynb"))
+        notebook_files = sorted(folder.glob("*.ipynb"))
         if not notebook_files:
             continue
-        
         notebook_path = notebook_files[0]  # Take first notebook
+        entry = manifest.get(folder.name)
+        changed, fingerprint = notebook_changed(str(notebook_path), entry)
+        if not changed and entry.get('invalid'):
+            continue
+        fingerprints[folder.name] = fingerprint
+        if changed:
+            pending[folder.name] = str(notebook_path)
+    
+    print(f"Parsing {len(pending)} changed notebooks, {len(fingerprints) - len(pending)} unchanged"
+          f" ({'ijson streaming' if HAS_IJSON else 'json'} parser)")
+    
+    # Parse changed notebooks in parallel
+    parsed = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(analyze_notebook, path) for name, path in pending.items()}
+        for folder_name, future in futures.items():
+            try:
+                parsed[folder_name] = future.result()
+            except PARSE_ERRORS as e:
+                print(f"⚠️  Skipping {pending[folder_name]}: not a valid notebook ({e.__class__.__name__})")
+                # Remembered so the same file is not re-parsed until it changes
+                manifest[folder_name] = {**fingerprints.pop(folder_name), 'invalid': True}
+    
+    for folder_name, fingerprint in fingerprints.items():
+        folder = notebooks_dir / folder_name
         notes_path = folder / "notes.md"
+        entry = manifest.get(folder_name, {})
+        
+        if folder_name in parsed:
+            processes, results = parsed[folder_name]
+        else:
+            processes, results = entry['processes'], entry['results']
+        
+        # Get output files
+        output_files = get_output_files(str(folder))
+        outputs_key = [list(f) for f in output_files]
+        
+        manifest[folder_name] = {**fingerprint, 'processes': processes, 'results': results, 'outputs': outputs_key}
+        if folder_name not in parsed and entry.get('outputs') == outputs_key and notes_path.exists():
+            continue
         
         print(f"\n{'='*60}")
-        print(f"Processing: {folder.name}")
-        print(f"Notebook: {notebook_path.name}")
+        print(f"Processing: {folder_name}")
+        print(f"Notebook: {fingerprint['notebook']}")
         print(f"{'='*60}")
-        
-        # Analyze notebook
-        processes, results = analyze_notebook(str(notebook_path))
         print(f"  Found {len(processes)} process steps")
         print(f"  Found {len(results)} result outputs")
-        
-        # Get output files
-        output_files = get_output_files(str(folder))
         print(f"  Found {len(output_files)} output files")
         
         # Update notes
-        update_notes(str(notes_path), notebook_path.name, processes, results, output_files)
+        update_notes(str(notes_path), fingerprint['notebook'], processes, results, output_files)
+    
+    save_manifest(manifest_path, manifest)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Update notes.md files from notebooks")
+    parser.add_argument('--full', action='store_true', help="Ignore the manifest and re-parse every notebook")
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: CPU count)")
+    args = parser.parse_args()
+    main(incremental=not args.full, workers=args.workers)
@@ -10,12 +10,15 @@ from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
 from datetime import datetime
 import os
+import sys
+from report_build import resolve_artifact_root
 
-def create_academic_report():
+def create_academic_report(artifact_root=None, output_path=None):
     """Create academic-style PDF report"""
     
     # Create PDF document
-    output_path = "/Users/aileen/Downloads/pamm/solana-pamm-analysis/notebooks/Solana_PAMM_MEV_Analysis_Report.pdf"
+    if output_path is None:
+        output_path = str(resolve_artifact_root(artifact_root) / "Solana_PAMM_MEV_Analysis_Report.pdf")
     doc = SimpleDocTemplate(output_path, pagesize=letter,
                           rightMargin=72, leftMargin=72,
                           topMargin=72, bottomMargin=18)
@@ -470,7 +473,7 @@ def create_academic_report():
 
 if __name__ == "__main__":
     try:
-        output = create_academic_report()
+        output = create_academic_report(sys.argv[1] if len(sys.argv) > 1 else None)
         print(f"\nReport successfully created at: {output}")
     except Exception as e:
         print(f"Error generating report: {e}")
@@ -11,8 +11,9 @@ from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
 from reportlab.pdfgen import canvas
 from datetime import datetime
 import os
-import csv
+import sys
 from pathlib import Path
+from report_build import ReportAssetCache
 
 class NumberedCanvas(canvas.Canvas):
     """Custom canvas for page numbers and TOC"""
@@ -40,22 +41,30 @@ class NumberedCanvas(canvas.Canvas):
         self.drawRightString(7*inch, 0.75*inch, f"Page {page_num} of {page_count}")
         self.restoreState()
 
-def load_csv_data(csv_path, max_rows=20):
-    """Load CSV data for tables"""
-    if not os.path.exists(csv_path):
-        return None
-    try:
-        with open(csv_path, 'r') as f:
-            reader = csv.reader(f)
-            rows = list(reader)
-            return rows[:max_rows] if rows else None
-    except:
-        return None
+# Report inputs, relative to the artifact root
+FAT_SANDWICH_IMAGE = "01a_data_cleaning_DeezNode_filters/outputs/images/fat_sandwich_distribution.png"
+BOT_SIGNERS_CSV = "01a_data_cleaning_DeezNode_filters/outputs/csv/top_mev_bot_signers.csv"
+VALIDATORS_CSV = "01a_data_cleaning_DeezNode_filters/outputs/csv/top_validators_by_sandwich_count.csv"
+ATTACHMENT_IMAGES = [
+    ("Fat Sandwich Distribution", "01a_data_cleaning_DeezNode_filters/outputs/images/fat_sandwich_distribution.png"),
+    ("Top Validators by Volume", "01a_data_cleaning_DeezNode_filters/outputs/images/top_validators_by_volume.png"),
+    ("Top Validators by Sandwich Count", "01a_data_cleaning_DeezNode_filters/outputs/images/top_validators_by_sandwich_count.png"),
+    ("Top MEV Bot Signers", "01a_data_cleaning_DeezNode_filters/outputs/images/top_mev_bot_signers.png"),
+    ("Event Type Distribution", "01_data_cleaning/outputs/images/event_type_distribution.png"),
+]
 
-def create_enhanced_report():
+def create_enhanced_report(artifact_root=None, output_path=None, cache_dir=None, workers=None):
     """Create enhanced academic-style PDF report with TOC and attachments"""
     
-    output_path = "/Users/aileen/Downloads/pamm/solana-pamm-analysis/notebooks/Solana_PAMM_MEV_Analysis_Report_Enhanced.pdf"
+    # Prepare figures and tables in parallel; unchanged inputs come from the cache
+    cache = ReportAssetCache(artifact_root, cache_dir=cache_dir, workers=workers)
+    cache.prepare(images=[FAT_SANDWICH_IMAGE] + [img_path for _, img_path in ATTACHMENT_IMAGES],
+                  tables=[BOT_SIGNERS_CSV, VALIDATORS_CSV])
+    print(f"Artifact root: {cache.root}")
+    print(f"Report assets: {cache.stats['hits']} cached, {cache.stats['misses']} rendered")
+    
+    if output_path is None:
+        output_path = str(cache.root / "Solana_PAMM_MEV_Analysis_Report_Enhanced.pdf")
     doc = SimpleDocTemplate(output_path, pagesize=letter,
                           rightMargin=72, leftMargin=72,
                           topMargin=72, bottomMargin=18)
@@ -334,8 +343,8 @@ def create_enhanced_report():
     story.append(Paragraph("Monte Carlo simulations assessed MEV risk across different scenarios, evaluating sandwich risk, front-run risk, back-run risk, expected slippage, expected loss in SOL, and success rates at both pool and token pair levels.", normal_style))
     
     # Add Monte Carlo visualization if available
-    mc_image_path = "/Users/aileen/Downloads/pamm/solana-pamm-analysis/notebooks/01a_data_cleaning_DeezNode_filters/outputs/images/fat_sandwich_distribution.png"
-    if os.path.exists(mc_image_path):
+    mc_image_path = cache.image(FAT_SANDWICH_IMAGE)
+    if mc_image_path:
         try:
             img = Image(mc_image_path, width=5*inch, height=3.75*inch)
             story.append(Spacer(1, 0.2*inch))
@@ -355,8 +364,7 @@ def create_enhanced_report():
     story.append(Paragraph("Analysis of the most active MEV attackers reveals distinct patterns and strategies employed by different bots.", normal_style))
     
     # Load and display top MEV bot signers
-    bot_signers_path = "/Users/aileen/Downloads/pamm/solana-pamm-analysis/notebooks/01a_data_cleaning_DeezNode_filters/outputs/csv/top_mev_bot_signers.csv"
-    bot_data = load_csv_data(bot_signers_path, 10)
+    bot_data = (cache.table(BOT_SIGNERS_CSV) or [])[:10]
     if bot_data:
         story.append(Paragraph("8.1.1 Top 10 MEV Bot Signers by Attack Count", heading3_style))
         # Create table
@@ -391,8 +399,7 @@ def create_enhanced_report():
     story.append(Paragraph(validator_text, normal_style))
     
     # Load validator data
-    validator_path = "/Users/aileen/Downloads/pamm/solana-pamm-analysis/notebooks/01a_data_cleaning_DeezNode_filters/outputs/csv/top_validators_by_sandwich_count.csv"
-    validator_data = load_csv_data(validator_path, 15)
+    validator_data = (cache.table(VALIDATORS_CSV) or [])[:15]
     if validator_data:
         story.append(Paragraph("8.2.2 Top Validators by Sandwich Count", heading3_style))
         data = [validator_data[0]] + validator_data[1:16]
@@ -498,19 +505,11 @@ def create_enhanced_report():
     story.append(Paragraph("10.3 Visualizations", heading2_style))
     
     # Add available images
-    image_paths = [
-        ("Fat Sandwich Distribution", "01a_data_cleaning_DeezNode_filters/outputs/images/fat_sandwich_distribution.png"),
-        ("Top Validators by Volume", "01a_data_cleaning_DeezNode_filters/outputs/images/top_validators_by_volume.png"),
-        ("Top Validators by Sandwich Count", "01a_data_cleaning_DeezNode_filters/outputs/images/top_validators_by_sandwich_count.png"),
-        ("Top MEV Bot Signers", "01a_data_cleaning_DeezNode_filters/outputs/images/top_mev_bot_signers.png"),
-        ("Event Type Distribution", "01_data_cleaning/outputs/images/event_type_distribution.png"),
-    ]
-    
-    for img_name, img_path in image_paths:
-        full_path = f"/Users/aileen/Downloads/pamm/solana-pamm-analysis/notebooks/{img_path}"
-        if os.path.exists(full_path):
+    for i, (img_name, img_path) in enumerate(ATTACHMENT_IMAGES, 1):
+        full_path = cache.image(img_path)
+        if full_path:
             try:
-                story.append(Paragraph(f"10.3.{image_paths.index((img_name, img_path)) + 1} {img_name}", heading3_style))
+                story.append(Paragraph(f"10.3.{i} {img_name}", heading3_style))
                 img = Image(full_path, width=5*inch, height=3.75*inch)
                 story.append(img)
                 story.append(Spacer(1, 0.2*inch))
@@ -534,7 +533,7 @@ def create_enhanced_report():
 
 if __name__ == "__main__":
     try:
-        output = create_enhanced_report()
+        output = create_enhanced_report(sys.argv[1] if len(sys.argv) > 1 else None)
         print(f"\nEnhanced report successfully created at: {output}")
     except Exception as e:
         print(f"Error generating report: {e}")
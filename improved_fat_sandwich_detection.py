@@ -5,6 +5,9 @@ This module implements accurate fat sandwich detection using:
 1. True rolling time windows (1s, 2s, 5s, 10s)
 2. Multiple verification mechanisms
 3. Precise millisecond-based timing
+4. Victims collected as flat signer codes (one array per detection, lists built
+   once at the end; Parquet gets a list<dictionary<string>> column), confidence
+   reasons as a bitmask
 
 Author: Optimized MEV Detection System
 Date: 2026-02-04
@@ -13,9 +16,38 @@ Date: 2026-02-04
 import pandas as pd
 import numpy as np
 from collections import Counter
+from itertools import chain
 import warnings
 warnings.filterwarnings('ignore')
 
+from distinct_counters import DistinctCounter
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Unique victims are counted exactly up to this many, HyperLogLog beyond
+# (only used for legacy results whose victim_signers column holds Python lists)
+UNIQUE_VICTIMS_EXACT_THRESHOLD = 100_000
+
+# Confidence reason bits, in the order the reasons are evaluated
+CONFIDENCE_REASON_FLAGS = {
+    'low_victim_ratio': 1,
+    'multiple_attacker_trades': 2,
+    'token_pair_reversal': 4,
+    'short_window': 8,
+    'multiple_victims': 16,
+}
+# Comma-joined reason string for every bitmask value (same text as before)
+CONFIDENCE_REASON_STRINGS = [
+    ','.join(name for name, bit in CONFIDENCE_REASON_FLAGS.items() if flags & bit)
+    for flags in range(1 << len(CONFIDENCE_REASON_FLAGS))
+]
+
 
 def detect_fat_sandwich_time_window(
     trades_df,
@@ -47,7 +79,10 @@ def detect_fat_sandwich_time_window(
     Returns:
     --------
     results_df : DataFrame
-        Detected fat sandwich patterns with confidence scores
+        Detected fat sandwich patterns with confidence scores (baseline column
+        order; victim_signers holds Python lists, see victim_codes() for the
+        CSR form); confidence_flags (last column) is a CONFIDENCE_REASON_FLAGS bitmask and
+        confidence_reasons its categorical string form.
     stats : dict
         Detection statistics
     """
@@ -65,7 +100,12 @@ def detect_fat_sandwich_time_window(
     # Ensure data is sorted by time
     trades_df = trades_df.sort_values('ms_time').reset_index(drop=True)
     
+    # Signer codes for victim storage (factorized once)
+    signer_codes, signer_labels = pd.factorize(trades_df['signer'])
+    trades_df['_signer_code'] = signer_codes.astype(np.int32)
+    
     fat_sandwiches = []
+    victim_code_chunks = []
     detection_stats = {window: 0 for window in window_seconds}
     detection_stats['total_windows_checked'] = 0
     detection_stats['passed_aba_pattern'] = 0
@@ -179,34 +219,34 @@ def detect_fat_sandwich_time_window(
                 # CONFIDENCE SCORING
                 # ============================================================
                 confidence_score = 0
-                confidence_reasons = []
+                confidence_flags = 0
                 
                 # Factor 1: Low victim ratio (more concentrated attack)
                 if victim_ratio < 0.3:
                     confidence_score += 3
-                    confidence_reasons.append('low_victim_ratio')
+                    confidence_flags |= CONFIDENCE_REASON_FLAGS['low_victim_ratio']
                 elif victim_ratio < 0.5:
                     confidence_score += 2
                 
                 # Factor 2: Multiple attacker trades
                 if attacker_count >= 3:
                     confidence_score += 2
-                    confidence_reasons.append('multiple_attacker_trades')
+                    confidence_flags |= CONFIDENCE_REASON_FLAGS['multiple_attacker_trades']
                 
                 # Factor 3: Token pair reversal validated
                 if token_pair_valid and 'from_token' in window_trades.columns:
                     confidence_score += 2
-                    confidence_reasons.append('token_pair_reversal')
+                    confidence_flags |= CONFIDENCE_REASON_FLAGS['token_pair_reversal']
                 
                 # Factor 4: Short time window (more aggressive)
                 if window_sec <= 2:
                     confidence_score += 1
-                    confidence_reasons.append('short_window')
+                    confidence_flags |= CONFIDENCE_REASON_FLAGS['short_window']
                 
                 # Factor 5: Multiple victims
                 if len(unique_middle) >= 3:
                     confidence_score += 1
-                    confidence_reasons.append('multiple_victims')
+                    confidence_flags |= CONFIDENCE_REASON_FLAGS['multiple_victims']
                 
                 # Determine final confidence
                 if confidence_score >= 6:
@@ -223,11 +263,13 @@ def detect_fat_sandwich_time_window(
                 # ============================================================
                 detection_stats[window_sec] += 1
                 
+                window_victims = np.unique(window_trades['_signer_code'].to_numpy()[1:-1])
+                victim_code_chunks.append(window_victims)
+                
                 fat_sandwiches.append({
                     'amm_trade': amm_name,
                     'attacker_signer': attacker,
-                    'victim_count': len(unique_middle),
-                    'victim_signers': list(unique_middle),
+                    'victim_count': len(window_victims),
                     'total_trades': len(window_trades),
                     'attacker_trades': attacker_count,
                     'victim_ratio': victim_ratio,
@@ -242,8 +284,8 @@ def detect_fat_sandwich_time_window(
                     'validator': window_trades.iloc[0]['validator'] if 'validator' in window_trades.columns else None,
                     'confidence': confidence,
                     'confidence_score': confidence_score,
-                    'confidence_reasons': ','.join(confidence_reasons),
-                    'token_pair_validated': token_pair_valid and 'from_token' in window_trades.columns
+                    'token_pair_validated': token_pair_valid and 'from_token' in window_trades.columns,
+                    'confidence_flags': confidence_flags
                 })
                 
                 # Move to next potential window
@@ -252,6 +294,13 @@ def detect_fat_sandwich_time_window(
     
     # Convert to DataFrame
     results_df = pd.DataFrame(fat_sandwiches)
+    if len(results_df) > 0:
+        results_df['confidence_flags'] = results_df['confidence_flags'].astype(np.uint8)
+        results_df.insert(results_df.columns.get_loc('confidence_score') + 1, 'confidence_reasons',
+                          pd.Categorical.from_codes(results_df['confidence_flags'], categories=CONFIDENCE_REASON_STRINGS))
+        results_df.insert(results_df.columns.get_loc('victim_count') + 1, 'victim_signers', victims_column(
+            np.concatenate(victim_code_chunks), results_df['victim_count'], signer_labels, index=results_df.index
+        ))
     
     if verbose:
         print()
@@ -281,6 +330,121 @@ def detect_fat_sandwich_time_window(
     return results_df, detection_stats
 
 
+def victims_column(codes, counts, labels, index=None, arrow=False):
+    """
+    victim_signers column from CSR arrays: row r's victims are
+    labels[codes[sum(counts[:r]):sum(counts[:r + 1])]].
+
+    Python lists by default (same cells as the baseline, so to_csv() writes
+    "['a', 'b']"); arrow=True gives a pyarrow list<dictionary<string>> column
+    over the distinct victim labels, used for Parquet export.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    labels = np.asarray(labels, dtype=object)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    used, codes = np.unique(codes, return_inverse=True)
+    labels = labels[used]
+    if not (arrow and HAS_PYARROW):
+        values = labels[codes].tolist()
+        return pd.Series([values[offsets[r]:offsets[r + 1]] for r in range(len(counts))],
+                         index=index, name='victim_signers', dtype=object)
+    victims = pa.ListArray.from_arrays(
+        pa.array(offsets, type=pa.int32()),
+        pa.DictionaryArray.from_arrays(pa.array(codes, type=pa.int32()), pa.array(labels, type=pa.string()))
+    )
+    return pd.Series(pd.arrays.ArrowExtensionArray(victims), index=index, name='victim_signers')
+
+
+def _victim_chunks(victims):
+    """pyarrow list chunks of a victim_signers column"""
+    victims = pa.array(victims.array)
+    return victims.chunks if isinstance(victims, pa.ChunkedArray) else [victims]
+
+
+def victim_codes(results_df):
+    """
+    Victim signers of all rows as CSR arrays.
+    
+    Returns:
+    --------
+    codes : ndarray
+        Flat codes into labels, row by row
+    offsets : ndarray
+        Row r's victims are codes[offsets[r]:offsets[r + 1]]
+    labels : ndarray
+        Distinct victim signers
+    """
+    victims = results_df['victim_signers']
+    if not isinstance(victims.dtype, pd.ArrowDtype):
+        # column of Python lists (detection output)
+        counts = victims.map(len).to_numpy(dtype=np.int64)
+        flat = np.empty(counts.sum(), dtype=object)
+        flat[:] = list(chain.from_iterable(victims))
+        codes, labels = pd.factorize(flat)
+        return codes.astype(np.int32), np.concatenate([[0], np.cumsum(counts)]), np.asarray(labels, dtype=object)
+
+    # pyarrow list column: chunks (e.g. after concat) carry their own dictionaries: shift the codes
+    # into the concatenated dictionaries, then factorize those to one label set
+    counts, codes, dictionaries = [], [], []
+    base = 0
+    for chunk in _victim_chunks(victims):
+        counts.append(pc.list_value_length(chunk).fill_null(0).to_numpy(zero_copy_only=False))
+        flat = chunk.flatten()
+        if not isinstance(flat, pa.DictionaryArray):
+            flat = flat.dictionary_encode()
+        codes.append(flat.indices.to_numpy(zero_copy_only=False).astype(np.int64) + base)
+        dictionaries.append(np.asarray(flat.dictionary.to_pylist(), dtype=object))
+        base += len(flat.dictionary)
+    if not counts:
+        return np.array([], dtype=np.int32), np.zeros(1, dtype=np.int64), np.array([], dtype=object)
+    unified, labels = pd.factorize(np.concatenate(dictionaries))
+    codes = unified[np.concatenate(codes)].astype(np.int32)
+    offsets = np.concatenate([[0], np.cumsum(np.concatenate(counts))])
+    return codes, offsets, np.asarray(labels, dtype=object)
+
+
+def victim_signers(results_df, row):
+    """Victim signers of one row (positional index)"""
+    return list(results_df['victim_signers'].iat[row])
+
+
+def expand_victim_signers(results_df):
+    """victim_signers as a column of Python lists (e.g. for a pyarrow-backed column)"""
+    codes, offsets, labels = victim_codes(results_df)
+    labels = labels[codes]
+    return pd.Series([labels[offsets[r]:offsets[r + 1]].tolist() for r in range(len(results_df))],
+                     index=results_df.index, name='victim_signers')
+
+
+def save_fat_sandwich_results(results_df, path):
+    """
+    Write detection results to Parquet with victim_signers as a native
+    list<dictionary<string>> column.
+    """
+    if not HAS_PYARROW:
+        raise ImportError("pyarrow is required to write fat sandwich results")
+    if not isinstance(results_df['victim_signers'].dtype, pd.ArrowDtype):
+        codes, offsets, labels = victim_codes(results_df)
+        results_df = results_df.assign(victim_signers=victims_column(codes, np.diff(offsets), labels,
+                                                                     index=results_df.index, arrow=True))
+    # no pandas metadata: pd.read_parquet() then reads victim_signers as arrays
+    table = pa.Table.from_pandas(results_df, preserve_index=False).replace_schema_metadata(None)
+    pq.write_table(table, path)
+    print(f"✓ Saved {len(results_df):,} fat sandwich detections: {path}")
+
+
+def load_fat_sandwich_results(path):
+    """Read results written by save_fat_sandwich_results() (victim_signers as Python lists)"""
+    table = pq.read_table(path)
+    victims = table.column('victim_signers')
+    results_df = table.drop(['victim_signers']).to_pandas()
+    position = list(table.column_names).index('victim_signers')
+    results_df.insert(position, 'victim_signers', pd.Series(victims.to_pylist(), index=results_df.index,
+                                                            dtype=object))
+    return results_df
+
+
 def analyze_fat_sandwich_results(results_df, verbose=True):
     """
     Analyze detected fat sandwich patterns.
@@ -314,7 +478,16 @@ def analyze_fat_sandwich_results(results_df, verbose=True):
     # Victim statistics
     analysis['avg_victims'] = results_df['victim_count'].mean()
     analysis['max_victims'] = results_df['victim_count'].max()
-    analysis['total_unique_victims'] = len(set([v for victims in results_df['victim_signers'] for v in victims]))
+    if isinstance(results_df['victim_signers'].dtype, pd.ArrowDtype):
+        # Exact: distinct codes over the unified victim dictionary
+        codes, _, _ = victim_codes(results_df)
+        analysis['total_unique_victims'] = len(np.unique(codes))
+        analysis['total_unique_victims_exact'] = True
+    else:
+        victims = DistinctCounter(exact_threshold=UNIQUE_VICTIMS_EXACT_THRESHOLD)
+        victims.update(results_df['victim_signers'].explode())
+        analysis['total_unique_victims'] = victims.count()
+        analysis['total_unique_victims_exact'] = bool(victims.counts()['exact'].all())
     
     # Attacker statistics
     analysis['unique_attackers'] = results_df['attacker_signer'].nunique()
@@ -479,6 +652,9 @@ if __name__ == "__main__":
     # Analyze results
     analysis = analyze_fat_sandwich_results(results)
     
+    # Columnar Parquet export (victim_signers as a native list column)
+    save_fat_sandwich_results(results, 'fat_sandwich_results.parquet')
+    
     # Compare with old method
     comparison = compare_detection_methods(367162, results)
     """)
@@ -0,0 +1,256 @@
+"""
+Vectorized Bootstrap Confidence Intervals for Classification Metrics
+
+07/07a report point estimates only (results_summary.json); a CI meant looping
+over resamples in Python and re-scoring with sklearn each time. This module
+keeps the predictions fixed and resamples them as arrays:
+1. Bootstrap index sets drawn as one integer matrix per chunk (bounded memory)
+2. Per-resample row multiplicities via a single bincount, shared by every model
+   (paired bootstrap: all models see the same resamples)
+3. Confusion counts (tn, fp, fn, tp) as multiplicity x code one-hot products,
+   giving accuracy / precision / recall / F1 for all resamples at once
+4. ROC-AUC and PR-AUC (average precision) from one score sort per model:
+   per-resample weights are summed over tied-score groups and cumulated
+5. Percentile CIs for every model in results_summary.json
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import json
+import time
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+
+N_BOOTSTRAP = 2000
+CONFIDENCE = 0.95
+MAX_CHUNK_CELLS = 2 ** 24  # resamples x rows per chunk (~64MB of int32 multiplicities)
+METRICS = ['accuracy', 'precision_mev', 'recall_mev', 'f1_mev', 'roc_auc', 'pr_auc']
+
+
+def bootstrap_chunks(y_true, n_bootstrap=N_BOOTSTRAP, stratified=False, random_state=42,
+                     max_chunk_cells=MAX_CHUNK_CELLS):
+    """
+    Yield per-resample row multiplicities, a chunk of resamples at a time.
+
+    Parameters:
+    -----------
+    y_true : array-like
+        Labels (used for stratified resampling)
+    n_bootstrap : int
+        Total resamples
+    stratified : bool
+        Resample positives and negatives separately (class counts fixed)
+    random_state : int
+    max_chunk_cells : int
+        Bound on resamples x rows per chunk
+
+    Yields:
+    -------
+    weights : ndarray (chunk, n) int32
+        weights[b, i] = times row i was drawn in resample b
+    """
+    y_true = np.asarray(y_true)
+    n = len(y_true)
+    rng = np.random.default_rng(random_state)
+    chunk = max(1, min(n_bootstrap, max_chunk_cells // max(n, 1)))
+    groups = [np.flatnonzero(y_true == c) for c in np.unique(y_true)] if stratified else [np.arange(n)]
+
+    for start in range(0, n_bootstrap, chunk):
+        size = min(chunk, n_bootstrap - start)
+        # one (size x n) index matrix: each stratum draws len(stratum) rows
+        index = np.concatenate([g[rng.integers(0, len(g), size=(size, len(g)))] for g in groups], axis=1)
+        flat = (index + (np.arange(size, dtype=np.int64) * n)[:, None]).ravel()
+        yield np.bincount(flat, minlength=size * n).astype(np.int32).reshape(size, n)
+
+
+class _ScoreOrder:
+    """Score sort and tied-score groups for one model, reused for every chunk"""
+
+    def __init__(self, y_true, y_score):
+        order = np.argsort(-np.asarray(y_score, dtype=float), kind='stable')
+        sorted_scores = np.asarray(y_score, dtype=float)[order]
+        self.order = order
+        self.starts = np.flatnonzero(np.r_[True, sorted_scores[1:] != sorted_scores[:-1]])
+        self.positive = (np.asarray(y_true)[order] == 1)
+
+    def curves(self, weights):
+        """ROC-AUC and average precision per resample (weights: chunk x n)"""
+        w = weights[:, self.order]
+        pos = np.add.reduceat(w * self.positive, self.starts, axis=1).astype(float)
+        neg = np.add.reduceat(w * ~self.positive, self.starts, axis=1).astype(float)
+        total_pos = pos.sum(axis=1)
+        total_neg = neg.sum(axis=1)
+
+        # scores descending: a positive beats every negative in later groups, ties count half
+        neg_below = total_neg[:, None] - np.cumsum(neg, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roc_auc = (pos * (neg_below + 0.5 * neg)).sum(axis=1) / (total_pos * total_neg)
+            tp = np.cumsum(pos, axis=1)
+            fp = np.cumsum(neg, axis=1)
+            precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+            pr_auc = (pos * precision).sum(axis=1) / total_pos
+        return roc_auc, pr_auc
+
+
+def _confusion_metrics(weights, code_onehot):
+    """accuracy/precision/recall/F1 per resample from (tn, fp, fn, tp) counts"""
+    tn, fp, fn, tp = (weights @ code_onehot).astype(float).T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    accuracy = (tp + tn) / (tn + fp + fn + tp)
+    return {'accuracy': accuracy, 'precision_mev': precision, 'recall_mev': recall, 'f1_mev': f1}
+
+
+def bootstrap_metric_ci(
+    y_true,
+    predictions,
+    probabilities=None,
+    n_bootstrap=N_BOOTSTRAP,
+    confidence=CONFIDENCE,
+    stratified=False,
+    random_state=42,
+    max_chunk_cells=MAX_CHUNK_CELLS,
+    verbose=True
+):
+    """
+    Percentile bootstrap CIs for every model's metrics on fixed predictions.
+
+    Parameters:
+    -----------
+    y_true : array-like
+        Test labels (1 = MEV)
+    predictions : dict
+        Model name -> predicted labels (07/07a `predictions`)
+    probabilities : dict or None
+        Model name -> MEV scores (07/07a `probabilities`); enables roc_auc/pr_auc
+    n_bootstrap : int
+        Resamples (shared by all models)
+    confidence : float
+        CI level
+    stratified : bool
+        Keep class counts fixed in each resample
+    random_state : int
+    max_chunk_cells : int
+        Memory bound for the multiplicity matrix
+    verbose : bool
+        Print summary
+
+    Returns:
+    --------
+    ci_df : DataFrame
+        One row per (model, metric): estimate, ci_low, ci_high, std, n_valid
+    """
+    started = time.perf_counter()
+    y_true = np.asarray(y_true).astype(int)
+    probabilities = probabilities or {}
+    n = len(y_true)
+    full = np.ones((1, n), dtype=np.int32)
+
+    models = {}
+    for name, y_pred in predictions.items():
+        code = 2 * y_true + (np.asarray(y_pred).astype(int) == 1)   # 0 tn, 1 fp, 2 fn, 3 tp
+        onehot = np.zeros((n, 4), dtype=np.int32)
+        onehot[np.arange(n), code] = 1
+        order = _ScoreOrder(y_true, probabilities[name]) if name in probabilities else None
+        models[name] = (onehot, order)
+
+    samples = {name: {metric: [] for metric in METRICS} for name in models}
+    for weights in bootstrap_chunks(y_true, n_bootstrap, stratified, random_state, max_chunk_cells):
+        for name, (onehot, order) in models.items():
+            for metric, values in _confusion_metrics(weights, onehot).items():
+                samples[name][metric].append(values)
+            if order is not None:
+                roc_auc, pr_auc = order.curves(weights)
+                samples[name]['roc_auc'].append(roc_auc)
+                samples[name]['pr_auc'].append(pr_auc)
+
+    tail = (1 - confidence) / 2
+    rows = []
+    for name, (onehot, order) in models.items():
+        estimates = _confusion_metrics(full, onehot)
+        if order is not None:
+            estimates['roc_auc'], estimates['pr_auc'] = order.curves(full)
+        for metric in METRICS:
+            if not samples[name][metric]:
+                continue
+            values = np.concatenate(samples[name][metric])
+            valid = values[np.isfinite(values)]
+            low, high = np.quantile(valid, [tail, 1 - tail]) if len(valid) else (np.nan, np.nan)
+            rows.append({'model': name, 'metric': metric, 'estimate': float(estimates[metric][0]),
+                         'ci_low': low, 'ci_high': high, 'std': valid.std() if len(valid) else np.nan,
+                         'n_valid': len(valid)})
+    ci_df = pd.DataFrame(rows)
+
+    if verbose:
+        print("=" * 80)
+        print("BOOTSTRAP METRIC CONFIDENCE INTERVALS")
+        print("=" * 80)
+        print(f"Test rows: {n:,} ({y_true.sum():,} MEV) | resamples: {n_bootstrap:,} | "
+              f"{confidence:.0%} percentile CI{' (stratified)' if stratified else ''}")
+        for name, group in ci_df.groupby('model', sort=False):
+            print(f"\n{name}:")
+            for row in group.itertuples():
+                print(f"  - {row.metric:<14} {row.estimate:.4f}  [{row.ci_low:.4f}, {row.ci_high:.4f}]")
+        print(f"\nComputed in {time.perf_counter() - started:.2f}s")
+        print()
+
+    return ci_df
+
+
+def results_summary_ci(summary_path, y_true, predictions, probabilities=None, output_path=None, **kwargs):
+    """
+    CIs for every model listed in results_summary.json.
+
+    Checks that the recomputed point estimates match the saved ones and, if
+    output_path is given, writes the summary with a 'confidence_intervals'
+    section per model.
+    """
+    with open(summary_path) as f:
+        summary = json.load(f)
+    names = [name for name in summary.get('models', {}) if name in predictions]
+    missing = sorted(set(summary.get('models', {})) - set(names))
+    if missing:
+        print(f"⚠️  No predictions for: {', '.join(missing)}")
+
+    ci_df = bootstrap_metric_ci(y_true, {name: predictions[name] for name in names},
+                                {name: probabilities[name] for name in names if probabilities and name in probabilities},
+                                **kwargs)
+    for name, group in ci_df.groupby('model', sort=False):
+        saved = summary['models'][name]
+        differs = [row.metric for row in group.itertuples()
+                   if saved.get(row.metric) is not None and not np.isclose(saved[row.metric], row.estimate, atol=1e-6)]
+        if differs:
+            print(f"⚠️  {name}: recomputed {', '.join(differs)} differ from the saved summary")
+
+    if output_path:
+        for name, group in ci_df.groupby('model', sort=False):
+            summary['models'][name]['confidence_intervals'] = {
+                row.metric: [row.ci_low, row.ci_high] for row in group.itertuples()}
+        summary['confidence_intervals'] = {'n_bootstrap': kwargs.get('n_bootstrap', N_BOOTSTRAP),
+                                           'confidence': kwargs.get('confidence', CONFIDENCE)}
+        with open(output_path, 'w') as f:
+            json.dump(summary, f, indent=2, default=str)
+        print(f"✓ Saved results with confidence intervals to: {output_path}")
+
+    return ci_df
+
+
+if __name__ == "__main__":
+    print("Metrics CI Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from metrics_ci import bootstrap_metric_ci, results_summary_ci
+
+    # 07a, after the evaluation cell (predictions / probabilities dicts)
+    ci_df = results_summary_ci('derived/ml_results_binary/results_summary.json',
+                               y_test, predictions, probabilities,
+                               output_path='derived/ml_results_binary/results_summary_ci.json')
+    """)
@@ -0,0 +1,304 @@
+"""
+Vectorized, Rate-Limited MEV Alert Engine
+
+This module is the batch counterpart of `MEVAlertSystem` in 08_monte_carlo_risk.
+Instead of checking one summary dict at a time and sorting alerts with
+`['CRITICAL', ...].index(...)`, it:
+1. Evaluates every threshold rule over a whole grouped-results DataFrame at once
+2. Keeps the highest severity per (group, rule) key (same dedup rule as MEVAlertSystem)
+3. Rate-limits repeated alerts per (group, rule) key, letting escalations through
+4. Appends emitted alerts to a rotating JSONL sink in batches
+
+Designed for per-slot risk updates across all validators.
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import numpy as np
+import json
+import os
+import time
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+
+SEVERITY_ORDER = ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW']
+
+# Same thresholds as MEVAlertSystem in 08_monte_carlo_risk
+DEFAULT_THRESHOLDS = {
+    'CRITICAL': {'sandwich_rate': 0.30, 'frontrun_prob': 0.50, 'expected_loss_usd': 10.0, 'p99_loss_usd': 50.0, 'success_rate': 0.50},
+    'HIGH':     {'sandwich_rate': 0.15, 'frontrun_prob': 0.30, 'expected_loss_usd': 5.0,  'p99_loss_usd': 25.0, 'success_rate': 0.70},
+    'MEDIUM':   {'sandwich_rate': 0.05, 'frontrun_prob': 0.15, 'expected_loss_usd': 2.0,  'p99_loss_usd': 10.0, 'success_rate': 0.85},
+    'LOW':      {'sandwich_rate': 0.02, 'frontrun_prob': 0.05, 'expected_loss_usd': 0.5,  'p99_loss_usd': 5.0,  'success_rate': 0.90},
+}
+
+# (alert type, summary column, threshold key, direction, message template)
+ALERT_RULES = [
+    ('SANDWICH_RISK', 'sandwich_rate', 'sandwich_rate', 'ge', "{severity}: Sandwich attack risk is {value:.1%} (threshold: {threshold:.1%})"),
+    ('FRONTRUN_RISK', 'mean_frontrun_prob', 'frontrun_prob', 'ge', "{severity}: Front-run risk is {value:.1%} (threshold: {threshold:.1%})"),
+    ('EXPECTED_LOSS', 'mean_loss_usd', 'expected_loss_usd', 'ge', "{severity}: Expected loss is ${value:.2f} (threshold: ${threshold:.2f})"),
+    ('WORST_CASE_LOSS', 'p99_loss_usd', 'p99_loss_usd', 'ge', "{severity}: Worst-case loss (p99) is ${value:.2f} (threshold: ${threshold:.2f})"),
+    ('LOW_SUCCESS_RATE', 'success_rate', 'success_rate', 'le', "{severity}: Swap success rate is {value:.1%} (threshold: {threshold:.1%})"),
+]
+
+ALERT_COLUMNS = ['group', 'severity', 'type', 'metric', 'value', 'threshold', 'message', 'timestamp', 'context']
+
+
+class RotatingJSONLSink:
+    """
+    Append-only JSONL file that rotates to `<path>.1 ... <path>.N` when it
+    exceeds `max_bytes`. Each `write` call appends one batch with a single
+    file open.
+    """
+
+    def __init__(self, path='outputs/alerts/mev_alerts.jsonl', max_bytes=50 * 1024 * 1024, backup_count=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def write(self, alerts_df):
+        """Append a batch of alerts. Returns the number of records written."""
+        if len(alerts_df) == 0:
+            return 0
+        payload = alerts_df.to_json(orient='records', lines=True, date_format='iso', default_handler=str)
+        if not payload.endswith('\n'):
+            payload += '\n'
+        if os.path.exists(self.path) and os.path.getsize(self.path) + len(payload) > self.max_bytes:
+            self._rotate()
+        with open(self.path, 'a') as f:
+            f.write(payload)
+        return len(alerts_df)
+
+
+class VectorizedAlertEngine:
+    """
+    Threshold alerting over grouped Monte Carlo summaries.
+
+    Parameters:
+    -----------
+    alert_thresholds : dict or None
+        Severity → {threshold key: value}; defaults to the 08 notebook thresholds
+    cooldown_seconds : float
+        Minimum time between two alerts for the same (group, rule) key.
+        An alert with higher severity than the last emitted one is never suppressed.
+    sink : RotatingJSONLSink or None
+        Where emitted alerts are appended (None = keep in memory only)
+    """
+
+    def __init__(self, alert_thresholds=None, cooldown_seconds=300.0, sink=None):
+        self.thresholds = alert_thresholds if alert_thresholds is not None else DEFAULT_THRESHOLDS
+        self.cooldown_seconds = cooldown_seconds
+        self.sink = sink
+        self.alerts = pd.DataFrame(columns=ALERT_COLUMNS)
+        # (group, type) → last emitted time and severity rank
+        self._last_emitted = pd.DataFrame(
+            {'last_time': pd.Series(dtype=float), 'last_rank': pd.Series(dtype=np.int64)},
+            index=pd.MultiIndex.from_arrays([[], []], names=['group', 'type'])
+        )
+        self.stats = {'evaluated_rows': 0, 'raw_alerts': 0, 'suppressed': 0, 'emitted': 0}
+
+    def _threshold_matrix(self, threshold_key):
+        return np.array([self.thresholds[s][threshold_key] for s in SEVERITY_ORDER], dtype=float)
+
+    def evaluate_frame(self, grouped_df, group_col, context_col=None, now=None):
+        """
+        Evaluate all rules over all rows at once.
+
+        Parameters:
+        -----------
+        grouped_df : DataFrame
+            One row per group (e.g. run_grouped_monte_carlo_optimized output)
+            with the summary metric columns
+        group_col : str
+            Group key column ('validator', 'pool', 'amm_trade', 'token_pair', ...)
+        context_col : str or None
+            Optional column copied into each alert's context
+        now : float or None
+            Evaluation time in epoch seconds (default: time.time()); pass the
+            slot time when replaying per-slot updates
+
+        Returns:
+        --------
+        alerts : DataFrame
+            Highest-severity alert per (group, rule), before rate limiting,
+            sorted by severity
+        """
+        now = time.time() if now is None else float(now)
+        n = len(grouped_df)
+        groups = grouped_df[group_col].to_numpy()
+        frames = []
+
+        for alert_type, column, threshold_key, direction, template in ALERT_RULES:
+            if column in grouped_df.columns:
+                values = grouped_df[column].to_numpy(dtype=float)
+            elif column == 'p99_loss_usd' and 'mean_loss_usd' in grouped_df.columns:
+                # Same fallback as MEVAlertSystem.evaluate_risk
+                values = grouped_df['mean_loss_usd'].to_numpy(dtype=float) * 3
+            else:
+                continue
+
+            thresholds = self._threshold_matrix(threshold_key)
+            hits = values[:, None] >= thresholds[None, :] if direction == 'ge' else values[:, None] <= thresholds[None, :]
+            # First matching severity in CRITICAL → LOW order = highest severity
+            fired = hits.any(axis=1)
+            rank = np.argmax(hits, axis=1)
+            rows = np.flatnonzero(fired & ~np.isnan(values))
+            if len(rows) == 0:
+                continue
+
+            frames.append(pd.DataFrame({
+                'group': groups[rows],
+                'rank': rank[rows],
+                'type': alert_type,
+                'metric': column,
+                'value': values[rows],
+                'threshold': thresholds[rank[rows]],
+                'context': grouped_df[context_col].to_numpy()[rows] if context_col else None,
+                '_template': template,
+            }))
+
+        self.stats['evaluated_rows'] += n
+        if not frames:
+            return pd.DataFrame(columns=ALERT_COLUMNS + ['rank'])
+
+        alerts = pd.concat(frames, ignore_index=True)
+        # Dedup within the batch: keep highest severity per (group, type)
+        alerts = alerts.sort_values('rank', kind='stable').drop_duplicates(['group', 'type'], keep='first')
+        alerts['severity'] = np.asarray(SEVERITY_ORDER)[alerts['rank'].to_numpy()]
+        alerts['message'] = [
+            t.format(severity=s, value=v, threshold=th)
+            for t, s, v, th in zip(alerts['_template'], alerts['severity'], alerts['value'], alerts['threshold'])
+        ]
+        alerts['timestamp'] = datetime.fromtimestamp(now).isoformat()
+        alerts['_time'] = now
+        self.stats['raw_alerts'] += len(alerts)
+        return alerts.drop(columns='_template').reset_index(drop=True)
+
+    def rate_limit(self, alerts):
+        """
+        Drop alerts whose (group, type) key fired within the cooldown window,
+        unless the severity escalated. Updates the emission state.
+        """
+        if len(alerts) == 0:
+            return alerts
+        keys = pd.MultiIndex.from_arrays([alerts['group'].to_numpy(), alerts['type'].to_numpy()], names=['group', 'type'])
+        last = self._last_emitted.reindex(keys)
+        last_time = last['last_time'].to_numpy()
+        last_rank = last['last_rank'].to_numpy(dtype=float)
+
+        new_key = np.isnan(last_time)
+        cooled = (alerts['_time'].to_numpy() - last_time) >= self.cooldown_seconds
+        escalated = alerts['rank'].to_numpy() < last_rank
+        keep = new_key | cooled | escalated
+
+        emitted = alerts[keep]
+        self.stats['suppressed'] += int((~keep).sum())
+
+        update = pd.DataFrame(
+            {'last_time': emitted['_time'].to_numpy(), 'last_rank': emitted['rank'].to_numpy()},
+            index=keys[keep]
+        )
+        self._last_emitted = pd.concat([self._last_emitted[~self._last_emitted.index.isin(update.index)], update])
+        return emitted
+
+    def process(self, grouped_df, group_col, context_col=None, now=None):
+        """
+        Evaluate, rate-limit and sink one batch of grouped results.
+
+        Returns:
+        --------
+        emitted : DataFrame
+            Alerts emitted for this batch (ALERT_COLUMNS), sorted by severity
+        """
+        alerts = self.evaluate_frame(grouped_df, group_col, context_col=context_col, now=now)
+        emitted = self.rate_limit(alerts)
+        emitted = emitted[ALERT_COLUMNS].reset_index(drop=True)
+        if group_col not in emitted.columns:
+            # Same per-group tag MEVAlertSystem users add (alert[group_by] = ...)
+            emitted[group_col] = emitted['group']
+
+        self.alerts = emitted
+        self.stats['emitted'] += len(emitted)
+        if self.sink is not None:
+            self.sink.write(emitted)
+        return emitted
+
+    def _alert_records(self):
+        """Last batch as JSON-ready alert dicts"""
+        return json.loads(self.alerts.to_json(orient='records', date_format='iso', default_handler=str))
+
+    def get_alerts_summary(self, records=None):
+        """Alerts of the last batch grouped by severity (CRITICAL → LOW), as MEVAlertSystem."""
+        records = self._alert_records() if records is None else records
+        summary = {severity: [] for severity in SEVERITY_ORDER}
+        for alert in records:
+            summary[alert['severity']].append(alert)
+        return {severity: alerts for severity, alerts in summary.items() if alerts}
+
+    def save_alerts(self, filepath='outputs/alerts/mev_alerts.json'):
+        """Save the last batch in the same JSON layout as MEVAlertSystem.save_alerts."""
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        records = self._alert_records()
+        with open(filepath, 'w') as f:
+            json.dump({
+                'alerts': records,
+                'summary': self.get_alerts_summary(records),
+                'total_alerts': len(records),
+                'timestamp': datetime.now().isoformat()
+            }, f, indent=2)
+        print(f"✓ Saved {len(records)} alerts to {filepath}")
+
+    def print_alerts(self, max_per_severity=10):
+        """Print the last batch grouped by severity."""
+        if len(self.alerts) == 0:
+            print("✓ No MEV risk alerts - swap appears safe")
+            return
+        print("\n" + "=" * 80)
+        print("MEV RISK ALERTS")
+        print("=" * 80)
+        for severity, group in self.alerts.groupby(
+            pd.Categorical(self.alerts['severity'], categories=SEVERITY_ORDER, ordered=True), observed=True
+        ):
+            print(f"\n{severity} RISK ({len(group)} alerts)")
+            print("-" * 80)
+            for _, alert in group.head(max_per_severity).iterrows():
+                print(f"  ⚠️  [{alert['group']}] {alert['message']}")
+            if len(group) > max_per_severity:
+                print(f"  ... and {len(group) - max_per_severity} more")
+        print("\n" + "=" * 80)
+
+
+if __name__ == "__main__":
+    print("Vectorized MEV Alert Engine Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from mev_alert_engine import VectorizedAlertEngine, RotatingJSONLSink
+
+    engine = VectorizedAlertEngine(
+        cooldown_seconds=60,
+        sink=RotatingJSONLSink('outputs/alerts/mev_alerts.jsonl', max_bytes=50 * 1024 * 1024)
+    )
+
+    # One call per grouped result frame (e.g. per-slot risk update across all validators)
+    grouped_df = run_grouped_monte_carlo_optimized(trades, 'validator', enable_alerting=False)
+    emitted = engine.process(grouped_df, group_col='validator', now=slot_time)
+    engine.print_alerts()
+    """)
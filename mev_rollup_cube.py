@@ -0,0 +1,331 @@
+"""
+Materialized MEV Rollup Cube
+
+Most 02_mev_detection CSV outputs are different group-bys of the same detections
+(per_pamm_all_mev_with_validator.csv, mev_trades_bots_per_validator.csv,
+mev_confidence_breakdown.csv, top validators / pools), each recomputed from
+all_mev with its own merges. This module aggregates the detections once:
+1. Cube cells at the finest grain (amm_trade x validator x pool x hour x type x
+   confidence) with additive measures: detections, victims, estimated
+   profit/cost (02's per-type SOL estimates)
+2. Distinct attackers per cell as (cell, attacker hash) pairs; coarser rollups
+   count them through GroupedDistinct (exact, HyperLogLog for large groups)
+3. An attacker table (amm_trade x attacker x type) for the per-attacker output
+4. rollup(by, columns, where) answers any coarser group-by from the cube, and
+   the 02 CSVs are regenerated from it
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import os
+import json
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+from distinct_counters import GroupedDistinct, hash_values
+
+
+CUBE_DIMENSIONS = ['amm_trade', 'validator', 'pool', 'hour_slot', 'type', 'confidence']
+CUBE_MEASURES = ['detections', 'victims', 'est_profit_sol', 'est_cost_sol']
+MEV_TYPES = ['fat_sandwich', 'sandwich', 'front_running', 'back_running']
+SANDWICH_TYPES = ['fat_sandwich', 'sandwich']
+SLOTS_PER_HOUR = 9000  # 400ms slots
+
+# 02_mev_detection SOL estimates: a complete sandwich is two sandwich rows
+SANDWICH_PROFIT_SOL = 0.01
+SANDWICH_COST_SOL = 0.001
+SINGLE_LEG_PROFIT_SOL = 0.002
+SINGLE_LEG_COST_SOL = 0.0005
+
+
+class MEVRollupCube:
+    """
+    Cube cells, per-cell attacker hashes and the attacker table.
+
+    Build with build_rollup_cube(); persist with save()/load_rollup_cube().
+    """
+
+    def __init__(self, cells, attacker_pairs, attackers):
+        self.cells = cells
+        self.attacker_pairs = attacker_pairs
+        self.attackers = attackers
+
+    def _select(self, where):
+        mask = np.ones(len(self.cells), dtype=bool)
+        for column, allowed in (where or {}).items():
+            allowed = [allowed] if np.isscalar(allowed) else list(allowed)
+            mask &= self.cells[column].isin(allowed).to_numpy()
+        return mask
+
+    def rollup(self, by, columns=None, where=None, measures=CUBE_MEASURES, distinct=True, exact=False):
+        """
+        Coarser group-by answered from the cube.
+
+        Parameters:
+        -----------
+        by : str or list
+            Dimensions to keep (any subset of CUBE_DIMENSIONS, [] for a grand total)
+        columns : str or None
+            Dimension to pivot into columns (detection counts), e.g. 'confidence'
+        where : dict or None
+            {dimension: value or list of values} filters
+        measures : list
+            Additive measures to sum
+        distinct : bool
+            Add 'unique_attackers' (distinct attacker_signer per group)
+        exact : bool
+            Exact distinct counts (default: HyperLogLog above 1024 attackers per group)
+
+        Returns:
+        --------
+        result : DataFrame
+            One row per group: by + measures (+ unique_attackers), or the pivot
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        mask = self._select(where)
+        cells = self.cells[mask]
+
+        if columns is not None:
+            pivot = cells.groupby(by + [columns], observed=True)['detections'].sum().unstack(fill_value=0)
+            pivot.columns.name = columns
+            return pivot
+
+        if by:
+            result = cells.groupby(by, observed=True)[list(measures)].sum()
+        else:
+            result = cells[list(measures)].sum().to_frame().T.astype(cells[list(measures)].dtypes.to_dict())
+        if distinct:
+            result['unique_attackers'] = self._distinct_attackers(mask, by, exact).reindex(
+                result.index, fill_value=0) if by else self._distinct_attackers(mask, by, exact)
+        return result.reset_index() if by else result.reset_index(drop=True)
+
+    def _distinct_attackers(self, mask, by, exact=False):
+        """Distinct attackers per group from the (cell, attacker hash) pairs"""
+        cell_ids = np.flatnonzero(mask)
+        pairs = self.attacker_pairs[np.isin(self.attacker_pairs['cell'].to_numpy(), cell_ids)]
+        if not by:
+            return np.int64(pairs['attacker_hash'].nunique())
+        keys = self.cells[by].iloc[pairs['cell'].to_numpy()].reset_index(drop=True)
+        if exact:
+            return pairs['attacker_hash'].groupby([keys[col].to_numpy() for col in by]).nunique().rename_axis(by)
+        counter = GroupedDistinct()
+        counter.update(keys if len(by) > 1 else keys[by[0]], pairs['attacker_hash'].to_numpy())
+        counts = counter.counts()['distinct_count']
+        if len(by) > 1:
+            counts.index = pd.MultiIndex.from_tuples(counts.index, names=by)
+        else:
+            counts.index.name = by[0]
+        return counts
+
+    def save(self, cube_dir):
+        """Write cells.parquet, attacker_pairs.parquet, attackers.parquet and manifest.json"""
+        os.makedirs(cube_dir, exist_ok=True)
+        self.cells.to_parquet(os.path.join(cube_dir, 'cells.parquet'), index=False)
+        self.attacker_pairs.to_parquet(os.path.join(cube_dir, 'attacker_pairs.parquet'), index=False)
+        self.attackers.to_parquet(os.path.join(cube_dir, 'attackers.parquet'), index=False)
+        with open(os.path.join(cube_dir, 'manifest.json'), 'w') as f:
+            json.dump({'dimensions': CUBE_DIMENSIONS, 'measures': CUBE_MEASURES, 'cells': len(self.cells),
+                       'detections': int(self.cells['detections'].sum())}, f, indent=2)
+        print(f"✓ Saved MEV rollup cube to: {cube_dir}")
+        return cube_dir
+
+
+def load_rollup_cube(cube_dir):
+    """Load a cube written by MEVRollupCube.save()"""
+    return MEVRollupCube(pd.read_parquet(os.path.join(cube_dir, 'cells.parquet')),
+                         pd.read_parquet(os.path.join(cube_dir, 'attacker_pairs.parquet')),
+                         pd.read_parquet(os.path.join(cube_dir, 'attackers.parquet')))
+
+
+def _estimates(types):
+    sandwich = types.isin(SANDWICH_TYPES).to_numpy()
+    single = types.isin(['front_running', 'back_running']).to_numpy()
+    profit = np.where(sandwich, SANDWICH_PROFIT_SOL / 2, np.where(single, SINGLE_LEG_PROFIT_SOL, 0.0))
+    cost = np.where(sandwich, SANDWICH_COST_SOL / 2, np.where(single, SINGLE_LEG_COST_SOL, 0.0))
+    return profit, cost
+
+
+def build_rollup_cube(all_mev, pool_col='account_trade', verbose=True):
+    """
+    Aggregate detections into the rollup cube.
+
+    Parameters:
+    -----------
+    all_mev : DataFrame
+        02 detections: ['slot', 'amm_trade', 'attacker_signer', 'type', 'validator']
+        plus optional 'confidence', pool_col and 'victims_count' / 'victim_count'
+    pool_col : str
+        Pool column (missing -> 'Unknown'); missing validators stay NaN, so
+        validator rollups drop them like 02's groupby('validator')
+    verbose : bool
+        Print summary
+
+    Returns:
+    --------
+    cube : MEVRollupCube
+    """
+    n = len(all_mev)
+
+    def column(name, default):
+        if name not in all_mev.columns:
+            return np.full(n, default, dtype=object)
+        return (all_mev[name] if default is None else all_mev[name].fillna(default)).to_numpy()
+
+    victims_col = next((c for c in ['victims_count', 'victim_count'] if c in all_mev.columns), None)
+    types = all_mev['type'].fillna('unknown')
+    profit, cost = _estimates(types)
+    rows = pd.DataFrame({
+        'amm_trade': column('amm_trade', 'Unknown'),
+        'validator': column('validator', None),
+        'pool': column(pool_col, 'Unknown'),
+        'hour_slot': (all_mev['slot'].to_numpy() // SLOTS_PER_HOUR) * SLOTS_PER_HOUR,
+        'type': types.to_numpy(),
+        'confidence': column('confidence', 'none'),
+        'detections': 1,
+        'victims': all_mev[victims_col].fillna(0).to_numpy() if victims_col else 0,
+        'est_profit_sol': profit,
+        'est_cost_sol': cost,
+    })
+
+    # cell ids follow first appearance, matching the row order of the grouped sums
+    grouped = rows.groupby(CUBE_DIMENSIONS, sort=False, dropna=False)
+    cell_codes = grouped.ngroup().to_numpy()
+    cells = grouped[CUBE_MEASURES].sum().reset_index()
+    cells['detections'] = cells['detections'].astype(np.int64)
+
+    signer = all_mev['attacker_signer']
+    valid = signer.notna().to_numpy()
+    attacker_pairs = pd.DataFrame({'cell': cell_codes[valid].astype(np.int64),
+                                   'attacker_hash': hash_values(signer[valid])}).drop_duplicates(ignore_index=True)
+
+    # Attacker table: (amm_trade, attacker_signer, type) counts, first non-null validator
+    # (and its detection position, to pick the earliest across types), any high confidence
+    has_validator = rows['validator'].notna().to_numpy()
+    per_attacker = pd.DataFrame({'amm_trade': rows['amm_trade'], 'attacker_signer': signer.to_numpy(),
+                                 'type': rows['type'], 'validator': rows['validator'],
+                                 'validator_pos': np.where(has_validator, np.arange(n), n),
+                                 'high': rows['confidence'].to_numpy() == 'high',
+                                 'has_confidence': rows['confidence'].to_numpy() != 'none'})[valid]
+    attackers = per_attacker.groupby(['amm_trade', 'attacker_signer', 'type'], sort=False).agg(
+        detections=('type', 'size'), first_validator=('validator', 'first'),
+        first_validator_pos=('validator_pos', 'min'),
+        high_confidence=('high', 'any'), has_confidence=('has_confidence', 'any')).reset_index()
+
+    cube = MEVRollupCube(cells, attacker_pairs, attackers)
+
+    if verbose:
+        print("=" * 80)
+        print("MEV ROLLUP CUBE")
+        print("=" * 80)
+        print(f"Detections: {n:,} -> cells: {len(cells):,} ({' x '.join(CUBE_DIMENSIONS)})")
+        print(f"Attacker-cell pairs: {len(attacker_pairs):,} | attacker rows: {len(attackers):,}")
+        for dim in CUBE_DIMENSIONS:
+            print(f"  {dim}: {cells[dim].nunique():,} values")
+        print()
+
+    return cube
+
+
+def per_pamm_stats(cube):
+    """per_pamm_all_mev_with_validator.csv (02 schema) from the attacker table"""
+    attackers = cube.attackers
+    if attackers.empty:
+        return pd.DataFrame()
+    stats = attackers.pivot_table(index=['amm_trade', 'attacker_signer'], columns='type', values='detections',
+                                  aggfunc='sum', fill_value=0)
+    stats.columns.name = None
+    stats = stats.reset_index()
+    for col in MEV_TYPES:
+        if col not in stats.columns:
+            stats[col] = 0
+
+    # first non-null validator per (amm, attacker), as 02's groupby(...)['validator'].first()
+    validator_map = attackers.sort_values('first_validator_pos', kind='stable') \
+        .groupby(['amm_trade', 'attacker_signer'], sort=False)['first_validator'].first() \
+        .rename('validator').reset_index()
+    stats = stats.merge(validator_map, on=['amm_trade', 'attacker_signer'], how='left')
+
+    stats['sandwich_complete'] = stats['fat_sandwich'] // 2 + stats['sandwich'] // 2
+    stats['cost_sol'] = (stats['sandwich_complete'] * SANDWICH_COST_SOL) + \
+        (stats['front_running'] * SINGLE_LEG_COST_SOL) + (stats['back_running'] * SINGLE_LEG_COST_SOL)
+    stats['profit_sol'] = (stats['sandwich_complete'] * SANDWICH_PROFIT_SOL) + \
+        (stats['front_running'] * SINGLE_LEG_PROFIT_SOL) + (stats['back_running'] * SINGLE_LEG_PROFIT_SOL)
+    stats['net_profit_sol'] = stats['profit_sol'] - stats['cost_sol']
+
+    sandwiches = attackers[attackers['type'].isin(SANDWICH_TYPES) & attackers['has_confidence']]
+    if len(sandwiches):
+        confidence = sandwiches.groupby(['amm_trade', 'attacker_signer'])['high_confidence'].any()
+        confidence = confidence.map({True: 'high', False: 'medium'}).rename('confidence').reset_index()
+        stats = stats.merge(confidence, on=['amm_trade', 'attacker_signer'], how='left')
+    return stats
+
+
+def confidence_breakdown(cube):
+    """mev_confidence_breakdown.csv: sandwich detections per amm_trade x confidence"""
+    return cube.rollup('amm_trade', columns='confidence', where={'type': SANDWICH_TYPES})
+
+
+def validator_stats(cube, trades_per_validator=None, exact=False):
+    """
+    mev_trades_bots_per_validator.csv from the cube.
+
+    trades_per_validator : Series or None
+        All trades per validator (trades.groupby('validator').size()); the cube
+        only holds detections, so without it trade_count is the detection count
+    exact : bool
+        Exact bot_count (default: HyperLogLog above 1024 attackers per validator)
+    """
+    stats = cube.rollup('validator', measures=['detections'], exact=exact).rename(columns={'unique_attackers': 'bot_count'})
+    types = cube.rollup('validator', columns='type')
+    stats = stats.merge(types.reset_index(), on='validator', how='left')
+    if trades_per_validator is not None:
+        trade_count = trades_per_validator.rename('trade_count').rename_axis('validator').reset_index()
+        stats = trade_count.merge(stats, on='validator', how='outer').fillna(0)
+    else:
+        stats['trade_count'] = stats['detections']
+    stats['bot_ratio_%'] = (stats['bot_count'] / stats['trade_count'].replace(0, np.nan) * 100).fillna(0).round(2)
+    output_cols = ['validator', 'trade_count', 'bot_count', 'bot_ratio_%'] + [c for c in MEV_TYPES if c in stats.columns]
+    return stats.sort_values('bot_count', ascending=False, kind='stable')[output_cols].reset_index(drop=True)
+
+
+def top_groups(cube, dimension, n=20, sort_by='detections', where=None):
+    """Top validators / pools / AMMs by a measure (e.g. top_groups(cube, 'pool'))"""
+    return cube.rollup(dimension, where=where).nlargest(n, sort_by).reset_index(drop=True)
+
+
+def regenerate_outputs(cube, output_dir='.', trades_per_validator=None, top_n=20):
+    """Write the 02 group-by CSVs from the cube"""
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {
+        'per_pamm_all_mev_with_validator.csv': (per_pamm_stats(cube), False),
+        'mev_confidence_breakdown.csv': (confidence_breakdown(cube), True),
+        'mev_trades_bots_per_validator.csv': (validator_stats(cube, trades_per_validator), False),
+        'top_validators_by_mev.csv': (top_groups(cube, 'validator', top_n), False),
+        'top_pools_by_mev.csv': (top_groups(cube, 'pool', top_n), False),
+    }
+    paths = []
+    for name, (table, keep_index) in outputs.items():
+        path = os.path.join(output_dir, name)
+        table.to_csv(path, index=keep_index)
+        paths.append(path)
+        print(f"✓ Saved {name} ({len(table):,} rows) to: {path}")
+    return paths
+
+
+if __name__ == "__main__":
+    print("MEV Rollup Cube Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from mev_rollup_cube import build_rollup_cube, load_rollup_cube, regenerate_outputs
+
+    cube = build_rollup_cube(all_mev)
+    cube.save('outputs/mev_cube')
+    cube.rollup(['amm_trade', 'validator'])                  # any coarser group-by
+    cube.rollup('amm_trade', columns='type', where={'confidence': 'high'})
+    regenerate_outputs(cube, trades_per_validator=trades.groupby('validator').size())
+    """)
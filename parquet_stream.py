@@ -0,0 +1,124 @@
+"""
+Chunked Parquet Loader
+
+The notebooks load pamm_clean_final.parquet (and the derived detection files)
+with a single pd.read_parquet(). This module streams them instead:
+1. Record batches of a bounded size, only for the requested columns
+2. Optional predicate pushdown with the same filter syntax as pd.read_parquet
+3. Column min/max from Parquet row-group statistics (no data scan when available)
+4. DataFrames can be passed in place of a path, so the same code runs on
+   already-loaded data
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+try:
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+DEFAULT_BATCH_SIZE = 1_000_000
+
+
+def iter_parquet_chunks(source, columns=None, batch_size=DEFAULT_BATCH_SIZE, filters=None):
+    """
+    Iterate over a Parquet file (or directory) as DataFrame chunks.
+
+    Parameters:
+    -----------
+    source : str, Path or DataFrame
+        Parquet path, or an in-memory DataFrame to slice
+    columns : list or None
+        Columns to read (all if None)
+    batch_size : int
+        Maximum rows per chunk
+    filters : list or None
+        pd.read_parquet-style filters, e.g. [('kind', '==', 'TRADE')]
+
+    Yields:
+    -------
+    chunk : DataFrame
+    """
+    if isinstance(source, pd.DataFrame):
+        df = source if columns is None else source[columns]
+        if filters is not None:
+            raise ValueError("filters are only supported for Parquet sources")
+        for start in range(0, len(df), batch_size):
+            yield df.iloc[start:start + batch_size]
+        return
+
+    if not HAS_PYARROW:
+        # Without pyarrow there is no batch reader: load once, then slice
+        yield from iter_parquet_chunks(pd.read_parquet(source, columns=columns, filters=filters),
+                                       batch_size=batch_size)
+        return
+
+    expression = pq.filters_to_expression(filters) if filters is not None else None
+    dataset = ds.dataset(source, format='parquet')
+    for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def _statistics_range(source, column):
+    """(min, max) from the row-group statistics of every file, None if any are missing"""
+    dataset = ds.dataset(source, format='parquet')
+    if column not in dataset.schema.names:
+        return None
+    mins, maxs = [], []
+    for fragment in dataset.get_fragments():
+        for row_group in fragment.row_groups:
+            stats = row_group.statistics.get(column)
+            if not stats or 'min' not in stats or 'max' not in stats:
+                return None
+            mins.append(stats['min'])
+            maxs.append(stats['max'])
+    return (min(mins), max(maxs)) if mins else None
+
+
+def column_range(source, column, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    (min, max) of a numeric column.
+
+    Uses Parquet row-group statistics (of every file, for a dataset directory)
+    when every row group has them, otherwise falls back to one chunked pass
+    over the column.
+    """
+    if HAS_PYARROW and not isinstance(source, pd.DataFrame):
+        stats_range = _statistics_range(source, column)
+        if stats_range is not None:
+            return stats_range
+
+    lo, hi = np.inf, -np.inf
+    for chunk in iter_parquet_chunks(source, columns=[column], batch_size=batch_size):
+        values = chunk[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        if np.isfinite(values).any():
+            lo = min(lo, np.nanmin(values))
+            hi = max(hi, np.nanmax(values))
+    return (lo, hi) if lo <= hi else (np.nan, np.nan)
+
+
+if __name__ == "__main__":
+    print("Chunked Parquet Loader Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from parquet_stream import iter_parquet_chunks, column_range
+
+    for chunk in iter_parquet_chunks('01_data_cleaning/outputs/pamm_clean_final.parquet',
+                                     columns=['slot', 'kind', 'ms_time'],
+                                     filters=[('kind', '==', 'TRADE')]):
+        ...
+
+    slot_min, slot_max = column_range('01_data_cleaning/outputs/pamm_clean_final.parquet', 'slot')
+    """)
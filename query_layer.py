@@ -0,0 +1,253 @@
+"""
+Embedded SQL Query Layer (DuckDB)
+
+Ad hoc questions ("which validators hosted HumidiFi fat sandwiches in slots
+X-Y") meant a new pandas cell that loads the full parquet first. This module
+puts an in-process DuckDB catalog (no server) over the files the pipeline
+already writes:
+1. Views over pamm_clean_final.parquet, detection results, aggregator tables,
+   the rollup cube and the protocol feature store; views are lazy, so column
+   projection and WHERE filters are pushed into the parquet row groups and
+   hive partitions
+2. Partitioned directories (key=value/...) are read as one view with the
+   partition keys as columns
+3. Multi-threaded execution with a memory limit and an on-disk spill
+   directory, so joins and sorts larger than RAM run out-of-core
+4. write_partitioned() writes detector outputs (including victim_signers list
+   columns) as hive-partitioned parquet, queryable without loading into pandas
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import os
+import glob
+import shutil
+import tempfile
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+try:
+    import duckdb
+    HAS_DUCKDB = True
+except ImportError:
+    HAS_DUCKDB = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+# View name -> path relative to the repository root (registered when present)
+DEFAULT_VIEWS = {
+    'events': '01_data_cleaning/outputs/pamm_clean_final.parquet',
+    'fat_sandwiches': 'outputs/fat_sandwiches',
+    'cross_slot_sandwiches': 'outputs/cross_slot_sandwiches',
+    'is_aggregator': 'outputs/aggregators/is_aggregator.parquet',
+    'slot_signer_diversity': 'outputs/aggregators/slot_signer_diversity.parquet',
+    'trades_by_signer': 'trades_by_signer.parquet',
+    'mev_cube': 'outputs/mev_cube/cells.parquet',
+    'mev_cube_attackers': 'outputs/mev_cube/attackers.parquet',
+    'protocol_features': '09a_advanced_ml/derived/protocol_features/counts.parquet',
+    'trapped_mev_bots': 'trapped_mev_bots.csv',
+    'mev_trapping_detection': 'mev_trapping_detection.csv',
+    'failed_sandwich_attempts': '02_mev_detection/failed_sandwich_attempts.csv',
+}
+DEFAULT_SPILL_DIR = os.path.join(tempfile.gettempdir(), 'mev_query_spill')
+DEFAULT_PARTITION_COLS = ['amm_trade']
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(path):
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+def _scan(path):
+    """DuckDB table function for a parquet/CSV file, glob or (hive-partitioned) directory"""
+    path = str(path)
+    if os.path.isdir(path):
+        if not glob.glob(os.path.join(path, '**', '*.parquet'), recursive=True):
+            raise FileNotFoundError(f"No parquet files under {path}")
+        return f"read_parquet({_literal(os.path.join(path, '**', '*.parquet'))}, hive_partitioning = true)"
+    if path.endswith('.csv'):
+        return f"read_csv_auto({_literal(path)})"
+    return f"read_parquet({_literal(path)})"
+
+
+class QueryLayer:
+    """
+    In-process DuckDB catalog of pipeline outputs.
+
+    Parameters:
+    -----------
+    root : str
+        Repository root for DEFAULT_VIEWS paths
+    database : str
+        ':memory:' (views only, nothing persisted) or a .duckdb file to keep
+        the view definitions
+    threads : int or None
+        Worker threads (None = all cores)
+    memory_limit : str or None
+        e.g. '8GB'; larger joins/sorts spill to spill_dir
+    spill_dir : str
+        Directory for out-of-core temporary files
+    register_defaults : bool
+        Register every DEFAULT_VIEWS path that exists
+    verbose : bool
+        Print registered views
+    """
+
+    def __init__(self, root='.', database=':memory:', threads=None, memory_limit=None,
+                 spill_dir=DEFAULT_SPILL_DIR, register_defaults=True, verbose=True):
+        if not HAS_DUCKDB:
+            raise ImportError("duckdb is required for the query layer (pip install duckdb)")
+        self.root = root
+        self.con = duckdb.connect(database)
+        os.makedirs(spill_dir, exist_ok=True)
+        self.con.execute(f"SET temp_directory = {_literal(spill_dir)}")
+        # insertion order is irrelevant for analytics and blocks spilling of large sorts
+        self.con.execute("SET preserve_insertion_order = false")
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        if memory_limit:
+            self.con.execute(f"SET memory_limit = {_literal(memory_limit)}")
+        self.views = {}
+        if register_defaults:
+            self.register_defaults(verbose=verbose)
+
+    def register(self, name, path):
+        """
+        Register a parquet/CSV file, glob or partitioned directory as a view.
+
+        The view is a lazy scan: every query re-reads the files with
+        projection, filter and partition pushdown.
+        """
+        self.con.execute(f"CREATE OR REPLACE VIEW {_quote(name)} AS SELECT * FROM {_scan(path)}")
+        self.views[name] = str(path)
+        return self
+
+    def register_frame(self, name, df):
+        """Expose an in-memory DataFrame (e.g. df_clean already loaded) as a view, without copying"""
+        self.con.register(name, df)
+        self.views[name] = '<DataFrame>'
+        return self
+
+    def register_defaults(self, verbose=True):
+        """Register DEFAULT_VIEWS entries that exist under root (a '.parquet' suffix is optional)"""
+        for name, relative in DEFAULT_VIEWS.items():
+            path = os.path.join(self.root, relative)
+            candidates = [path] if os.path.splitext(path)[1] else [path, path + '.parquet']
+            existing = next((p for p in candidates if os.path.exists(p)), None)
+            if existing is not None:
+                try:
+                    self.register(name, existing)
+                except (FileNotFoundError, duckdb.Error) as exc:
+                    print(f"⚠️  Could not register {name} ({existing}): {exc}")
+
+        if verbose:
+            print("=" * 80)
+            print("QUERY LAYER")
+            print("=" * 80)
+            print(f"DuckDB {duckdb.__version__} | threads: {self.setting('threads')} | "
+                  f"memory limit: {self.setting('memory_limit')}")
+            if self.views:
+                for name, path in self.views.items():
+                    print(f"  {name:<26} {path}")
+            else:
+                print("  No outputs found yet (register() paths explicitly)")
+            print()
+        return self
+
+    def setting(self, name):
+        return self.con.execute(f"SELECT current_setting({_literal(name)})").fetchone()[0]
+
+    def sql(self, query, params=None):
+        """Run a query and return a DataFrame"""
+        return self.con.execute(query, params or []).df()
+
+    def arrow(self, query, params=None):
+        """Run a query and return a pyarrow Table (no pandas conversion)"""
+        return self.con.execute(query, params or []).fetch_arrow_table()
+
+    def explain(self, query):
+        """Physical plan (shows pushed-down filters and projections)"""
+        return '\n'.join(row[1] for row in self.con.execute(f"EXPLAIN {query}").fetchall())
+
+    def describe(self, name):
+        """Columns and types of a view"""
+        return self.sql(f"DESCRIBE {_quote(name)}")
+
+    def copy_to(self, query, path, partition_by=None):
+        """
+        Write a query result straight to parquet (streamed, out-of-core),
+        hive-partitioned by partition_by if given.
+        """
+        options = "FORMAT PARQUET"
+        if partition_by:
+            partition_by = [partition_by] if isinstance(partition_by, str) else list(partition_by)
+            options += f", PARTITION_BY ({', '.join(_quote(c) for c in partition_by)}), OVERWRITE_OR_IGNORE"
+        self.con.execute(f"COPY ({query}) TO {_literal(path)} ({options})")
+        print(f"✓ Saved query result to: {path}")
+        return path
+
+    def close(self):
+        self.con.close()
+
+
+def write_partitioned(results_df, path, partition_cols=DEFAULT_PARTITION_COLS, max_rows_per_group=100_000,
+                      overwrite=True):
+    """
+    Write detector output as a hive-partitioned parquet dataset (path/amm_trade=X/...).
+
+    Parameters:
+    -----------
+    results_df : DataFrame
+        Detection results (the fat sandwich / cross-slot victim_signers column
+        is written as a native list column) or any output table
+    path : str
+        Dataset directory
+    partition_cols : list
+        Partition keys; queries filtering on them skip other directories
+    max_rows_per_group : int
+        Parquet row group size (unit of filter pushdown within a file)
+    overwrite : bool
+        Remove the whole directory first (True), or only replace the
+        partitions present in results_df and keep the others (False)
+    """
+    if not HAS_PYARROW:
+        raise ImportError("pyarrow is required to write partitioned outputs")
+    if overwrite and os.path.isdir(path):
+        shutil.rmtree(path)
+    table = pa.Table.from_pandas(results_df, preserve_index=False)
+    ds.write_dataset(table, path, format='parquet', partitioning=list(partition_cols),
+                     partitioning_flavor='hive', existing_data_behavior='delete_matching',
+                     max_rows_per_group=max_rows_per_group, max_rows_per_file=max(max_rows_per_group, 1_000_000))
+    print(f"✓ Saved {len(results_df):,} rows partitioned by {', '.join(partition_cols)} to: {path}")
+    return path
+
+
+if __name__ == "__main__":
+    print("Query Layer Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from query_layer import QueryLayer, write_partitioned
+
+    write_partitioned(fat_sandwiches, 'outputs/fat_sandwiches')     # detector output -> dataset
+    q = QueryLayer(threads=8, memory_limit='8GB')
+    q.sql('''
+        SELECT validator, count(*) AS fat_sandwiches
+        FROM fat_sandwiches
+        WHERE amm_trade = 'HumidiFi' AND start_slot BETWEEN ? AND ?
+        GROUP BY validator ORDER BY fat_sandwiches DESC
+    ''', [391_000_000, 391_100_000])
+    """)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Report build system for the PDF report generators
+
+Shared by generate_enhanced_report.py and generate_academic_report.py:
+1. Configurable artifact root (argument > PAMM_ARTIFACT_ROOT > this directory)
+2. Figures and CSV tables are prepared in parallel worker processes
+3. Each prepared asset is cached by the content hash of its input PNG/CSV, so a
+   rebuild only renders changed figures/tables and re-assembles the rest from
+   the cache
+4. Figures keep their source resolution at the size they are drawn (or an
+   explicit dpi)
+"""
+import csv
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from PIL import Image as PILImage
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+ARTIFACT_ROOT_ENV = 'PAMM_ARTIFACT_ROOT'
+
+
+def resolve_artifact_root(artifact_root=None):
+    """Artifact root: explicit argument, then $PAMM_ARTIFACT_ROOT, then this directory"""
+    if artifact_root is None:
+        artifact_root = os.environ.get(ARTIFACT_ROOT_ENV) or Path(__file__).resolve().parent
+    return Path(artifact_root).expanduser().resolve()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _render_image(src, dst, image_size, dpi):
+    """
+    Worker: downscale a PNG to image_size inches at dpi (None = the PNG's own
+    dpi, so a 300 dpi figure stays 300 dpi at the size it is drawn in the PDF)
+    """
+    if HAS_PIL:
+        with PILImage.open(src) as img:
+            dpi = dpi or img.info.get('dpi', (None,))[0]
+            if dpi:
+                img.thumbnail((round(image_size[0] * dpi), round(image_size[1] * dpi)))
+                img.save(dst, format='PNG', optimize=True, dpi=(dpi, dpi))
+                return dst
+    shutil.copyfile(src, dst)
+    return dst
+
+
+def _render_table(src, dst, max_rows):
+    """Worker: parse the first max_rows rows of a CSV into a cached JSON table"""
+    with open(src, 'r', newline='') as f:
+        rows = []
+        for i, row in enumerate(csv.reader(f)):
+            if i >= max_rows:
+                break
+            rows.append(row)
+    with open(dst, 'w') as f:
+        json.dump(rows, f)
+    return dst
+
+
+class ReportAssetCache:
+    """
+    Content-addressed cache of prepared report assets.
+
+    Parameters:
+        artifact_root: directory notebook outputs are resolved against
+        cache_dir: where prepared assets are kept
+                   (default: <artifact_root>/.report_cache)
+        workers: size of the process pool used for cache misses
+    """
+
+    def __init__(self, artifact_root=None, cache_dir=None, workers=None):
+        self.root = resolve_artifact_root(artifact_root)
+        self.cache_dir = Path(cache_dir) if cache_dir else self.root / '.report_cache'
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self._images = {}
+        self._tables = {}
+        self._digests = {}
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def path(self, rel_path):
+        """Absolute path of an artifact relative to the root"""
+        return self.root / rel_path
+
+    def _digest(self, rel_path):
+        if rel_path not in self._digests:
+            self._digests[rel_path] = file_digest(self.path(rel_path))
+        return self._digests[rel_path]
+
+    def prepare(self, images=(), tables=(), image_size=(5.0, 3.75), dpi=None, max_rows=20):
+        """
+        Prepare all figures and tables, rendering cache misses in parallel.
+
+        images: relative PNG paths; tables: relative CSV paths.
+        image_size: drawn size in inches; dpi: output resolution (None = source dpi).
+        Missing inputs are skipped (the section falls back like before).
+        """
+        size_key = f"{image_size[0]:g}x{image_size[1]:g}in_{dpi or 'src'}dpi"
+        jobs = []
+        prepared = 0
+        for rel_path in dict.fromkeys(images):
+            if not self.path(rel_path).exists():
+                continue
+            prepared += 1
+            dst = self.cache_dir / f"{self._digest(rel_path)}_{size_key}.png"
+            self._images[rel_path] = dst
+            if not dst.exists():
+                jobs.append((_render_image, str(self.path(rel_path)), str(dst), image_size, dpi))
+        for rel_path in dict.fromkeys(tables):
+            if not self.path(rel_path).exists():
+                continue
+            prepared += 1
+            dst = self.cache_dir / f"{self._digest(rel_path)}_{max_rows}.json"
+            self._tables[rel_path] = dst
+            if not dst.exists():
+                jobs.append((_render_table, str(self.path(rel_path)), str(dst), max_rows))
+
+        self.stats['hits'] += prepared - len(jobs)
+        self.stats['misses'] += len(jobs)
+        if len(jobs) == 1:
+            fn, *args = jobs[0]
+            fn(*args)
+        elif jobs:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                for future in [pool.submit(fn, *args) for fn, *args in jobs]:
+                    future.result()
+
+    def image(self, rel_path):
+        """Cached (downscaled) PNG path for an artifact, or None if unavailable"""
+        dst = self._images.get(rel_path)
+        return str(dst) if dst is not None else None
+
+    def table(self, rel_path):
+        """Cached CSV rows for an artifact, or None if unavailable"""
+        if rel_path in self._tables:
+            return json.loads(self._tables[rel_path].read_text()) or None
+        return None
@@ -0,0 +1,218 @@
+"""
+Fat Sandwich Consolidation with Interval Trees
+
+detect_fat_sandwich_time_window evaluates every window size separately and only
+advances `i += max(1, attacker_count // 2)`, so one attack is reported several
+times (1s/2s/5s/10s windows, overlapping start indices). This module:
+1. Sorts detections per (AMM, attacker) by start_time_ms
+2. Merges overlapping [start_time_ms, end_time_ms] intervals into canonical
+   attack events (running max of end time, no pairwise comparisons)
+3. Keeps the best-confidence detection's fields per event and the union of victims
+   (victim_signers column, same layout as the detection results)
+4. Serves "which attacks cover time t / slot s" through interval trees
+   (pandas IntervalIndex)
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+from improved_fat_sandwich_detection import victim_codes, victims_column
+
+
+def consolidate_fat_sandwiches(results_df, verbose=True):
+    """
+    Merge overlapping detections into canonical attack events.
+
+    Parameters:
+    -----------
+    results_df : DataFrame
+        Results from detect_fat_sandwich_time_window()
+    verbose : bool
+        Print summary
+
+    Returns:
+    --------
+    events_df : DataFrame
+        One row per attack event: the best detection's fields (highest
+        confidence_score, then shortest window) with the event's full
+        start/end time and slot range, 'detections' (merged detection count),
+        'windows' (distinct window sizes) and the union of victims
+        (victim_count / victim_signers)
+    detection_event : Series
+        event_id for every input detection (aligned to results_df.index)
+    """
+    if len(results_df) == 0:
+        return results_df.copy(), pd.Series(dtype=np.int64)
+
+    order = np.lexsort((
+        results_df['start_time_ms'].to_numpy(),
+        results_df['attacker_signer'].to_numpy(),
+        results_df['amm_trade'].to_numpy(),
+    ))
+    df = results_df.iloc[order]
+    start = df['start_time_ms'].to_numpy()
+    end = df['end_time_ms'].to_numpy()
+
+    # New event when the key changes or the start is past every earlier end of the group
+    key_change = np.ones(len(df), dtype=bool)
+    key_change[1:] = (df['amm_trade'].to_numpy()[1:] != df['amm_trade'].to_numpy()[:-1]) | \
+                     (df['attacker_signer'].to_numpy()[1:] != df['attacker_signer'].to_numpy()[:-1])
+    group_id = np.cumsum(key_change)
+    running_end = pd.Series(end).groupby(group_id).cummax().to_numpy()
+    new_event = key_change.copy()
+    new_event[1:] |= start[1:] > running_end[:-1]
+    event_id = np.cumsum(new_event) - 1
+
+    detection_event = pd.Series(event_id, index=df.index, name='event_id').reindex(results_df.index)
+
+    # Best detection per event
+    df = df.assign(event_id=event_id)
+    best = df.sort_values(['event_id', 'confidence_score', 'window_seconds'],
+                          ascending=[True, False, True], kind='stable').drop_duplicates('event_id')
+    best = best.set_index('event_id')
+
+    grouped = df.groupby('event_id', sort=True)
+    events_df = best.copy()
+    events_df['start_time_ms'] = grouped['start_time_ms'].min()
+    events_df['end_time_ms'] = grouped['end_time_ms'].max()
+    if 'start_slot' in df.columns:
+        events_df['start_slot'] = grouped['start_slot'].min()
+        events_df['end_slot'] = grouped['end_slot'].max()
+        events_df['slot_span'] = events_df['end_slot'] - events_df['start_slot']
+    events_df['actual_time_span_ms'] = events_df['end_time_ms'] - events_df['start_time_ms']
+    events_df['detections'] = grouped.size()
+    events_df['windows'] = grouped['window_seconds'].nunique()
+
+    # Union of victims per event
+    if 'victim_signers' in df.columns:
+        codes, offsets, labels = victim_codes(df)
+        code_event = np.repeat(event_id, np.diff(offsets))
+        pairs = pd.DataFrame({'event_id': code_event, 'code': codes}).drop_duplicates()
+        pairs = pairs.sort_values(['event_id', 'code'], kind='stable')
+        counts = pairs.groupby('event_id').size().reindex(events_df.index, fill_value=0).to_numpy()
+        events_df['victim_count'] = counts
+        events_df['victim_signers'] = victims_column(pairs['code'].to_numpy(), counts, labels,
+                                                     index=events_df.index)
+
+    events_df = events_df.reset_index()
+
+    if verbose:
+        print("=" * 80)
+        print("FAT SANDWICH CONSOLIDATION")
+        print("=" * 80)
+        print(f"Detections: {len(results_df):,}")
+        print(f"Canonical attack events: {len(events_df):,} "
+              f"({len(results_df) / max(len(events_df), 1):.2f} detections per event)")
+        print(f"Events seen in multiple window sizes: {(events_df['windows'] > 1).sum():,}")
+        if 'confidence' in events_df.columns:
+            print("By best confidence:")
+            for level, count in events_df['confidence'].value_counts().items():
+                print(f"  {level:<8s}{count:>8,}")
+        print()
+
+    return events_df, detection_event
+
+
+class AttackIntervalIndex:
+    """
+    Interval-tree lookups over attack events (or raw detections).
+
+    Parameters:
+    -----------
+    events_df : DataFrame
+        Output of consolidate_fat_sandwiches() (needs start/end_time_ms and,
+        for slot queries, start_slot/end_slot)
+    """
+
+    def __init__(self, events_df):
+        self.events = events_df.reset_index(drop=True)
+        self.time_index = pd.IntervalIndex.from_arrays(
+            self.events['start_time_ms'], self.events['end_time_ms'], closed='both'
+        )
+        self.slot_index = None
+        if 'start_slot' in self.events.columns:
+            self.slot_index = pd.IntervalIndex.from_arrays(
+                self.events['start_slot'], self.events['end_slot'], closed='both'
+            )
+
+    @staticmethod
+    def _stab(index, t):
+        """Positions of intervals containing t (interval-tree lookup)"""
+        idx, _ = index.get_indexer_non_unique(np.array([t]))
+        return np.sort(idx[idx >= 0])
+
+    @staticmethod
+    def _sweep(starts, ends, points):
+        """
+        All (point, interval) containment pairs for many points at once.
+
+        Each closed interval covers a contiguous run of the sorted points, found
+        with two binary searches; output size is the number of pairs.
+        """
+        points = np.atleast_1d(np.asarray(points))
+        order = np.argsort(points, kind='stable')
+        sorted_points = points[order]
+        lo = np.searchsorted(sorted_points, starts, side='left')
+        hi = np.searchsorted(sorted_points, ends, side='right')
+        counts = np.maximum(hi - lo, 0)
+        event = np.repeat(np.arange(len(starts)), counts)
+        run_starts = np.cumsum(counts) - counts
+        pos = np.repeat(lo - run_starts, counts) + np.arange(counts.sum())
+        pairs = pd.DataFrame({'point': order[pos], 'event': event})
+        return pairs.sort_values(['point', 'event'], kind='stable').reset_index(drop=True)
+
+    def covering_time(self, t):
+        """Attack events whose [start_time_ms, end_time_ms] contains t"""
+        return self.events.iloc[self._stab(self.time_index, t)]
+
+    def covering_slot(self, slot):
+        """Attack events whose [start_slot, end_slot] contains slot"""
+        if self.slot_index is None:
+            raise ValueError("Events have no slot range")
+        return self.events.iloc[self._stab(self.slot_index, slot)]
+
+    def covering_times(self, times):
+        """
+        Batch stabbing query.
+
+        Returns:
+        --------
+        pairs : DataFrame
+            ['point', 'event'] positional indices, one row per (time, covering event)
+        """
+        return self._sweep(self.events['start_time_ms'].to_numpy(), self.events['end_time_ms'].to_numpy(), times)
+
+    def covering_slots(self, slots):
+        """Batch version of covering_slot(); see covering_times()"""
+        if self.slot_index is None:
+            raise ValueError("Events have no slot range")
+        return self._sweep(self.events['start_slot'].to_numpy(), self.events['end_slot'].to_numpy(), slots)
+
+    def coverage_counts(self, times):
+        """Number of attack events covering each time"""
+        pairs = self.covering_times(times)
+        return np.bincount(pairs['point'].to_numpy(), minlength=len(np.atleast_1d(times)))
+
+
+if __name__ == "__main__":
+    print("Fat Sandwich Consolidation Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from improved_fat_sandwich_detection import detect_fat_sandwich_time_window
+    from sandwich_consolidation import consolidate_fat_sandwiches, AttackIntervalIndex
+
+    results, stats = detect_fat_sandwich_time_window(df_trades)
+    events, detection_event = consolidate_fat_sandwiches(results)
+
+    index = AttackIntervalIndex(events)
+    index.covering_time(1_700_000_123_456)      # attacks active at a millisecond
+    index.covering_slot(391_000_123)            # attacks spanning a slot
+    index.coverage_counts(trades['ms_time'])    # attacks covering every trade
+    """)
@@ -0,0 +1,557 @@
+"""
+Local Batch-Scoring Service for the MEV Classifier
+
+The 07a binary classifier (StandardScaler + model, plus the GMM cluster labels)
+only lives in the notebook session. This module:
+1. Persists the fitted scaler, model and optional GMM as a versioned artifact
+   (<dir>/v0001/model.joblib + manifest.json with features, checksum, metrics)
+2. Scores DataFrames of signer features vectorized (one transform/predict per batch)
+3. Serves POST /score over a stdlib asyncio HTTP server that micro-batches
+   concurrent requests (max batch size / max wait) into one inference call
+4. Exposes GET /metrics (requests, batches, batch sizes, latency p50/p95/p99,
+   throughput) and GET /health
+5. Includes a load generator CLI reporting p50/p99 scoring latency
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import pickle
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+try:
+    import joblib
+    HAS_JOBLIB = True
+except ImportError:
+    HAS_JOBLIB = False
+
+
+DEFAULT_ARTIFACT_DIR = '07_ml_classification/derived/models/mev_classifier'
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_BATCH_SIZE = 256
+MAX_WAIT_MS = 5.0
+LATENCY_WINDOW = 10_000
+
+FEATURE_COLS = [
+    'total_trades', 'trades_per_hour', 'aggregator_likelihood',
+    'late_slot_ratio', 'oracle_backrun_ratio', 'high_bytes_ratio',
+    'cluster_ratio', 'mev_score', 'wash_trading_score'
+]
+
+
+# ============================================================================
+# ARTIFACT
+# ============================================================================
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _versions(artifact_dir):
+    if not os.path.isdir(artifact_dir):
+        return []
+    return sorted(int(name[1:]) for name in os.listdir(artifact_dir)
+                  if name.startswith('v') and name[1:].isdigit())
+
+
+def save_model_artifact(
+    model,
+    scaler,
+    feature_cols=FEATURE_COLS,
+    artifact_dir=DEFAULT_ARTIFACT_DIR,
+    gmm=None,
+    cluster_to_label=None,
+    threshold=0.5,
+    metrics=None,
+    model_name=None
+):
+    """
+    Persist a fitted scaler + classifier (+ GMM) as the next artifact version.
+
+    Parameters:
+    -----------
+    model : fitted classifier with predict_proba (e.g. 07a best_model)
+    scaler : fitted StandardScaler (or None if the model takes raw features)
+    feature_cols : list
+        Feature order the scaler/model were fitted on
+    artifact_dir : str
+        Root directory; versions are v0001, v0002, ...
+    gmm : fitted GaussianMixture or None
+        Adds 'gmm_cluster' / 'gmm_label' to scores
+    cluster_to_label : dict or None
+        GMM cluster -> binary label mapping from 07a
+    threshold : float
+        Probability threshold for is_mev
+    metrics : dict or None
+        Evaluation metrics stored in the manifest (e.g. f1_mev, pr_auc)
+    model_name : str or None
+        Display name (defaults to the model class)
+
+    Returns:
+    --------
+    version_dir : str
+    """
+    version = (_versions(artifact_dir) or [0])[-1] + 1
+    version_dir = os.path.join(artifact_dir, f"v{version:04d}")
+    os.makedirs(version_dir, exist_ok=True)
+
+    payload = {
+        'model': model,
+        'scaler': scaler,
+        'gmm': gmm,
+        'cluster_to_label': {int(k): int(v) for k, v in (cluster_to_label or {}).items()},
+    }
+    model_path = os.path.join(version_dir, 'model.joblib' if HAS_JOBLIB else 'model.pkl')
+    if HAS_JOBLIB:
+        joblib.dump(payload, model_path)
+    else:
+        with open(model_path, 'wb') as f:
+            pickle.dump(payload, f)
+
+    try:
+        import sklearn
+        sklearn_version = sklearn.__version__
+    except ImportError:
+        sklearn_version = None
+
+    manifest = {
+        'version': version,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'model_name': model_name or type(model).__name__,
+        'model_file': os.path.basename(model_path),
+        'sha256': _sha256(model_path),
+        'feature_cols': list(feature_cols),
+        'threshold': float(threshold),
+        'has_gmm': gmm is not None,
+        'metrics': metrics or {},
+        'sklearn_version': sklearn_version,
+        'python_version': sys.version.split()[0],
+    }
+    with open(os.path.join(version_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, default=float)
+
+    print(f"✓ Saved model artifact v{version:04d}: {version_dir}")
+    return version_dir
+
+
+class ScoringArtifact:
+    """
+    Loaded model artifact with vectorized scoring.
+
+    Parameters:
+    -----------
+    path : str
+        A version directory, or the artifact root (latest version is used)
+    version : int or None
+        Version to load from the artifact root
+    """
+
+    def __init__(self, path=DEFAULT_ARTIFACT_DIR, version=None):
+        versions = _versions(path)
+        if versions:
+            path = os.path.join(path, f"v{(version or versions[-1]):04d}")
+        with open(os.path.join(path, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        model_path = os.path.join(path, self.manifest['model_file'])
+        if _sha256(model_path) != self.manifest['sha256']:
+            raise ValueError(f"Checksum mismatch for {model_path}")
+        if model_path.endswith('.joblib'):
+            payload = joblib.load(model_path)
+        else:
+            with open(model_path, 'rb') as f:
+                payload = pickle.load(f)
+
+        self.path = path
+        self.model = payload['model']
+        self.scaler = payload['scaler']
+        self.gmm = payload['gmm']
+        self.cluster_to_label = payload['cluster_to_label']
+        self.feature_cols = self.manifest['feature_cols']
+        self.threshold = self.manifest['threshold']
+        self.version = self.manifest['version']
+
+    def matrix(self, features):
+        """Feature matrix in artifact column order (DataFrame, list of dicts or 2D array)"""
+        if isinstance(features, pd.DataFrame):
+            missing = [c for c in self.feature_cols if c not in features.columns]
+            if missing:
+                raise KeyError(f"Missing features: {missing}")
+            X = features[self.feature_cols].to_numpy(dtype=np.float64)
+        elif len(features) and isinstance(features[0], dict):
+            missing = [c for c in self.feature_cols if any(c not in row for row in features)]
+            if missing:
+                raise KeyError(f"Missing features: {missing}")
+            X = np.array([[row[c] for c in self.feature_cols] for row in features], dtype=np.float64)
+        else:
+            X = np.asarray(features, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_cols):
+            raise ValueError(f"Expected {len(self.feature_cols)} features per row")
+        if not np.isfinite(X).all():
+            raise ValueError("Features must be finite numbers")
+        return X
+
+    def predict(self, X):
+        """Vectorized inference on a validated matrix; dict of column arrays"""
+        X_scaled = self.scaler.transform(X) if self.scaler is not None else X
+        proba = self.model.predict_proba(X_scaled)[:, 1]
+        columns = {'mev_probability': proba, 'is_mev': proba >= self.threshold}
+        if self.gmm is not None:
+            clusters = self.gmm.predict(X_scaled)
+            lookup = np.zeros(max(clusters.max() + 1, len(self.cluster_to_label)), dtype=np.int64)
+            for cluster, label in self.cluster_to_label.items():
+                lookup[cluster] = label
+            columns['gmm_cluster'] = clusters
+            columns['gmm_label'] = lookup[clusters]
+        return columns
+
+    def score(self, features):
+        """
+        Score a batch of signers.
+
+        Returns:
+        --------
+        scores : DataFrame
+            ['mev_probability', 'is_mev'] (+ 'gmm_cluster', 'gmm_label')
+        """
+        return pd.DataFrame(self.predict(self.matrix(features)))
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+class ServiceMetrics:
+    """Counters and a rolling window of request latencies"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.batches = 0
+        self.batch_rows = deque(maxlen=window)
+        self.latencies_ms = deque(maxlen=window)
+        self.inference_ms = deque(maxlen=window)
+
+    def snapshot(self, queue_depth=0):
+        latencies = np.fromiter(self.latencies_ms, dtype=np.float64)
+        inference = np.fromiter(self.inference_ms, dtype=np.float64)
+        uptime = time.perf_counter() - self.started
+
+        def pct(values, q):
+            return float(np.percentile(values, q)) if len(values) else None
+
+        return {
+            'uptime_s': round(uptime, 3),
+            'requests': self.requests,
+            'rows': self.rows,
+            'errors': self.errors,
+            'batches': self.batches,
+            'mean_batch_rows': float(np.mean(self.batch_rows)) if self.batch_rows else None,
+            'queue_depth': queue_depth,
+            'throughput_rps': self.requests / uptime if uptime > 0 else 0.0,
+            'latency_ms': {'p50': pct(latencies, 50), 'p95': pct(latencies, 95), 'p99': pct(latencies, 99)},
+            'inference_ms': {'p50': pct(inference, 50), 'p99': pct(inference, 99)},
+        }
+
+
+class ScoringService:
+    """
+    asyncio HTTP scoring server with micro-batching.
+
+    POST /score  body: {"signer": ..., "features": {...}} or {"instances": [{...}, ...]}
+    GET /metrics, GET /health
+
+    Parameters:
+    -----------
+    artifact : ScoringArtifact
+    max_batch_size : int
+        Rows per inference call; requests are never split, so a request that would
+        overflow the batch starts the next one (a single oversized request runs alone)
+    max_wait_ms : float
+        How long the batcher waits for more requests after the first one
+    """
+
+    def __init__(self, artifact, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.artifact = artifact
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.metrics = ServiceMetrics()
+        self.queue = None
+        self.server = None
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        carry = None
+        while True:
+            # A request larger than max_batch_size is scored on its own
+            items = [carry if carry is not None else await self.queue.get()]
+            rows, carry = len(items[0][0]), None
+            deadline = loop.time() + self.max_wait
+            while rows < self.max_batch_size:
+                if not self.queue.empty():
+                    item = self.queue.get_nowait()
+                else:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if rows + len(item[0]) > self.max_batch_size:
+                    carry = item
+                    break
+                items.append(item)
+                rows += len(item[0])
+
+            X = np.vstack([matrix for matrix, _ in items])
+            started = time.perf_counter()
+            try:
+                columns = await loop.run_in_executor(None, self.artifact.predict, X)
+            except Exception as exc:
+                # Wrapped so model failures are reported as 500, not as a bad request
+                error = RuntimeError(f'inference failed: {type(exc).__name__}: {exc}')
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.metrics.inference_ms.append((time.perf_counter() - started) * 1000)
+            self.metrics.batches += 1
+            self.metrics.batch_rows.append(rows)
+
+            names = list(columns)
+            values = list(zip(*[columns[name].tolist() for name in names]))
+            start = 0
+            for matrix, future in items:
+                if not future.done():
+                    future.set_result([dict(zip(names, row)) for row in values[start:start + len(matrix)]])
+                start += len(matrix)
+
+    async def _score(self, body):
+        request = json.loads(body or b'{}')
+        instances = request.get('instances')
+        if instances is None:
+            instances = [request.get('features', {})]
+        signers = [inst.get('signer', request.get('signer')) if isinstance(inst, dict) else None
+                   for inst in instances]
+        matrix = self.artifact.matrix(instances)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((matrix, future))
+        records = await future
+        for record, signer in zip(records, signers):
+            if signer is not None:
+                record['signer'] = signer
+        return {'model_version': self.artifact.version, 'scores': records}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0) or 0))
+
+                started = time.perf_counter()
+                status, payload = 200, None
+                try:
+                    if method == 'POST' and target == '/score':
+                        payload = await self._score(body)
+                        self.metrics.requests += 1
+                        self.metrics.rows += len(payload['scores'])
+                    elif method == 'GET' and target == '/metrics':
+                        payload = self.metrics.snapshot(self.queue.qsize())
+                    elif method == 'GET' and target == '/health':
+                        payload = {'status': 'ok', 'model_version': self.artifact.version,
+                                   'features': self.artifact.feature_cols}
+                    else:
+                        status, payload = 404, {'error': f'{method} {target} not found'}
+                except (ValueError, KeyError, TypeError, AttributeError) as exc:
+                    status, payload = 400, {'error': str(exc.args[0]) if exc.args else str(exc)}
+                    self.metrics.errors += 1
+                except Exception as exc:
+                    status, payload = 500, {'error': str(exc) or type(exc).__name__}
+                    self.metrics.errors += 1
+                if status == 200 and target == '/score':
+                    self.metrics.latencies_ms.append((time.perf_counter() - started) * 1000)
+
+                data = json.dumps(payload, default=float).encode()
+                reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}[status]
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    .encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.queue = asyncio.Queue()
+        self._batcher_task = asyncio.create_task(self._batcher())
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    async def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await self.start(host, port)
+        print("=" * 80)
+        print("MEV SCORING SERVICE")
+        print("=" * 80)
+        print(f"Model: {self.artifact.manifest['model_name']} v{self.artifact.version:04d} ({self.artifact.path})")
+        print(f"Listening on http://{host}:{port} (max batch {self.max_batch_size}, "
+              f"max wait {self.max_wait * 1000:.1f}ms)")
+        print()
+        async with server:
+            await server.serve_forever()
+
+
+# ============================================================================
+# LOAD GENERATOR
+# ============================================================================
+
+async def _client(host, port, bodies, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            started = time.perf_counter()
+            writer.write(f"POST /score HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            length = 0
+            status = await reader.readline()
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            if b' 200 ' in status:
+                latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        writer.close()
+
+
+async def run_load_test(host=DEFAULT_HOST, port=DEFAULT_PORT, requests=2000, concurrency=32,
+                        feature_cols=FEATURE_COLS, seed=42, verbose=True):
+    """
+    Fire `requests` single-signer score requests over `concurrency` keep-alive
+    connections.
+
+    Returns:
+    --------
+    stats : dict
+        requests, ok, duration_s, throughput_rps, p50_ms, p95_ms, p99_ms, max_ms
+    """
+    rng = np.random.default_rng(seed)
+    features = np.abs(rng.normal(1.0, 0.5, size=(requests, len(feature_cols))))
+    bodies = [json.dumps({'signer': f'load-{i}', 'features': dict(zip(feature_cols, row.tolist()))}).encode()
+              for i, row in enumerate(features)]
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*[_client(host, port, bodies[i::concurrency], latencies) for i in range(concurrency)])
+    duration = time.perf_counter() - started
+
+    values = np.asarray(latencies)
+    stats = {
+        'requests': requests,
+        'ok': len(values),
+        'concurrency': concurrency,
+        'duration_s': duration,
+        'throughput_rps': len(values) / duration if duration > 0 else 0.0,
+        'p50_ms': float(np.percentile(values, 50)) if len(values) else None,
+        'p95_ms': float(np.percentile(values, 95)) if len(values) else None,
+        'p99_ms': float(np.percentile(values, 99)) if len(values) else None,
+        'max_ms': float(values.max()) if len(values) else None,
+    }
+    if verbose:
+        print("=" * 80)
+        print("SCORING LOAD TEST")
+        print("=" * 80)
+        print(f"Requests: {stats['ok']:,}/{requests:,} OK over {concurrency} connections in {duration:.2f}s")
+        print(f"Throughput: {stats['throughput_rps']:,.0f} req/s")
+        if len(values):
+            print(f"Latency: p50 {stats['p50_ms']:.2f}ms | p95 {stats['p95_ms']:.2f}ms | "
+                  f"p99 {stats['p99_ms']:.2f}ms | max {stats['max_ms']:.2f}ms")
+        print()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MEV classifier scoring service')
+    commands = parser.add_subparsers(dest='command')
+
+    serve = commands.add_parser('serve', help='Run the scoring server')
+    serve.add_argument('--artifact', default=DEFAULT_ARTIFACT_DIR, help='Artifact root or version directory')
+    serve.add_argument('--version', type=int, default=None, help='Artifact version (default: latest)')
+    serve.add_argument('--host', default=DEFAULT_HOST)
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve.add_argument('--max-batch', type=int, default=MAX_BATCH_SIZE)
+    serve.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+
+    load = commands.add_parser('loadgen', help='Measure scoring latency against a running server')
+    load.add_argument('--host', default=DEFAULT_HOST)
+    load.add_argument('--port', type=int, default=DEFAULT_PORT)
+    load.add_argument('--requests', type=int, default=2000)
+    load.add_argument('--concurrency', type=int, default=32)
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        service = ScoringService(ScoringArtifact(args.artifact, args.version), args.max_batch, args.max_wait_ms)
+        try:
+            asyncio.run(service.serve_forever(args.host, args.port))
+        except KeyboardInterrupt:
+            print("\nStopped")
+    elif args.command == 'loadgen':
+        asyncio.run(run_load_test(args.host, args.port, args.requests, args.concurrency))
+    else:
+        print("Scoring Service Module")
+        print("Persist the 07a model in the notebook, then serve it from the repo root")
+        print()
+        print("Example usage:")
+        print("""
+    # 07a, after training
+    from scoring_service import save_model_artifact
+    save_model_artifact(best_model, scaler, feature_cols, gmm=gmm, cluster_to_label=cluster_to_label,
+                        metrics={'f1_mev': best_f1, 'pr_auc': best_pr})
+
+    # shell
+    python scoring_service.py serve --max-batch 256 --max-wait-ms 5
+    python scoring_service.py loadgen --requests 5000 --concurrency 64
+    curl -s localhost:8765/metrics
+        """)
+
+
+if __name__ == "__main__":
+    main()
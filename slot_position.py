@@ -0,0 +1,238 @@
+"""
+Within-Slot Ordering Index and Late-Slot Percentiles
+
+Front-running in 02 uses a fixed 300ms cutoff (us_since_first_shred > 300000) and
+front_running.groupby('slot')['us_since_first_shred'].transform('mean'); late-slot
+ratios and A-B-A ordering checks each re-sort their slot. This module builds one
+slot-position table with a single lexsort over (slot, us_since_first_shred, ms_time):
+1. Ordinal of every event in its slot and slot size
+2. Percentile rank within the slot (ordinal + 1) / size
+3. Latency gap to the previous event in the slot
+4. Slot tail (max) and mean latency, broadcast to every event
+5. Consumers: late-slot ratios, front-running candidates and A-B-A patterns
+   read the table in slot order without regrouping
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+
+LATE_SLOT_THRESHOLD_US = 300_000
+
+POSITION_COLUMNS = [
+    'event_row', 'slot', 'slot_ordinal', 'slot_size', 'slot_percentile',
+    'gap_prev_us', 'slot_tail_latency_us', 'slot_mean_latency_us', 'is_late'
+]
+
+
+def build_slot_positions(
+    events_df,
+    slot_col='slot',
+    latency_col='us_since_first_shred',
+    time_col='ms_time',
+    late_threshold_us=LATE_SLOT_THRESHOLD_US,
+    verbose=True
+):
+    """
+    Slot-position table for every event, in slot order.
+
+    Parameters:
+    -----------
+    events_df : DataFrame
+        Events with slot, latency and time columns (TRADEs, or TRADE + ORACLE)
+    slot_col, latency_col, time_col : str
+        Sort keys; latency ties are broken by time
+    late_threshold_us : float
+        Fixed late-slot threshold (02: 300ms)
+    verbose : bool
+        Print summary
+
+    Returns:
+    --------
+    positions : DataFrame
+        POSITION_COLUMNS, sorted by (slot, slot_ordinal) and indexed by the
+        events_df index of each event (join back with events_df.join(positions));
+        event_row is the event's positional row in events_df
+    """
+    slot = events_df[slot_col].to_numpy()
+    latency = events_df[latency_col].to_numpy(dtype=np.float64)
+    order = np.lexsort((events_df[time_col].to_numpy(), latency, slot))
+
+    slot_sorted = slot[order]
+    latency_sorted = latency[order]
+    n = len(order)
+
+    new_slot = np.ones(n, dtype=bool)
+    new_slot[1:] = slot_sorted[1:] != slot_sorted[:-1]
+    starts = np.flatnonzero(new_slot)
+    sizes = np.diff(np.append(starts, n))
+    run_start = np.repeat(starts, sizes)
+
+    ordinal = np.arange(n) - run_start
+    gap = np.full(n, np.nan)
+    gap[1:] = np.diff(latency_sorted)
+    gap[new_slot] = np.nan
+
+    valid = ~np.isnan(latency_sorted)
+    if n:
+        tail = np.fmax.reduceat(latency_sorted, starts)
+        latency_sum = np.add.reduceat(np.where(valid, latency_sorted, 0.0), starts)
+        latency_count = np.add.reduceat(valid.astype(np.int64), starts)
+    else:
+        tail = latency_sum = latency_count = np.array([], dtype=np.float64)
+    mean = np.divide(latency_sum, latency_count, out=np.full(len(starts), np.nan), where=latency_count > 0)
+
+    positions = pd.DataFrame({
+        'event_row': order,
+        'slot': slot_sorted,
+        'slot_ordinal': ordinal,
+        'slot_size': np.repeat(sizes, sizes),
+        'slot_percentile': (ordinal + 1) / np.repeat(sizes, sizes),
+        'gap_prev_us': gap,
+        'slot_tail_latency_us': np.repeat(tail, sizes),
+        'slot_mean_latency_us': np.repeat(mean, sizes),
+        'is_late': latency_sorted > late_threshold_us,
+    }, index=events_df.index[order], columns=POSITION_COLUMNS)
+
+    if verbose:
+        print("=" * 80)
+        print("SLOT POSITION INDEX")
+        print("=" * 80)
+        print(f"Events: {n:,} in {len(starts):,} slots")
+        print(f"Events per slot: mean {sizes.mean() if len(sizes) else 0:.2f}, max {sizes.max() if len(sizes) else 0:,}")
+        print(f"Late-slot events (>{late_threshold_us / 1000:.0f}ms): {positions['is_late'].sum():,}")
+        print(f"Median slot tail latency: {np.nanmedian(tail) / 1000 if len(tail) else 0:.1f}ms")
+        print()
+
+    return positions
+
+
+def late_slot_ratio(events_df, positions, by='signer', percentile=None):
+    """
+    Share of each group's events that land late in their slot.
+
+    Parameters:
+    -----------
+    events_df : DataFrame
+        Events the positions were built from
+    positions : DataFrame
+        Output of build_slot_positions()
+    by : str
+        Group column (signer, validator, amm_trade, ...)
+    percentile : float or None
+        Late = slot_percentile > percentile (relative to the slot) instead of
+        the fixed latency threshold
+
+    Returns:
+    --------
+    ratio : Series
+        Indexed by group, named 'late_slot_ratio'
+    """
+    late = positions['is_late'] if percentile is None else positions['slot_percentile'] > percentile
+    groups = events_df[by].to_numpy()[positions['event_row'].to_numpy()]
+    return late.groupby(groups).mean().rename('late_slot_ratio')
+
+
+def front_running_candidates(events_df, positions, percentile=None, signer_col='signer'):
+    """
+    02 front-running records with slot context from the position table.
+
+    Parameters:
+    -----------
+    events_df : DataFrame
+        TRADE events
+    positions : DataFrame
+        Output of build_slot_positions() over events_df
+    percentile : float or None
+        Use slot_percentile > percentile instead of the fixed threshold
+
+    Returns:
+    --------
+    front_running : DataFrame
+        ['slot', 'amm_trade', 'attacker_signer', 'type', 'validator',
+         'us_since_first_shred', 'slot_avg_latency', 'slot_ordinal',
+         'slot_percentile', 'slot_tail_latency_us']; slot_avg_latency is the
+        mean over every event of the slot (02 averaged only the late ones)
+    """
+    late = positions['is_late'] if percentile is None else positions['slot_percentile'] > percentile
+    late_positions = positions[late.to_numpy()]
+    rows = events_df.iloc[late_positions['event_row'].to_numpy()]
+    front_running = rows.rename(columns={signer_col: 'attacker_signer'}).assign(type='front_running')
+    columns = ['slot', 'amm_trade', 'attacker_signer', 'type', 'validator', 'us_since_first_shred']
+    front_running = front_running[[c for c in columns if c in front_running.columns]]
+    front_running['slot_avg_latency'] = late_positions['slot_mean_latency_us'].to_numpy()
+    front_running['slot_ordinal'] = late_positions['slot_ordinal'].to_numpy()
+    front_running['slot_percentile'] = late_positions['slot_percentile'].to_numpy()
+    front_running['slot_tail_latency_us'] = late_positions['slot_tail_latency_us'].to_numpy()
+    return front_running
+
+
+def aba_patterns(events_df, positions, signer_col='signer', max_victims=1):
+    """
+    A-B-A orderings within a slot: the same signer before and after up to
+    max_victims events of other signers.
+
+    Parameters:
+    -----------
+    events_df : DataFrame
+        Events the positions were built from
+    positions : DataFrame
+        Output of build_slot_positions()
+    signer_col : str
+        Signer column
+    max_victims : int
+        Maximum events between the two attacker events (1 = strict A-B-A)
+
+    Returns:
+    --------
+    patterns : DataFrame
+        ['slot', 'attacker_signer', 'front_row', 'back_row', 'victims'] with
+        positional rows into events_df
+    """
+    signer_codes, signers = pd.factorize(events_df[signer_col])
+    rows = positions['event_row'].to_numpy()
+    codes = signer_codes[rows]
+    ordinal = positions['slot_ordinal'].to_numpy()
+
+    found = []
+    for k in range(1, max_victims + 1):
+        back = np.arange(k + 1, len(rows))
+        front = back - (k + 1)
+        # same slot iff the ordinal advanced by exactly k + 1
+        ok = (ordinal[back] - ordinal[front] == k + 1) & (codes[back] == codes[front]) & (codes[back] >= 0)
+        # every event in between belongs to another signer
+        for j in range(1, k + 1):
+            ok &= codes[front + j] != codes[front]
+        front, back = front[ok], back[ok]
+        found.append(pd.DataFrame({
+            'slot': positions['slot'].to_numpy()[front],
+            'attacker_signer': signers.take(codes[front]),
+            'front_row': rows[front],
+            'back_row': rows[back],
+            'victims': k,
+        }))
+    patterns = pd.concat(found, ignore_index=True)
+    return patterns.sort_values(['slot', 'front_row', 'victims'], kind='stable').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    print("Slot Position Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from slot_position import build_slot_positions, late_slot_ratio, front_running_candidates, aba_patterns
+
+    positions = build_slot_positions(trades)
+    positions.to_parquet('outputs/slot_positions.parquet')
+
+    front_running = front_running_candidates(trades, positions)              # fixed 300ms
+    front_running_p90 = front_running_candidates(trades, positions, 0.9)     # last 10% of the slot
+    late = late_slot_ratio(trades, positions, by='signer')
+    patterns = aba_patterns(trades, positions, max_victims=3)
+    """)
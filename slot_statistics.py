@@ -0,0 +1,285 @@
+"""
+Vectorized Slot-Level Density Statistics
+
+This module replaces the per-slot lambdas, consecutive-group loops and the
+500-slot random sampling in 04_validator_analysis with a single
+factorize + bincount pass over the full data:
+1. Trades, oracles and distinct bots per slot
+2. Bot concentration (top signer share of slot trades)
+3. Back-run lag (TRADE after ORACLE in the same AMM stream) per slot
+4. Per-validator rollups and pattern counts (fat / classic / cross-slot)
+
+Case study references:
+- B91 fat sandwich: ≥5 TRADEs per slot
+- Classic sandwich: 3-4 TRADEs per slot
+- 2Fast cross-slot: 4-6 TRADEs across 2+ consecutive slots
+- DeezNode back-running: TRADE <50ms after ORACLE
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+
+FAT_SANDWICH_MIN_TRADES = 5
+CLASSIC_SANDWICH_MIN_TRADES = 3
+BACK_RUNNING_THRESHOLD_MS = 50
+
+
+def _amm_stream(events_df):
+    """AMM of each event: amm_trade for TRADEs, amm_oracle for ORACLEs."""
+    if 'amm_trade' in events_df.columns and 'amm_oracle' in events_df.columns:
+        return events_df['amm_trade'].fillna(events_df['amm_oracle'])
+    if 'amm_trade' in events_df.columns:
+        return events_df['amm_trade']
+    if 'amm_oracle' in events_df.columns:
+        return events_df['amm_oracle']
+    return pd.Series('All', index=events_df.index)
+
+
+def compute_backrun_lags(events_df, threshold_ms=BACK_RUNNING_THRESHOLD_MS):
+    """
+    Lag of every TRADE to the preceding event in the same AMM stream.
+
+    Parameters:
+    -----------
+    events_df : DataFrame
+        TRADE and ORACLE events with columns: ['kind', 'ms_time', 'slot'] and
+        'amm_trade' / 'amm_oracle' when available
+    threshold_ms : float
+        Back-run threshold (default: 50ms, DeezNode pattern)
+
+    Returns:
+    --------
+    lags : DataFrame
+        Indexed like events_df with columns ['prev_kind', 'lag_ms', 'is_backrun']
+    """
+    stream_codes, _ = pd.factorize(_amm_stream(events_df))
+    ms_time = events_df['ms_time'].to_numpy(dtype=np.float64)
+    kind_codes = np.where(events_df['kind'].to_numpy() == 'ORACLE', 1, 0)
+    kind_codes[events_df['kind'].to_numpy() == 'TRADE'] = 2
+
+    order = np.lexsort((ms_time, stream_codes))
+    same_stream = np.zeros(len(order), dtype=bool)
+    same_stream[1:] = stream_codes[order][1:] == stream_codes[order][:-1]
+
+    lag_sorted = np.full(len(order), np.nan)
+    lag_sorted[1:] = np.diff(ms_time[order])
+    lag_sorted[~same_stream] = np.nan
+    prev_kind_sorted = np.full(len(order), -1)
+    prev_kind_sorted[1:] = kind_codes[order][:-1]
+    prev_kind_sorted[~same_stream] = -1
+
+    lag = np.empty(len(order))
+    prev_kind = np.empty(len(order), dtype=np.int64)
+    lag[order] = lag_sorted
+    prev_kind[order] = prev_kind_sorted
+
+    is_backrun = (kind_codes == 2) & (prev_kind == 1) & (lag >= 0) & (lag < threshold_ms)
+    return pd.DataFrame({
+        'prev_kind': pd.Categorical.from_codes(prev_kind + 1, ['None', 'OTHER', 'ORACLE', 'TRADE']),
+        'lag_ms': lag,
+        'is_backrun': is_backrun,
+    }, index=events_df.index)
+
+
+def compute_slot_statistics(
+    events_df,
+    backrun_threshold_ms=BACK_RUNNING_THRESHOLD_MS,
+    verbose=True
+):
+    """
+    Per-slot and per-validator density statistics in one pass.
+
+    Parameters:
+    -----------
+    events_df : DataFrame
+        TRADE and ORACLE events with columns: ['slot', 'kind', 'ms_time', 'signer',
+                                               'validator', 'amm_trade', 'amm_oracle']
+    backrun_threshold_ms : float
+        Back-run threshold (default: 50ms)
+    verbose : bool
+        Print summary
+
+    Returns:
+    --------
+    slot_stats : DataFrame
+        One row per slot: ['slot', 'validator', 'trades', 'oracles', 'distinct_bots',
+        'top_bot_trades', 'bot_concentration', 'backruns', 'backrun_lag_mean_ms',
+        'backrun_lag_min_ms']
+    validator_stats : DataFrame
+        One row per validator with slot counts, densities, distinct bots and
+        fat / classic sandwich slot counts
+    stats : dict
+        Pattern counts (same figures as the 04 MEV pattern summary)
+    """
+    slot_codes, slots = pd.factorize(events_df['slot'], sort=True)
+    n_slots = len(slots)
+    kind = events_df['kind'].to_numpy()
+    is_trade = kind == 'TRADE'
+    is_oracle = kind == 'ORACLE'
+
+    trades = np.bincount(slot_codes, weights=is_trade, minlength=n_slots).astype(np.int64)
+    oracles = np.bincount(slot_codes, weights=is_oracle, minlength=n_slots).astype(np.int64)
+
+    # Slot leader: validator of the first event in each slot
+    if 'validator' in events_df.columns:
+        validator_codes, validators = pd.factorize(events_df['validator'])
+        _, first_idx = np.unique(slot_codes, return_index=True)
+        slot_validator = validator_codes[first_idx]
+    else:
+        validators = pd.Index(['Unknown'])
+        validator_codes = np.zeros(len(events_df), dtype=np.int64)
+        slot_validator = np.zeros(n_slots, dtype=np.int64)
+
+    # Distinct bots and top-bot share: count (slot, signer) pairs over TRADEs
+    signer_codes, signers = pd.factorize(events_df['signer'])
+    n_signers = max(len(signers), 1)
+    trade_pairs = slot_codes[is_trade].astype(np.int64) * n_signers + signer_codes[is_trade]
+    pair_keys, pair_counts = np.unique(trade_pairs, return_counts=True)
+    pair_slots = pair_keys // n_signers
+    distinct_bots = np.bincount(pair_slots, minlength=n_slots)
+    top_bot_trades = np.zeros(n_slots, dtype=np.int64)
+    np.maximum.at(top_bot_trades, pair_slots, pair_counts)
+    bot_concentration = np.divide(top_bot_trades, trades, out=np.zeros(n_slots), where=trades > 0)
+
+    # Back-run lag per slot
+    lags = compute_backrun_lags(events_df, backrun_threshold_ms)
+    is_backrun = lags['is_backrun'].to_numpy()
+    backrun_lag = lags['lag_ms'].to_numpy()[is_backrun]
+    backrun_slots = slot_codes[is_backrun]
+    backruns = np.bincount(backrun_slots, minlength=n_slots)
+    lag_sum = np.bincount(backrun_slots, weights=backrun_lag, minlength=n_slots)
+    backrun_lag_mean = np.divide(lag_sum, backruns, out=np.full(n_slots, np.nan), where=backruns > 0)
+    backrun_lag_min = np.full(n_slots, np.inf)
+    np.minimum.at(backrun_lag_min, backrun_slots, backrun_lag)
+    backrun_lag_min[np.isinf(backrun_lag_min)] = np.nan
+
+    slot_stats = pd.DataFrame({
+        'slot': np.asarray(slots),
+        'validator': np.asarray(validators)[slot_validator],
+        'trades': trades,
+        'oracles': oracles,
+        'distinct_bots': distinct_bots,
+        'top_bot_trades': top_bot_trades,
+        'bot_concentration': bot_concentration,
+        'backruns': backruns,
+        'backrun_lag_mean_ms': backrun_lag_mean,
+        'backrun_lag_min_ms': backrun_lag_min,
+    })
+
+    # Per-validator rollup over slot-level arrays
+    n_validators = len(validators)
+    v = slot_validator
+
+    def per_validator(values):
+        return np.bincount(v, weights=values, minlength=n_validators)
+
+    v_slots = np.bincount(v, minlength=n_validators)
+    v_trades = per_validator(trades).astype(np.int64)
+    v_oracles = per_validator(oracles).astype(np.int64)
+    v_backruns = per_validator(backruns).astype(np.int64)
+    v_lag_sum = per_validator(lag_sum)
+    fat = trades >= FAT_SANDWICH_MIN_TRADES
+    classic = (trades >= CLASSIC_SANDWICH_MIN_TRADES) & (trades < FAT_SANDWICH_MIN_TRADES)
+    max_bots = np.zeros(n_validators, dtype=np.int64)
+    np.maximum.at(max_bots, v, distinct_bots)
+
+    # Distinct bots per validator: unique (validator, signer) pairs over TRADEs
+    validator_pairs = np.unique(validator_codes[is_trade].astype(np.int64) * n_signers + signer_codes[is_trade])
+    v_distinct_bots = np.bincount(validator_pairs // n_signers, minlength=n_validators)
+
+    validator_stats = pd.DataFrame({
+        'validator': np.asarray(validators),
+        'slots': v_slots,
+        'trades': v_trades,
+        'oracles': v_oracles,
+        'trades_per_slot': v_trades / np.maximum(v_slots, 1),
+        'oracles_per_slot': v_oracles / np.maximum(v_slots, 1),
+        'distinct_bots': v_distinct_bots,
+        'avg_bots_per_slot': per_validator(distinct_bots) / np.maximum(v_slots, 1),
+        'max_bots_per_slot': max_bots,
+        'avg_bot_concentration': per_validator(bot_concentration) / np.maximum(v_slots, 1),
+        'backruns': v_backruns,
+        'backrun_lag_mean_ms': np.divide(v_lag_sum, v_backruns, out=np.full(n_validators, np.nan), where=v_backruns > 0),
+        'fat_sandwich_slots': per_validator(fat).astype(np.int64),
+        'fat_sandwich_trades': per_validator(np.where(fat, trades, 0)).astype(np.int64),
+        'classic_sandwich_slots': per_validator(classic).astype(np.int64),
+        'classic_sandwich_trades': per_validator(np.where(classic, trades, 0)).astype(np.int64),
+    }).sort_values('trades', ascending=False).reset_index(drop=True)
+
+    stats = slot_pattern_summary(slot_stats)
+    stats['back_running_trades'] = int(backruns.sum())
+    stats['back_running_lag_mean_ms'] = float(backrun_lag.mean()) if len(backrun_lag) else np.nan
+    stats['back_running_lag_median_ms'] = float(np.median(backrun_lag)) if len(backrun_lag) else np.nan
+
+    if verbose:
+        print("=" * 80)
+        print("SLOT STATISTICS (full data, no sampling)")
+        print("=" * 80)
+        print(f"Events: {len(events_df):,} | Slots: {n_slots:,} | Validators: {n_validators:,}")
+        print(f"Trades/slot: {trades.mean() if n_slots else 0:.2f} | Oracles/slot: {oracles.mean() if n_slots else 0:.2f}")
+        print(f"Average unique signers per slot: {distinct_bots.mean() if n_slots else 0:.1f} (max {distinct_bots.max() if n_slots else 0})")
+        print(f"Fat Sandwich (B91):     {stats['fat_sandwich_slots']:,} slots, {stats['fat_sandwich_trades']:,} trades")
+        print(f"Classic Sandwich:       {stats['classic_sandwich_slots']:,} slots, {stats['classic_sandwich_trades']:,} trades")
+        print(f"Cross-Slot (2Fast):    ~{stats['cross_slot_patterns']:,} patterns, {stats['cross_slot_trades']:,} trades")
+        print(f"Back-Running (DeezNode): {stats['back_running_trades']:,} trades")
+        print()
+
+    return slot_stats, validator_stats, stats
+
+
+def slot_pattern_summary(slot_stats, cross_slot_min_trades=4, cross_slot_max_trades=6):
+    """
+    Fat / classic / cross-slot pattern counts from per-slot trade counts.
+
+    Cross-slot runs are maximal runs of consecutive slots containing TRADEs;
+    a run with 4-6 trades spanning 2+ slots counts as a 2Fast candidate
+    (same rule as the 04 notebook, without the groupby loop).
+
+    Returns:
+    --------
+    stats : dict
+    """
+    trade_slots = slot_stats.loc[slot_stats['trades'] > 0, ['slot', 'trades']].sort_values('slot')
+    slot_values = trade_slots['slot'].to_numpy(dtype=np.int64)
+    slot_trades = trade_slots['trades'].to_numpy(dtype=np.int64)
+
+    run_ids = np.concatenate([[0], np.cumsum(np.diff(slot_values) > 1)]) if len(slot_values) else np.array([], dtype=np.int64)
+    run_trades = np.bincount(run_ids, weights=slot_trades).astype(np.int64) if len(run_ids) else np.array([], dtype=np.int64)
+    run_slots = np.bincount(run_ids) if len(run_ids) else np.array([], dtype=np.int64)
+    cross = (run_trades >= cross_slot_min_trades) & (run_trades <= cross_slot_max_trades) & (run_slots >= 2)
+
+    trades = slot_stats['trades'].to_numpy()
+    fat = trades >= FAT_SANDWICH_MIN_TRADES
+    classic = (trades >= CLASSIC_SANDWICH_MIN_TRADES) & (trades < FAT_SANDWICH_MIN_TRADES)
+    return {
+        'fat_sandwich_slots': int(fat.sum()),
+        'fat_sandwich_trades': int(trades[fat].sum()),
+        'classic_sandwich_slots': int(classic.sum()),
+        'classic_sandwich_trades': int(trades[classic].sum()),
+        'cross_slot_patterns': int(cross.sum()),
+        'cross_slot_trades': int(run_trades[cross].sum()),
+    }
+
+
+if __name__ == "__main__":
+    print("Slot Statistics Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from slot_statistics import compute_slot_statistics, compute_backrun_lags
+
+    # Full data - no np.random.choice(unique_slots, size=500) sampling needed
+    slot_stats, validator_stats, stats = compute_slot_statistics(df_amm)
+
+    slot_stats[['slot', 'trades', 'oracles']]          # validator_amm_slot_density.png
+    slot_stats['distinct_bots']                        # bot_concentration_per_slot.png
+    lags = compute_backrun_lags(df_amm)
+    lags.loc[lags['is_backrun'], 'lag_ms']             # back_running_lag_distribution.png
+    """)
@@ -0,0 +1,235 @@
+"""
+Vectorized Trapped-Bot and Failed-Sandwich Analysis
+
+Rewrite of detect_trapped_bots in 08_monte_carlo_risk (iterrows over high-failure
+AMMs, `for attacker in all_attackers` with two boolean scans per attacker, and an
+isin over failed slots for the oracle check) as joins:
+1. Slot-level oracle index: oracle updates per slot, built once
+2. Per-AMM table: successful vs failed sandwiches (outer join) with failure
+   rates and oracle-locked failed slots
+3. Per-attacker table for every attacker in one pass: trap (failure) rate, top
+   failed AMM and oracle-lock flags (failed attempts in slots with oracle updates)
+4. Trapping records in the mev_trapping_detection.csv schema
+
+Author: Optimized MEV Detection System
+Date: 2026-10-18
+"""
+
+import os
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+
+MIN_ATTACKER_ATTEMPTS = 10
+ATTACKER_FAILURE_THRESHOLD = 0.60
+AMM_FAILURE_THRESHOLD = 0.50
+AMM_FAILED_SHARE_THRESHOLD = 0.10
+HALF_REFILL_AMM_PATTERN = 'SolFi'
+
+
+def build_slot_oracle_index(events_df):
+    """
+    Oracle updates per slot.
+
+    Parameters:
+    -----------
+    events_df : DataFrame
+        TRADE + ORACLE events ('kind' column), or TRADEs carrying 'prev_kind'
+        (an oracle update precedes the trade, as in the 08 check)
+
+    Returns:
+    --------
+    oracle_index : DataFrame
+        Indexed by slot with ['oracle_updates', 'first_oracle_ms', 'last_oracle_ms']
+    """
+    if 'kind' in events_df.columns and (events_df['kind'] == 'ORACLE').any():
+        oracles = events_df[events_df['kind'] == 'ORACLE']
+    elif 'prev_kind' in events_df.columns:
+        oracles = events_df[events_df['prev_kind'] == 'ORACLE']
+    else:
+        raise ValueError("events_df needs ORACLE rows in 'kind' or a 'prev_kind' column")
+
+    grouped = oracles.groupby('slot')
+    oracle_index = pd.DataFrame({'oracle_updates': grouped.size()})
+    if 'ms_time' in oracles.columns:
+        oracle_index['first_oracle_ms'] = grouped['ms_time'].min()
+        oracle_index['last_oracle_ms'] = grouped['ms_time'].max()
+    return oracle_index
+
+
+def _attempt_counts(df, key, count_name, slot_name):
+    if df.empty:
+        # string-keyed like the groupby result, so .index.str works on empty inputs
+        return pd.DataFrame(columns=[count_name, slot_name], index=pd.Index([], dtype=object, name=key),
+                            dtype=np.int64)
+    return df.groupby(key).agg(**{count_name: ('slot', 'size'), slot_name: ('slot', 'nunique')})
+
+
+def detect_trapped_bots(
+    failed_attempts_df,
+    sandwich_df,
+    oracle_index,
+    min_attempts=MIN_ATTACKER_ATTEMPTS,
+    attacker_failure_threshold=ATTACKER_FAILURE_THRESHOLD,
+    amm_failure_threshold=AMM_FAILURE_THRESHOLD,
+    amm_failed_share_threshold=AMM_FAILED_SHARE_THRESHOLD,
+    verbose=True
+):
+    """
+    Trapped-bot analysis as joins between failed attempts, sandwiches and the
+    slot oracle index.
+
+    Parameters:
+    -----------
+    failed_attempts_df : DataFrame
+        failed_sandwich_attempts.csv rows: ['slot', 'amm_trade', 'attacker_signer', ...]
+    sandwich_df : DataFrame
+        Successful sandwiches: ['slot', 'amm_trade', 'attacker_signer', ...]
+    oracle_index : DataFrame
+        Output of build_slot_oracle_index()
+    min_attempts : int
+        Attackers need more than this many attempts to be flagged (08: 10)
+    attacker_failure_threshold : float
+        Attacker trap-rate threshold (08: 60%)
+    amm_failure_threshold : float
+        AMM failure-rate threshold (08: 50%)
+    amm_failed_share_threshold : float
+        AMM share of all failed attempts threshold (08: 10%)
+    verbose : bool
+        Print summary
+
+    Returns:
+    --------
+    amm_table : DataFrame
+        Per AMM: successful/failed attempts and slots, failure/success rate,
+        failed_share, oracle_locked_slots, oracle_locked_attempts
+    attacker_table : DataFrame
+        Per attacker (all attackers): failed/successful/total attempts,
+        failure_rate (trap rate), top_failed_amm, top_failed_count,
+        oracle_locked_attempts, oracle_lock_rate, is_oracle_locked, is_trapped
+    trapping_records : DataFrame
+        mev_trapping_detection.csv rows ('amm', 'trapping_type', ..., 'evidence')
+    """
+    failed = failed_attempts_df.copy()
+    failed['oracle_locked'] = failed['slot'].isin(oracle_index.index) if len(failed) else pd.Series(dtype=bool)
+
+    # Per AMM
+    amm_table = _attempt_counts(sandwich_df, 'amm_trade', 'successful_attempts', 'successful_slots').join(
+        _attempt_counts(failed, 'amm_trade', 'failed_attempts', 'failed_slots'), how='outer').fillna(0)
+    locked = failed[failed['oracle_locked']]
+    amm_table = amm_table.join(locked.groupby('amm_trade').agg(
+        oracle_locked_attempts=('slot', 'size'), oracle_locked_slots=('slot', 'nunique')), how='left').fillna(0)
+    amm_table = amm_table.astype(np.int64)
+    amm_table['total_attempts'] = amm_table['successful_attempts'] + amm_table['failed_attempts']
+    amm_table['failure_rate'] = amm_table['failed_attempts'] / amm_table['total_attempts'].clip(lower=1)
+    amm_table['success_rate'] = amm_table['successful_attempts'] / amm_table['total_attempts'].clip(lower=1)
+    amm_table['failed_share'] = amm_table['failed_attempts'] / max(len(failed), 1)
+    amm_table.index.name = 'amm_trade'
+    amm_table = amm_table.sort_values('failure_rate', ascending=False, kind='stable')
+
+    # Per attacker
+    attacker_table = _attempt_counts(failed, 'attacker_signer', 'failed_attempts', 'failed_slots').join(
+        _attempt_counts(sandwich_df, 'attacker_signer', 'successful_attempts', 'successful_slots'),
+        how='outer').fillna(0).astype(np.int64)
+    attacker_table['total_attempts'] = attacker_table['failed_attempts'] + attacker_table['successful_attempts']
+    attacker_table['failure_rate'] = attacker_table['failed_attempts'] / attacker_table['total_attempts'].clip(lower=1)
+
+    top_failed = failed.groupby(['attacker_signer', 'amm_trade']).size().rename('top_failed_count').reset_index()
+    top_failed = top_failed.sort_values(['attacker_signer', 'top_failed_count'], ascending=[True, False],
+                                        kind='stable').drop_duplicates('attacker_signer')
+    attacker_table = attacker_table.join(
+        top_failed.set_index('attacker_signer').rename(columns={'amm_trade': 'top_failed_amm'}), how='left')
+    attacker_table['top_failed_amm'] = attacker_table['top_failed_amm'].fillna('Unknown')
+    attacker_table['top_failed_count'] = attacker_table['top_failed_count'].fillna(0).astype(np.int64)
+
+    attacker_table['oracle_locked_attempts'] = locked.groupby('attacker_signer').size() \
+        .reindex(attacker_table.index, fill_value=0).astype(np.int64)
+    attacker_table['oracle_lock_rate'] = attacker_table['oracle_locked_attempts'] / \
+        attacker_table['failed_attempts'].clip(lower=1)
+    attacker_table['is_oracle_locked'] = attacker_table['oracle_locked_attempts'] > 0
+    attacker_table['is_trapped'] = (attacker_table['total_attempts'] > min_attempts) & \
+                                   (attacker_table['failure_rate'] > attacker_failure_threshold)
+    attacker_table.index.name = 'attacker_signer'
+    attacker_table = attacker_table.sort_values('failure_rate', ascending=False, kind='stable')
+
+    # Trapping records (08 schema)
+    records = []
+    high_share = amm_table[amm_table['failed_share'] > amm_failed_share_threshold]
+    records.append(pd.DataFrame({
+        'amm': high_share.index,
+        'trapping_type': 'PRICE_LOCKING_SUSPECTED',
+        'failed_attempts': high_share['failed_attempts'].to_numpy(),
+        'failed_rate': high_share['failed_share'].to_numpy(),
+        'unique_slots': high_share['failed_slots'].to_numpy(),
+        'evidence': [f'High failed attempt rate ({r:.1%}) - possible SR-AMM price locking'
+                     for r in high_share['failed_share']],
+    }))
+    if not sandwich_df.empty and not failed.empty:
+        high_failure = amm_table[amm_table['failure_rate'] > amm_failure_threshold]
+        half_refill = high_failure.index.str.contains(HALF_REFILL_AMM_PATTERN, na=False)
+        records.append(pd.DataFrame({
+            'amm': high_failure.index,
+            'trapping_type': np.where(half_refill, 'SOLFI_HALF_REFILL_SUSPECTED', 'PRICE_LOCKING_SUSPECTED'),
+            'failed_attempts': high_failure['failed_attempts'].to_numpy(),
+            'successful_attempts': high_failure['successful_attempts'].to_numpy(),
+            'failure_rate': high_failure['failure_rate'].to_numpy(),
+            'evidence': [f'SolFi with {r:.1%} failure rate - possible half-refill trapping' if h else
+                         f'High failure rate ({r:.1%}) - possible SR-AMM price locking'
+                         for r, h in zip(high_failure['failure_rate'], half_refill)],
+        }))
+    confirmed = amm_table[(amm_table['oracle_locked_slots'] > 0) &
+                          amm_table.index.str.contains(HALF_REFILL_AMM_PATTERN, na=False)]
+    records.append(pd.DataFrame({
+        'amm': confirmed.index,
+        'trapping_type': 'SOLFI_HALF_REFILL_CONFIRMED',
+        'trapped_slots': confirmed['oracle_locked_slots'].to_numpy(),
+        'evidence': [f'{n} slots with failed attempts + oracle updates - SolFi half-refill pattern'
+                     for n in confirmed['oracle_locked_slots']],
+    }))
+    trapping_records = pd.concat(records, ignore_index=True)
+
+    if verbose:
+        print("=" * 80)
+        print("MEV BOT TRAPPING DETECTION")
+        print("=" * 80)
+        print(f"Failed attempts: {len(failed):,} | Successful sandwiches: {len(sandwich_df):,}")
+        print(f"Failed attempts in oracle-update slots: {failed['oracle_locked'].sum():,}")
+        print(f"AMMs with >{amm_failure_threshold:.0%} failure rate: "
+              f"{(amm_table['failure_rate'] > amm_failure_threshold).sum():,}")
+        print(f"Attackers: {len(attacker_table):,} | trapped (>{attacker_failure_threshold:.0%} failures, "
+              f">{min_attempts} attempts): {attacker_table['is_trapped'].sum():,} | "
+              f"oracle-locked: {attacker_table['is_oracle_locked'].sum():,}")
+        print(f"Trapping records: {len(trapping_records):,}")
+        print()
+
+    return amm_table, attacker_table, trapping_records
+
+
+def save_trapping_outputs(attacker_table, trapping_records, output_dir='.'):
+    """Write trapped_mev_bots.csv (trapped attackers) and mev_trapping_detection.csv"""
+    trapped = attacker_table[attacker_table['is_trapped']].reset_index().rename(
+        columns={'attacker_signer': 'attacker'})
+    trapped_path = os.path.join(output_dir, 'trapped_mev_bots.csv')
+    records_path = os.path.join(output_dir, 'mev_trapping_detection.csv')
+    trapped.to_csv(trapped_path, index=False)
+    trapping_records.to_csv(records_path, index=False)
+    print(f"✓ Saved trapped bot analysis to: {trapped_path}")
+    print(f"✓ Saved trapping detection results to: {records_path}")
+    return trapped_path, records_path
+
+
+if __name__ == "__main__":
+    print("Trapped Bots Module")
+    print("This module should be imported and used in notebooks/scripts")
+    print()
+    print("Example usage:")
+    print("""
+    from trapped_bots import build_slot_oracle_index, detect_trapped_bots, save_trapping_outputs
+
+    oracle_index = build_slot_oracle_index(df_clean)
+    failed_attempts_df = pd.read_csv('02_mev_detection/failed_sandwich_attempts.csv')
+    amm_table, attacker_table, records = detect_trapped_bots(failed_attempts_df, sandwich_df, oracle_index)
+    save_trapping_outputs(attacker_table, records)
+    """)